@@ -0,0 +1,63 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from app.core.cache import ResponseCache
+from app.core.security import require_admin
+from app.core.profiling import RequestProfiler
+from app.db.database import get_db
+from app.models import Company as CompanyModel
+from app.services.deletion import DeletionService
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/profiles")
+def list_profiles():
+    """Most recent request profiles, newest first"""
+    return {"profiles": RequestProfiler.summaries()}
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: int, top: int = 20):
+    """Profile summary with its time breakdown and hottest stacks"""
+    profile = RequestProfiler.get(profile_id, top)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@router.get("/profiles/{profile_id}/collapsed", response_class=PlainTextResponse)
+def get_collapsed_profile(profile_id: int):
+    """Collapsed stacks for flamegraph.pl, speedscope or inferno"""
+    collapsed = RequestProfiler.collapsed(profile_id)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(collapsed)
+
+@router.get("/cache")
+def get_cache_stats():
+    """Response cache hit, miss and eviction counters"""
+    return ResponseCache.stats()
+
+@router.delete("/cache")
+def clear_cache():
+    """Drop every cached result"""
+    ResponseCache.clear()
+    return {"message": "Cache cleared"}
+
+@router.post("/purges/{company_id}", status_code=status.HTTP_202_ACCEPTED)
+def purge_company(company_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    """Offboard a tenant in the background, deleting its leads in bounded batches"""
+    company = db.query(CompanyModel.id).filter(CompanyModel.id == company_id).first()
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+    
+    purge, started = DeletionService.start_purge(company_id)
+    if started:
+        background_tasks.add_task(DeletionService.purge_company, company_id)
+    return purge
+
+@router.get("/purges/{company_id}")
+def get_purge(company_id: int):
+    """Progress of a tenant purge started by this process"""
+    purge = DeletionService.purge_status(company_id)
+    if purge is None:
+        raise HTTPException(status_code=404, detail="Purge not found")
+    return purge
@@ -1,38 +1,87 @@
+from datetime import date
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from app.db.database import get_db
+from app.core.cache import ResponseCache
+from app.core.config import get_settings
+from app.db.database import get_db, get_read_db
 from app.models import (
     Company as CompanyModel,
     Campaign as CampaignModel,
     Lead as LeadModel,
-    AttributionResult as AttributionResultModel
+    AttributionResult as AttributionResultModel,
+    BudgetRuleSet as BudgetRuleSetModel,
+    CampaignDailyStat as CampaignDailyStatModel
 )
-from app.ml.deal_probability import DealProbabilityService
-from app.ml.budget_optimization import BudgetOptimizationService
+from app.schemas.budget_rule import BudgetRuleSet, BudgetRuleSetUpdate
+from app.schemas.budget_allocation import BudgetAllocationRequest, BudgetSimulationRequest
+from app.services.campaign_stats import CampaignStatsService
 
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
+settings = get_settings()
+
+# app.ml (and numpy behind it) is imported inside the handlers that use it, so a new
+# worker answers its first requests without paying for it; startup warm-up preloads it
 
 @router.get("/overview/{company_id}")
-def get_dashboard_overview(company_id: int, model: str = "linear", db: Session = Depends(get_db)):
+def get_dashboard_overview(
+    company_id: int,
+    model: str = "linear",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_read_db)
+):
     """Get KPI overview for dashboard"""
     company = db.query(CompanyModel).filter(CompanyModel.id == company_id).first()
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     
-    # Total ad spend
-    total_spend = db.query(func.sum(CampaignModel.cost)).filter(
-        CampaignModel.company_id == company_id
-    ).scalar() or 0.0
+    return ResponseCache.get_or_compute(
+        "overview",
+        company_id,
+        {"model": model, "start_date": start_date, "end_date": end_date},
+        lambda: _dashboard_overview(company_id, company.name, model, start_date, end_date, db),
+    )
+
+def _dashboard_overview(
+    company_id: int,
+    company_name: str,
+    model: str,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    db: Session
+) -> dict:
+    """Overview KPIs computed from the database"""
+    lead_filters = CampaignStatsService.datetime_filters(LeadModel.created_at, start_date, end_date)
+    
+    # Total ad spend; a date range reads the daily fact table
+    if start_date is not None or end_date is not None:
+        spend_query = db.query(func.sum(CampaignDailyStatModel.cost)).join(
+            CampaignModel, CampaignModel.id == CampaignDailyStatModel.campaign_id
+        ).filter(CampaignModel.company_id == company_id)
+        if start_date is not None:
+            spend_query = spend_query.filter(CampaignDailyStatModel.date >= start_date)
+        if end_date is not None:
+            spend_query = spend_query.filter(CampaignDailyStatModel.date <= end_date)
+        total_spend = spend_query.scalar() or 0.0
+    else:
+        total_spend = db.query(func.sum(CampaignModel.cost)).filter(
+            CampaignModel.company_id == company_id
+        ).scalar() or 0.0
     
     # Total pipeline value
     total_pipeline_value = db.query(func.sum(LeadModel.deal_value)).filter(
-        LeadModel.company_id == company_id
+        LeadModel.company_id == company_id, *lead_filters
     ).scalar() or 0.0
     
-    # Revenue attributed (using specified model)
-    total_attributed_revenue = db.query(func.sum(AttributionResultModel.attributed_revenue)).filter(
-        AttributionResultModel.attribution_model == model
+    # Revenue attributed (using specified model) to this company's leads
+    total_attributed_revenue = db.query(func.sum(AttributionResultModel.attributed_revenue)).join(
+        LeadModel, LeadModel.id == AttributionResultModel.lead_id
+    ).filter(
+        AttributionResultModel.attribution_model == model,
+        LeadModel.company_id == company_id,
+        *lead_filters
     ).scalar() or 0.0
     
     # ROAS
@@ -40,7 +89,7 @@ def get_dashboard_overview(company_id: int, model: str = "linear", db: Session =
     
     # CAC
     num_leads = db.query(func.count(LeadModel.id)).filter(
-        LeadModel.company_id == company_id
+        LeadModel.company_id == company_id, *lead_filters
     ).scalar() or 0
     cac = (total_spend / num_leads) if num_leads > 0 else 0.0
     
@@ -52,13 +101,14 @@ def get_dashboard_overview(company_id: int, model: str = "linear", db: Session =
     # Conversion rate
     num_won = db.query(func.count(LeadModel.id)).filter(
         LeadModel.company_id == company_id,
-        LeadModel.stage == "Won"
+        LeadModel.stage == "Won",
+        *lead_filters
     ).scalar() or 0
     conversion_rate = (num_won / num_leads * 100) if num_leads > 0 else 0.0
     
     return {
         "company_id": company_id,
-        "company_name": company.name,
+        "company_name": company_name,
         "total_ad_spend": float(total_spend),
         "pipeline_value": float(total_pipeline_value),
         "revenue_attributed": float(total_attributed_revenue),
@@ -71,12 +121,16 @@ def get_dashboard_overview(company_id: int, model: str = "linear", db: Session =
     }
 
 @router.get("/funnel/{company_id}")
-def get_funnel_data(company_id: int, db: Session = Depends(get_db)):
+def get_funnel_data(company_id: int, db: Session = Depends(get_read_db)):
     """Get lead funnel data"""
     company = db.query(CompanyModel).filter(CompanyModel.id == company_id).first()
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     
+    return ResponseCache.get_or_compute("funnel", company_id, {}, lambda: _funnel_data(company_id, db))
+
+def _funnel_data(company_id: int, db: Session) -> dict:
+    """Lead count and value per stage computed from the database"""
     stages = ["MQL", "SQL", "Opportunity", "Won", "Lost"]
     funnel_data = []
     
@@ -100,66 +154,60 @@ def get_funnel_data(company_id: int, db: Session = Depends(get_db)):
     return {"company_id": company_id, "funnel": funnel_data}
 
 @router.get("/revenue-by-channel/{company_id}")
-def get_revenue_by_channel(company_id: int, model: str = "linear", db: Session = Depends(get_db)):
+def get_revenue_by_channel(
+    company_id: int,
+    model: str = "linear",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_read_db)
+):
     """Get attributed revenue by marketing channel"""
+    from app.ml.budget_optimization import BudgetOptimizationService
     company = db.query(CompanyModel).filter(CompanyModel.id == company_id).first()
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     
-    results = db.query(
-        CampaignModel.platform,
-        func.sum(AttributionResultModel.attributed_revenue).label("total_revenue"),
-        func.sum(CampaignModel.cost).label("total_spend"),
-        func.count(CampaignModel.id).label("num_campaigns")
-    ).join(
-        AttributionResultModel, CampaignModel.id == AttributionResultModel.campaign_id, isouter=True
-    ).filter(
-        CampaignModel.company_id == company_id,
-        AttributionResultModel.attribution_model == model
-    ).group_by(CampaignModel.platform).all()
-    
-    channel_data = []
-    for platform, revenue, spend, num_campaigns in results:
-        channel_data.append({
-            "platform": platform or "Unknown",
-            "attributed_revenue": float(revenue) if revenue else 0.0,
-            "spend": float(spend) if spend else 0.0,
-            "num_campaigns": num_campaigns or 0
+    metrics = BudgetOptimizationService.get_campaign_metrics(company_id, db, model, start_date, end_date)
+    
+    channels = {}
+    for campaign in metrics:
+        channel = channels.setdefault(campaign["platform"] or "Unknown", {
+            "platform": campaign["platform"] or "Unknown",
+            "attributed_revenue": 0.0,
+            "spend": 0.0,
+            "num_campaigns": 0
         })
+        channel["attributed_revenue"] += campaign["attributed_revenue"]
+        channel["spend"] += campaign["spend"]
+        channel["num_campaigns"] += 1
     
-    return {"company_id": company_id, "channels": channel_data}
+    return {"company_id": company_id, "channels": list(channels.values())}
 
 @router.get("/top-campaigns/{company_id}")
-def get_top_campaigns(company_id: int, limit: int = 5, db: Session = Depends(get_db)):
+def get_top_campaigns(
+    company_id: int,
+    limit: int = 5,
+    model: str = "linear",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_read_db)
+):
     """Get top campaigns by ROAS"""
-    campaigns = db.query(CampaignModel).filter(
-        CampaignModel.company_id == company_id
-    ).all()
+    from app.ml.budget_optimization import BudgetOptimizationService
+    metrics = BudgetOptimizationService.get_campaign_metrics(company_id, db, model, start_date, end_date)
     
-    campaign_data = []
-    for campaign in campaigns:
-        # Get attributed revenue
-        attributed_revenue = db.query(func.sum(AttributionResultModel.attributed_revenue)).filter(
-            AttributionResultModel.campaign_id == campaign.id
-        ).scalar() or 0.0
-        
-        # Calculate ROAS
-        roas = (attributed_revenue / campaign.cost) if campaign.cost > 0 else 0.0
-        
-        # Count leads
-        num_leads = db.query(func.count(LeadModel.id)).filter(
-            LeadModel.source_campaign_id == campaign.id
-        ).scalar() or 0
-        
-        campaign_data.append({
-            "campaign_id": campaign.id,
-            "campaign_name": campaign.name,
-            "platform": campaign.platform,
-            "spend": campaign.cost,
-            "attributed_revenue": float(attributed_revenue),
-            "roas": float(round(roas, 2)),
-            "num_leads": num_leads
-        })
+    campaign_data = [
+        {
+            "campaign_id": m["campaign_id"],
+            "campaign_name": m["campaign_name"],
+            "platform": m["platform"],
+            "spend": m["spend"],
+            "attributed_revenue": m["attributed_revenue"],
+            "roas": float(round(m["roas"], 2)),
+            "num_leads": m["num_leads"]
+        }
+        for m in metrics
+    ]
     
     # Sort by ROAS
     campaign_data.sort(key=lambda x: x["roas"], reverse=True)
@@ -170,35 +218,154 @@ def get_top_campaigns(company_id: int, limit: int = 5, db: Session = Depends(get
     }
 
 @router.get("/deal-probability/{company_id}")
-def get_deal_probabilities(company_id: int, db: Session = Depends(get_db)):
-    """Get deal probability scores for all leads"""
+def get_deal_probabilities(
+    company_id: int,
+    threshold: float = 50,
+    limit: int = 10,
+    offset: int = 0,
+    db: Session = Depends(get_db)
+):
+    """Get persisted deal probability scores above a threshold, highest first"""
+    from app.ml.scoring import LeadScoringService
+    from app.ml.trainer import DealModelTrainer
     company = db.query(CompanyModel).filter(CompanyModel.id == company_id).first()
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     
-    # Train model if needed
-    DealProbabilityService.train_model(db)
+    # Retraining happens in the background only when the training data changed
+    DealModelTrainer.request_training()
     
-    # Get high probability leads
-    high_prob_leads = DealProbabilityService.get_high_probability_leads(50, db)
+    # Read persisted scores through the (company_id, probability) index
+    LeadScoringService.ensure_scored(company_id, db)
+    page = LeadScoringService.get_scored_leads(company_id, threshold, limit, offset, db)
     
     return {
         "company_id": company_id,
-        "high_probability_leads": high_prob_leads[:10]
+        "threshold": threshold,
+        "total": page["total"],
+        "limit": limit,
+        "offset": offset,
+        "high_probability_leads": page["leads"]
     }
 
 @router.get("/budget-optimization/{company_id}")
-def get_budget_recommendations(company_id: int, db: Session = Depends(get_db)):
+def get_budget_recommendations(
+    company_id: int,
+    model: str = "linear",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_read_db)
+):
     """Get budget optimization recommendations"""
+    from app.ml.budget_optimization import BudgetOptimizationService
     company = db.query(CompanyModel).filter(CompanyModel.id == company_id).first()
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     
-    recommendations = BudgetOptimizationService.get_optimization_recommendations(company_id, db)
-    metrics = BudgetOptimizationService.get_campaign_metrics(company_id, db)
+    # Metrics are computed once and shared with the recommendation engine
+    metrics = BudgetOptimizationService.get_campaign_metrics(company_id, db, model, start_date, end_date)
+    recommendations = BudgetOptimizationService.get_optimization_recommendations(company_id, db, metrics=metrics)
     
     return {
         "company_id": company_id,
+        "model": model,
         "recommendations": recommendations,
         "campaign_metrics": metrics
     }
+
+@router.post("/budget-allocation/{company_id}")
+def allocate_budget(company_id: int, request: BudgetAllocationRequest, db: Session = Depends(get_db)):
+    """Allocate a total budget across campaigns on fitted diminishing-returns curves"""
+    from app.ml.budget_allocation import BudgetAllocator
+    from app.ml.budget_optimization import BudgetOptimizationService
+    company = db.query(CompanyModel).filter(CompanyModel.id == company_id).first()
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+    
+    metrics = BudgetOptimizationService.get_campaign_metrics(
+        company_id, db, request.model, request.start_date, request.end_date
+    )
+    try:
+        result = BudgetAllocator.optimize(
+            company_id,
+            request.model,
+            metrics,
+            request.total_budget,
+            min_per_campaign=request.min_per_campaign,
+            max_per_campaign=request.max_per_campaign,
+            campaign_bounds={k: (v.min, v.max) for k, v in request.campaign_bounds.items()},
+            platform_bounds={k: (v.min, v.max) for k, v in request.platform_bounds.items()},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"company_id": company_id, "model": request.model, **result}
+
+@router.post("/budget-simulation/{company_id}")
+def simulate_budget(company_id: int, request: BudgetSimulationRequest, db: Session = Depends(get_db)):
+    """Simulate the revenue and ROAS distribution of proposed campaign budgets"""
+    from app.ml.budget_simulation import BudgetSimulator
+    company = db.query(CompanyModel).filter(CompanyModel.id == company_id).first()
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+    if request.scenarios > settings.SIMULATION_MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.SIMULATION_MAX_SCENARIOS} scenarios")
+    if any(budget < 0 for budget in request.budgets.values()):
+        raise HTTPException(status_code=400, detail="Budgets must be non-negative")
+    
+    history = BudgetSimulator.get_campaign_history(company_id, db)
+    try:
+        result = BudgetSimulator.simulate(history, request.budgets, request.scenarios, seed=request.seed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"company_id": company_id, **result}
+
+@router.get("/budget-rules/{company_id}", response_model=BudgetRuleSet)
+def get_budget_rules(company_id: int, db: Session = Depends(get_db)):
+    """Get the budget recommendation rules in effect for a company"""
+    from app.ml.budget_rules import DEFAULT_RULES
+    company = db.query(CompanyModel).filter(CompanyModel.id == company_id).first()
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+    
+    rule_set = db.query(BudgetRuleSetModel).filter(BudgetRuleSetModel.company_id == company_id).first()
+    if rule_set is None:
+        return {"company_id": company_id, "custom": False, "rules": DEFAULT_RULES}
+    return {"company_id": company_id, "custom": True, "rules": rule_set.rules, "updated_at": rule_set.updated_at}
+
+@router.put("/budget-rules/{company_id}", response_model=BudgetRuleSet)
+def update_budget_rules(company_id: int, rule_set: BudgetRuleSetUpdate, db: Session = Depends(get_db)):
+    """Replace a company's budget recommendation rules"""
+    from app.ml.budget_rules import BudgetRuleEngine
+    company = db.query(CompanyModel).filter(CompanyModel.id == company_id).first()
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+    
+    rules = [rule.dict(exclude_none=True) for rule in rule_set.rules]
+    try:
+        BudgetRuleEngine.validate_rules(rules)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    db_rule_set = db.query(BudgetRuleSetModel).filter(BudgetRuleSetModel.company_id == company_id).first()
+    if db_rule_set is None:
+        db_rule_set = BudgetRuleSetModel(company_id=company_id, rules=rules)
+        db.add(db_rule_set)
+    else:
+        db_rule_set.rules = rules
+    db.commit()
+    db.refresh(db_rule_set)
+    return {"company_id": company_id, "custom": True, "rules": db_rule_set.rules, "updated_at": db_rule_set.updated_at}
+
+@router.delete("/budget-rules/{company_id}")
+def reset_budget_rules(company_id: int, db: Session = Depends(get_db)):
+    """Revert a company to the default budget recommendation rules"""
+    from app.ml.budget_rules import BudgetRuleEngine
+    company = db.query(CompanyModel).filter(CompanyModel.id == company_id).first()
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+    
+    BudgetRuleEngine.remove_company(company_id, db)
+    db.commit()
+    return {"message": "Budget rules reset to defaults"}
@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List
-from app.db.database import get_db
+from app.core.cache import ResponseCache
+from app.db.database import get_db, get_read_db
 from app.schemas.attribution import AttributionResult
 from app.models import (
     Lead as LeadModel,
@@ -34,6 +35,7 @@ def calculate_attribution(
     # Save results
     if result["results"]:
         AttributionService.save_attribution_results(db, result["results"])
+        ResponseCache.invalidate(lead.company_id)
     
     return {
         "lead_id": lead_id,
@@ -52,7 +54,7 @@ def calculate_attribution(
 def get_revenue_by_campaign(
     company_id: int,
     model: str = "linear",
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get attributed revenue by campaign"""
     company = db.query(CompanyModel).filter(CompanyModel.id == company_id).first()
@@ -64,31 +66,42 @@ def get_revenue_by_campaign(
 @router.get("/summary/{company_id}")
 def get_attribution_summary(
     company_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get complete attribution summary for company"""
     company = db.query(CompanyModel).filter(CompanyModel.id == company_id).first()
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     
-    # Get total attributed revenue by model
-    models = ["linear", "first_touch", "last_touch", "time_decay"]
-    summary = {}
+    return ResponseCache.get_or_compute(
+        "attribution_summary", company_id, {}, lambda: _attribution_summary(company_id, company.name, db)
+    )
+
+def _attribution_summary(company_id: int, company_name: str, db: Session) -> dict:
+    """Attributed revenue and lead count per model for one company's leads"""
+    totals = {
+        model: (revenue, count)
+        for model, revenue, count in db.query(
+            AttributionResultModel.attribution_model,
+            func.sum(AttributionResultModel.attributed_revenue),
+            func.count(AttributionResultModel.lead_id.distinct()),
+        ).join(
+            LeadModel, LeadModel.id == AttributionResultModel.lead_id
+        ).filter(
+            LeadModel.company_id == company_id
+        ).group_by(AttributionResultModel.attribution_model).all()
+    }
     
-    for model in models:
-        total_revenue = db.query(func.sum(AttributionResultModel.attributed_revenue)).filter(
-            AttributionResultModel.attribution_model == model
-        ).scalar() or 0.0
-        
+    summary = {}
+    for model in ["linear", "first_touch", "last_touch", "time_decay"]:
+        total_revenue, leads_attributed = totals.get(model, (0.0, 0))
         summary[model] = {
-            "total_attributed_revenue": float(total_revenue),
-            "leads_attributed": db.query(func.count(AttributionResultModel.id)).filter(
-                AttributionResultModel.attribution_model == model
-            ).scalar() or 0
+            "total_attributed_revenue": float(total_revenue or 0.0),
+            "leads_attributed": leads_attributed
         }
     
     return {
         "company_id": company_id,
-        "company_name": company.name,
+        "company_name": company_name,
         "attribution_summary": summary
     }
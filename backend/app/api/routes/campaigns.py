@@ -1,8 +1,15 @@
+import time
+from datetime import date
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from app.core.cache import ResponseCache
 from app.db.database import get_db
-from app.schemas.campaign import Campaign, CampaignCreate, CampaignUpdate
+from app.schemas.campaign import Campaign, CampaignCreate, CampaignUpdate, CampaignDailyStatsIngest
 from app.models import Campaign as CampaignModel, Company as CompanyModel
+from app.services.lead_features import LeadFeatureService
+from app.services.campaign_stats import CampaignStatsService
+from app.services.deletion import DeletionService
 
 router = APIRouter(prefix="/api/campaigns", tags=["campaigns"])
 
@@ -16,9 +23,58 @@ def create_campaign(campaign: CampaignCreate, db: Session = Depends(get_db)):
     db_campaign = CampaignModel(**campaign.dict())
     db.add(db_campaign)
     db.commit()
+    ResponseCache.invalidate(db_campaign.company_id)
     db.refresh(db_campaign)
     return db_campaign
 
+@router.post("/daily-stats")
+def ingest_daily_stats(payload: CampaignDailyStatsIngest, db: Session = Depends(get_db)):
+    """Bulk upsert daily campaign performance and roll it up into campaign totals"""
+    from app.ml.scoring import LeadScoringService
+    started = time.perf_counter()
+    rows = [row.dict() for row in payload.rows]
+    if not rows:
+        return {"rows": 0, "campaigns": 0, "elapsed_ms": 0.0}
+    
+    unknown = CampaignStatsService.unknown_campaigns([row["campaign_id"] for row in rows], db)
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Campaigns not found: {unknown[:20]}")
+    
+    campaign_ids = CampaignStatsService.upsert_daily(rows, db)
+    CampaignStatsService.rollup(campaign_ids, db)
+    
+    # Rolled-up cost is a lead feature; fan the change out like a cost update
+    affected_leads = LeadFeatureService.refresh_for_campaigns(campaign_ids, db)
+    LeadScoringService.refresh_scores(db, lead_ids=affected_leads)
+    db.commit()
+    ResponseCache.invalidate(*CampaignStatsService.company_ids(campaign_ids, db))
+    
+    return {
+        "rows": len(rows),
+        "campaigns": len(campaign_ids),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+@router.get("/{campaign_id}/daily-stats")
+def get_daily_stats(
+    campaign_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Get daily performance for a campaign, with cumulative spend for pacing"""
+    campaign = db.query(CampaignModel).filter(CampaignModel.id == campaign_id).first()
+    if not campaign:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    
+    days = CampaignStatsService.get_daily_stats(campaign_id, start_date, end_date, db)
+    return {
+        "campaign_id": campaign_id,
+        "budget": campaign.budget,
+        "total_cost": days[-1]["cumulative_cost"] if days else 0.0,
+        "days": days,
+    }
+
 @router.get("/{campaign_id}", response_model=Campaign)
 def get_campaign(campaign_id: int, db: Session = Depends(get_db)):
     """Get campaign by ID"""
@@ -39,25 +95,46 @@ def list_campaigns_by_company(company_id: int, db: Session = Depends(get_db)):
 @router.put("/{campaign_id}", response_model=Campaign)
 def update_campaign(campaign_id: int, campaign: CampaignUpdate, db: Session = Depends(get_db)):
     """Update campaign"""
+    from app.ml.scoring import LeadScoringService
     db_campaign = db.query(CampaignModel).filter(CampaignModel.id == campaign_id).first()
     if not db_campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
     update_data = campaign.dict(exclude_unset=True)
+    rolled_up = sorted({"impressions", "clicks", "cost"} & update_data.keys())
+    if rolled_up and db_campaign.baseline_cost is not None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campaign totals ({', '.join(rolled_up)}) are rolled up from daily stats; "
+                   "post changes to /api/campaigns/daily-stats",
+        )
+    
     for key, value in update_data.items():
         setattr(db_campaign, key, value)
     
+    # Campaign spend is a lead feature; fan the change out to leads that touched it
+    if "cost" in update_data:
+        db.flush()
+        affected_leads = LeadFeatureService.refresh_for_campaign(campaign_id, db)
+        LeadScoringService.refresh_scores(db, lead_ids=affected_leads)
+    
     db.commit()
+    ResponseCache.invalidate(db_campaign.company_id)
     db.refresh(db_campaign)
     return db_campaign
 
 @router.delete("/{campaign_id}")
 def delete_campaign(campaign_id: int, db: Session = Depends(get_db)):
     """Delete campaign"""
-    campaign = db.query(CampaignModel).filter(CampaignModel.id == campaign_id).first()
+    from app.ml.scoring import LeadScoringService
+    campaign = db.query(CampaignModel.company_id).filter(CampaignModel.id == campaign_id).first()
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
-    db.delete(campaign)
+    company_id = campaign.company_id
+    DeletionService.delete_campaign(campaign_id, db)
+    affected_leads = LeadFeatureService.refresh_for_campaign(campaign_id, db)
+    LeadScoringService.refresh_scores(db, lead_ids=affected_leads)
     db.commit()
+    ResponseCache.invalidate(company_id)
     return {"message": "Campaign deleted"}
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from app.core.cache import ResponseCache
 from app.db.database import get_db
 from app.schemas.company import Company, CompanyCreate, CompanyUpdate
 from app.models import Company as CompanyModel
+from app.services.lead_features import LeadFeatureService
+from app.services.deletion import DeletionService
 
 router = APIRouter(prefix="/api/companies", tags=["companies"])
 
@@ -35,6 +38,7 @@ def list_companies(db: Session = Depends(get_db)):
 @router.put("/{company_id}", response_model=Company)
 def update_company(company_id: int, company: CompanyUpdate, db: Session = Depends(get_db)):
     """Update company"""
+    from app.ml.scoring import LeadScoringService
     db_company = db.query(CompanyModel).filter(CompanyModel.id == company_id).first()
     if not db_company:
         raise HTTPException(status_code=404, detail="Company not found")
@@ -43,17 +47,23 @@ def update_company(company_id: int, company: CompanyUpdate, db: Session = Depend
     for key, value in update_data.items():
         setattr(db_company, key, value)
     
+    if "industry" in update_data:
+        LeadFeatureService.refresh_for_company(company_id, db_company.industry, db)
+        LeadScoringService.refresh_scores(db, company_id=company_id)
+    
     db.commit()
+    ResponseCache.invalidate(company_id)
     db.refresh(db_company)
     return db_company
 
 @router.delete("/{company_id}")
 def delete_company(company_id: int, db: Session = Depends(get_db)):
-    """Delete company"""
-    company = db.query(CompanyModel).filter(CompanyModel.id == company_id).first()
+    """Delete company with all its data; large tenants should use the admin purge instead"""
+    company = db.query(CompanyModel.id).filter(CompanyModel.id == company_id).first()
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     
-    db.delete(company)
+    DeletionService.delete_company(company_id, db)
     db.commit()
+    ResponseCache.invalidate(company_id)
     return {"message": "Company deleted"}
@@ -1,24 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
+from app.core.cache import ResponseCache
 from app.db.database import get_db
-from app.schemas.lead import Lead, LeadCreate, LeadUpdate
+from app.schemas.lead import Lead, LeadCreate, LeadUpdate, LeadScoreRequest, LeadScoreResult
 from app.models import Lead as LeadModel, Company as CompanyModel, Campaign as CampaignModel
+from app.services.deletion import DeletionService
+from app.services.lead_features import LeadFeatureService
+from app.services.lead_ingestion import LeadIngestionService
 
 router = APIRouter(prefix="/api/leads", tags=["leads"])
 
 @router.post("/", response_model=Lead)
 def create_lead(lead: LeadCreate, db: Session = Depends(get_db)):
     """Create a new lead"""
+    from app.ml.scoring import LeadScoringService
     company = db.query(CompanyModel).filter(CompanyModel.id == lead.company_id).first()
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     
+    existing = db.query(LeadModel.id).filter(
+        LeadModel.company_id == lead.company_id, LeadModel.email == lead.email
+    ).first()
+    if existing:
+        raise HTTPException(status_code=400, detail="Lead already exists")
+    
     db_lead = LeadModel(**lead.dict())
     db.add(db_lead)
+    db.flush()
+    LeadFeatureService.refresh_leads([db_lead.id], db)
+    LeadScoringService.refresh_scores(db, lead_ids=[db_lead.id])
     db.commit()
+    ResponseCache.invalidate(db_lead.company_id)
     db.refresh(db_lead)
     return db_lead
 
+@router.post("/bulk")
+async def bulk_create_leads(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    fmt: Optional[str] = Query(None, alias="format"),
+    db: Session = Depends(get_db)
+):
+    """Import a streamed NDJSON or CSV body; features, scores and attribution follow in the background"""
+    if fmt is None:
+        fmt = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    if fmt not in ["ndjson", "csv"]:
+        raise HTTPException(status_code=400, detail="Format must be ndjson or csv")
+    
+    lead_ids, report = await LeadIngestionService.ingest(request.stream(), fmt, db)
+    if lead_ids:
+        background_tasks.add_task(LeadIngestionService.process_new_leads, lead_ids)
+    return report
+
+@router.post("/score", response_model=list[LeadScoreResult])
+async def score_leads(leads: List[LeadScoreRequest]):
+    """Score incoming leads in real time; concurrent requests share one vectorized batch
+    
+    Leads of an unknown company get an `error` entry instead of failing the whole request.
+    """
+    from app.ml.scoring import lead_scorer
+    if not leads:
+        return []
+    
+    return await asyncio.gather(*(lead_scorer.submit(lead) for lead in leads))
+
+@router.get("/score/stats")
+def get_scoring_stats():
+    """Micro-batching scorer metrics (batch sizes, queue latency)"""
+    from app.ml.scoring import lead_scorer
+    return lead_scorer.stats()
+
 @router.get("/{lead_id}", response_model=Lead)
 def get_lead(lead_id: int, db: Session = Depends(get_db)):
     """Get lead by ID"""
@@ -39,25 +92,40 @@ def list_leads_by_company(company_id: int, db: Session = Depends(get_db)):
 @router.put("/{lead_id}", response_model=Lead)
 def update_lead(lead_id: int, lead: LeadUpdate, db: Session = Depends(get_db)):
     """Update lead"""
+    from app.ml.scoring import LeadScoringService
     db_lead = db.query(LeadModel).filter(LeadModel.id == lead_id).first()
     if not db_lead:
         raise HTTPException(status_code=404, detail="Lead not found")
     
     update_data = lead.dict(exclude_unset=True)
+    if update_data.get("email") is not None:
+        existing = db.query(LeadModel.id).filter(
+            LeadModel.company_id == db_lead.company_id,
+            LeadModel.email == update_data["email"],
+            LeadModel.id != lead_id,
+        ).first()
+        if existing:
+            raise HTTPException(status_code=400, detail="Lead already exists")
+    
     for key, value in update_data.items():
         setattr(db_lead, key, value)
     
+    db.flush()
+    LeadFeatureService.refresh_leads([db_lead.id], db)
+    LeadScoringService.refresh_scores(db, lead_ids=[db_lead.id])
     db.commit()
+    ResponseCache.invalidate(db_lead.company_id)
     db.refresh(db_lead)
     return db_lead
 
 @router.delete("/{lead_id}")
 def delete_lead(lead_id: int, db: Session = Depends(get_db)):
     """Delete lead"""
-    lead = db.query(LeadModel).filter(LeadModel.id == lead_id).first()
+    lead = db.query(LeadModel.company_id).filter(LeadModel.id == lead_id).first()
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
     
-    db.delete(lead)
+    DeletionService.delete_leads([lead_id], db)
     db.commit()
+    ResponseCache.invalidate(lead.company_id)
     return {"message": "Lead deleted"}
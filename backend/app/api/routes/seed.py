@@ -1,15 +1,20 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from app.db.database import SessionLocal
+from app.core.config import get_settings
+from app.db.database import SessionLocal, get_db
 from app.models import Company as CompanyModel, Campaign as CampaignModel, Lead as LeadModel
 from app.services.attribution import AttributionService
+from app.services.lead_features import LeadFeatureService
+from app.schemas.synthetic import SyntheticDataRequest, SyntheticDataResult
 import random
 
 router = APIRouter(prefix="/api/seed", tags=["seed"])
+settings = get_settings()
 
 def seed_database():
     """Seed database with demo data"""
+    from app.ml.scoring import LeadScoringService
     db = SessionLocal()
     
     try:
@@ -118,14 +123,11 @@ def seed_database():
         db.commit()
         
         # Calculate attribution for all leads using all models
-        attribution_models = ["linear", "first_touch", "last_touch", "time_decay"]
-        leads = db.query(LeadModel).filter(LeadModel.company_id == company.id).all()
-        for lead in leads:
-            if lead.touchpoints:
-                for model in attribution_models:
-                    result = AttributionService.calculate_attribution_for_lead(lead.id, model, db)
-                    if result["results"]:
-                        AttributionService.save_attribution_results(db, result["results"])
+        lead_ids = [lead_id for (lead_id,) in db.query(LeadModel.id).filter(LeadModel.company_id == company.id).all()]
+        LeadFeatureService.refresh_leads(lead_ids, db)
+        LeadScoringService.refresh_scores(db, company_id=company.id)
+        AttributionService.calculate_attribution_batch(lead_ids, db)
+        db.commit()
         
         return {"message": "Database seeded successfully with all attribution models", "company_id": company.id}
     
@@ -139,3 +141,18 @@ def seed_database():
 def trigger_seed():
     """Trigger database seeding"""
     return seed_database()
+
+@router.post("/synthetic", response_model=SyntheticDataResult)
+def generate_synthetic_data(request: SyntheticDataRequest, db: Session = Depends(get_db)):
+    """Generate a deterministic synthetic dataset for load and benchmark runs"""
+    from app.services.synthetic_data import SyntheticDataGenerator
+    if request.companies * request.leads_per_company > settings.SYNTHETIC_MAX_LEADS_PER_REQUEST:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.SYNTHETIC_MAX_LEADS_PER_REQUEST} leads per request; use generate_data.py for more",
+        )
+    
+    try:
+        return SyntheticDataGenerator.generate(db, **request.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
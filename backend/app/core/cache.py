@@ -0,0 +1,373 @@
+import hashlib
+import json
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from app.db.database import engine
+from app.models import CacheVersion
+from .config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class LocalCacheBackend:
+    """Size-bounded LRU with per-entry TTL, private to this process
+    
+    Data versions live in the cache_versions table so a write in one worker invalidates
+    the others; each worker trusts its copy of a version for `version_ttl` seconds.
+    """
+    
+    errors: Tuple = (SQLAlchemyError,)
+    
+    def __init__(self, max_entries: int, version_ttl: float):
+        self.max_entries = max_entries
+        self.version_ttl = version_ttl
+        self._entries: OrderedDict = OrderedDict()
+        # Versions live outside the LRU: evicting one would resurrect entries it had invalidated
+        self._versions: Dict[int, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+    
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def version(self, company_id: int) -> int:
+        cached = self._versions.get(company_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        with engine.connect() as conn:
+            version = conn.execute(
+                select(CacheVersion.version).where(CacheVersion.company_id == company_id)
+            ).scalar() or 0
+        with self._lock:
+            self._versions[company_id] = (time.monotonic() + self.version_ttl, version)
+        return version
+    
+    def bump(self, company_id: int) -> None:
+        if engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(CacheVersion).values(company_id=company_id, version=1).on_conflict_do_update(
+            index_elements=[CacheVersion.company_id], set_={"version": CacheVersion.version + 1}
+        ).returning(CacheVersion.version)
+        with engine.begin() as conn:
+            version = conn.execute(statement).scalar()
+        # This worker sees its own write at once
+        with self._lock:
+            self._versions[company_id] = (time.monotonic() + self.version_ttl, version)
+    
+    def acquire(self, key: str) -> bool:
+        # Concurrent misses in this process are already coalesced by ResponseCache
+        return True
+    
+    def release(self, key: str) -> None:
+        pass
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        return {
+            "backend": "local",
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+class RedisCacheBackend:
+    """Cache shared by all workers on a Redis-protocol server (Redis, Valkey, KeyDB, ...)
+    
+    Expiry is per key; size-bounded eviction is the server's maxmemory policy
+    (allkeys-lru), so evictions are read from its INFO stats.
+    """
+    
+    def __init__(self, url: str, prefix: str):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError(
+                "CACHE_REDIS_URL is set but the redis package is not installed; "
+                "pip install -r requirements-redis.txt"
+            ) from None
+        self.client = redis.Redis.from_url(url, socket_timeout=1.0, socket_connect_timeout=1.0)
+        self.prefix = prefix
+        self.errors = (redis.RedisError, OSError, pickle.UnpicklingError)
+    
+    def get(self, key: str) -> Tuple[bool, Any]:
+        data = self.client.get(key)
+        if data is None:
+            return False, None
+        return True, pickle.loads(data)
+    
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.client.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), px=int(ttl * 1000))
+    
+    def version(self, company_id: int) -> int:
+        key = f"{self.prefix}:version:{company_id}"
+        value = self.client.get(key)
+        if value is None:
+            # A fresh token rather than 0, so an evicted version never repeats an old one
+            self.client.set(key, time.time_ns(), nx=True)
+            value = self.client.get(key)
+        return int(value)
+    
+    def bump(self, company_id: int) -> None:
+        self.client.set(f"{self.prefix}:version:{company_id}", time.time_ns())
+    
+    def acquire(self, key: str) -> bool:
+        """Cross-worker single-flight: only the lock holder computes a missing entry"""
+        lock_ms = int(settings.CACHE_LOCK_TIMEOUT_SECONDS * 1000)
+        return bool(self.client.set(f"{key}:lock", b"1", nx=True, px=lock_ms))
+    
+    def release(self, key: str) -> None:
+        self.client.delete(f"{key}:lock")
+    
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=f"{self.prefix}:*", count=1000))
+        for i in range(0, len(keys), 1000):
+            self.client.delete(*keys[i:i + 1000])
+    
+    def stats(self) -> Dict:
+        stats = {"backend": "redis", "entries": None, "evictions": None, "expirations": None}
+        try:
+            info = self.client.info("stats")
+            stats["evictions"] = info.get("evicted_keys")
+            stats["expirations"] = info.get("expired_keys")
+            stats["entries"] = self.client.dbsize()
+        except self.errors as e:
+            logger.warning("Cache backend stats unavailable: %s", e)
+        return stats
+
+class _Flight:
+    """One in-process computation that concurrent misses for the same key wait on"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.failed = False
+        self.value = None
+
+class ResponseCache:
+    """Read-through cache for analytics results, keyed by company, parameters and data version
+    
+    Writes bump a company's data version (after they commit) instead of deleting
+    keys, so stale entries are never read again and simply age out. Cached values
+    are shared between callers and must be treated as read-only.
+    """
+    
+    _lock = threading.Lock()
+    _backend = None
+    _flights: Dict[str, _Flight] = {}
+    # namespace -> {"hits": n, "misses": n, "coalesced": n}
+    _counts: Dict[str, Dict[str, int]] = {}
+    _errors = 0
+    
+    @staticmethod
+    def backend():
+        if ResponseCache._backend is None:
+            with ResponseCache._lock:
+                if ResponseCache._backend is None:
+                    if settings.CACHE_REDIS_URL:
+                        ResponseCache._backend = RedisCacheBackend(settings.CACHE_REDIS_URL, settings.CACHE_KEY_PREFIX)
+                    else:
+                        ResponseCache._backend = LocalCacheBackend(
+                            settings.CACHE_MAX_ENTRIES, settings.CACHE_VERSION_TTL_SECONDS
+                        )
+        return ResponseCache._backend
+    
+    @staticmethod
+    def _count(namespace: str, counter: str) -> None:
+        with ResponseCache._lock:
+            counts = ResponseCache._counts.setdefault(namespace, {"hits": 0, "misses": 0, "coalesced": 0})
+            counts[counter] += 1
+    
+    @staticmethod
+    def _backend_failed(error: Exception) -> None:
+        with ResponseCache._lock:
+            ResponseCache._errors += 1
+        logger.warning("Cache backend error, computing uncached: %s", error)
+    
+    @staticmethod
+    def key(namespace: str, company_id: int, params: Dict, version: int) -> str:
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        return f"{settings.CACHE_KEY_PREFIX}:{namespace}:{company_id}:{version}:{digest}"
+    
+    @staticmethod
+    def get_or_compute(namespace: str, company_id: int, params: Dict, compute: Callable[[], Any]) -> Any:
+        """Cached result of compute(); concurrent misses for one key run it once"""
+        if not settings.CACHE_ENABLED:
+            return compute()
+        
+        backend = ResponseCache.backend()
+        try:
+            key = ResponseCache.key(namespace, company_id, params, backend.version(company_id))
+            found, value = backend.get(key)
+        except backend.errors as e:
+            ResponseCache._backend_failed(e)
+            return compute()
+        if found:
+            ResponseCache._count(namespace, "hits")
+            return value
+        
+        with ResponseCache._lock:
+            flight = ResponseCache._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = ResponseCache._flights[key] = _Flight()
+        
+        if not leader:
+            ResponseCache._count(namespace, "coalesced")
+            if flight.done.wait(settings.CACHE_LOCK_TIMEOUT_SECONDS) and not flight.failed:
+                return flight.value
+            # The leader failed or is stuck; errors surface to each caller on its own
+            return compute()
+        
+        ResponseCache._count(namespace, "misses")
+        try:
+            flight.value = ResponseCache._compute_shared(namespace, key, compute, backend)
+            return flight.value
+        except BaseException:
+            flight.failed = True
+            raise
+        finally:
+            with ResponseCache._lock:
+                del ResponseCache._flights[key]
+            flight.done.set()
+    
+    @staticmethod
+    def _compute_shared(namespace: str, key: str, compute: Callable[[], Any], backend) -> Any:
+        """Compute and store under the backend's lock, or wait for the worker that holds it"""
+        try:
+            acquired = backend.acquire(key)
+        except backend.errors as e:
+            ResponseCache._backend_failed(e)
+            return compute()
+        
+        if not acquired:
+            deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(settings.CACHE_LOCK_POLL_MS / 1000)
+                try:
+                    found, value = backend.get(key)
+                except backend.errors as e:
+                    ResponseCache._backend_failed(e)
+                    break
+                if found:
+                    ResponseCache._count(namespace, "coalesced")
+                    return value
+            return compute()
+        
+        try:
+            value = compute()
+            try:
+                backend.set(key, value, settings.CACHE_TTL_SECONDS)
+            except backend.errors as e:
+                ResponseCache._backend_failed(e)
+            return value
+        finally:
+            try:
+                backend.release(key)
+            except backend.errors as e:
+                ResponseCache._backend_failed(e)
+    
+    @staticmethod
+    def invalidate(*company_ids: int) -> None:
+        """Bump data versions; call after the write commits"""
+        if not settings.CACHE_ENABLED:
+            return
+        backend = ResponseCache.backend()
+        for company_id in set(company_ids):
+            try:
+                backend.bump(company_id)
+            except backend.errors as e:
+                ResponseCache._backend_failed(e)
+    
+    @staticmethod
+    def clear() -> None:
+        backend = ResponseCache.backend()
+        try:
+            backend.clear()
+        except backend.errors as e:
+            ResponseCache._backend_failed(e)
+    
+    @staticmethod
+    def stats() -> Dict:
+        with ResponseCache._lock:
+            namespaces = {namespace: dict(counts) for namespace, counts in sorted(ResponseCache._counts.items())}
+            errors = ResponseCache._errors
+        totals = {
+            counter: sum(counts[counter] for counts in namespaces.values())
+            for counter in ["hits", "misses", "coalesced"]
+        }
+        lookups = totals["hits"] + totals["misses"]
+        return {
+            "enabled": settings.CACHE_ENABLED,
+            "ttl_seconds": settings.CACHE_TTL_SECONDS,
+            **ResponseCache.backend().stats(),
+            **totals,
+            "hit_rate": round(totals["hits"] / lookups, 4) if lookups else 0.0,
+            "backend_errors": errors,
+            "namespaces": namespaces,
+        }
+    
+    @staticmethod
+    def render() -> str:
+        """Cache counters in Prometheus text exposition format"""
+        stats = ResponseCache.stats()
+        lines = []
+        for counter, help_text in [
+            ("hits", "Cache lookups answered from the cache."),
+            ("misses", "Cache lookups that computed the result."),
+            ("coalesced", "Cache misses that waited for a concurrent computation instead of repeating it."),
+        ]:
+            lines += [
+                f"# HELP pipelineiq_cache_{counter}_total {help_text}",
+                f"# TYPE pipelineiq_cache_{counter}_total counter",
+            ]
+            for namespace, counts in stats["namespaces"].items():
+                lines.append(f'pipelineiq_cache_{counter}_total{{namespace="{namespace}"}} {counts[counter]}')
+        
+        for name, help_text, value in [
+            ("evictions", "Entries evicted to stay within the size bound.", stats["evictions"]),
+            ("expirations", "Entries dropped after their TTL.", stats["expirations"]),
+            ("backend_errors", "Cache backend failures; the result was computed uncached.", stats["backend_errors"]),
+        ]:
+            if value is not None:
+                lines += [
+                    f"# HELP pipelineiq_cache_{name}_total {help_text}",
+                    f"# TYPE pipelineiq_cache_{name}_total counter",
+                    f"pipelineiq_cache_{name}_total {value}",
+                ]
+        if stats["entries"] is not None:
+            lines += [
+                "# HELP pipelineiq_cache_entries Entries currently cached.",
+                "# TYPE pipelineiq_cache_entries gauge",
+                f"pipelineiq_cache_entries {stats['entries']}",
+            ]
+        return "\n".join(lines) + "\n"
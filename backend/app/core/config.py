@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 import os
 
 class Settings(BaseSettings):
@@ -7,12 +8,74 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./pipelineiq.db"
+    READ_REPLICA_URL: Optional[str] = None  # GET analytics reads go here when set; replica lag can be cached
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20  # connections opened beyond the pool under bursts
+    DB_POOL_TIMEOUT: float = 10.0  # seconds to wait for a free connection before failing
+    DB_POOL_RECYCLE: int = 1800  # reconnect after this many seconds, ahead of server/proxy idle timeouts
+    SQLITE_JOURNAL_MODE: str = "WAL"  # readers no longer block behind a writer
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # durable in WAL mode except for the last commits on power loss
+    SQLITE_MMAP_SIZE: int = 256 * 2 ** 20
+    SQLITE_CACHE_SIZE: int = -64000  # negative is KiB per connection
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # wait for a competing writer instead of failing with "locked"
     
     # Security
     SECRET_KEY: str = "dev-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # ML
+    DEAL_MODEL_TRAIN_DEBOUNCE_SECONDS: int = 30
+    DEAL_MODEL_TRAINING_MODE: str = "full"  # full, incremental, select
+    DEAL_MODEL_OUTCOME_OVERLAP_SECONDS: float = 600.0  # re-read window behind the incremental checkpoint
+    DEAL_MODEL_DIR: str = "app/ml/models"
+    DEAL_MODEL_PER_COMPANY: bool = True
+    DEAL_MODEL_PER_INDUSTRY: bool = False
+    DEAL_MODEL_MIN_COMPANY_SAMPLES: int = 50  # smaller tenants fall back to the global model
+    DEAL_MODEL_TRAIN_WORKERS: int = 2
+    DEAL_MODEL_SELECTION_BUDGET_SECONDS: float = 30.0
+    DEAL_MODEL_CV_FOLDS: int = 5
+    DEAL_MODEL_MAX_LATENCY_US: float = 50.0  # per-row inference latency ceiling
+    SCORING_BATCH_MAX_SIZE: int = 64
+    SCORING_BATCH_MAX_WAIT_MS: float = 5.0
+    SCORING_STORE_EXPLANATIONS: bool = True  # persist per-feature contributions with each score
+    BUDGET_CURVE_SHRINKAGE: float = 1.0  # weight of the platform curve against a campaign's own return
+    BUDGET_CURVE_CACHE_SIZE: int = 4096  # fitted (company, model, platform) curves kept per process
+    SIMULATION_MAX_SCENARIOS: int = 100000
+    SIMULATION_TIME_BUDGET_MS: float = 500.0  # stop drawing scenarios after this and report what ran
+    
+    # Ingestion
+    LEAD_BULK_CHUNK_SIZE: int = 5000  # rows validated and inserted per transaction
+    LEAD_BULK_MAX_ERRORS: int = 1000  # per-row errors returned in the import report
+    SYNTHETIC_BATCH_SIZE: int = 10000  # generated leads inserted per transaction
+    SYNTHETIC_MAX_LEADS_PER_REQUEST: int = 1000000  # the CLI is not capped
+    
+    # Deletion
+    PURGE_BATCH_SIZE: int = 2000  # leads, with their dependent rows, deleted per transaction by a tenant purge
+    PURGE_PAUSE_MS: float = 50.0  # pause between purge batches so other writers get the database
+    
+    # Startup
+    MIGRATE_ON_STARTUP: bool = False  # single-process dev servers only; deploys run `python migrate.py` first
+    STARTUP_WARMUP: bool = True  # import ML modules and load published deal models in the background
+
+    # Observability
+    METRICS_STATEMENT_BUDGET: int = 25  # SQL statements per request before it is logged as a likely N+1
+    METRICS_REPEATED_STATEMENT_THRESHOLD: int = 10  # same statement this often in one request is an N+1
+    ADMIN_TOKEN: Optional[str] = None  # enables admin routes and request profiling when set
+    PROFILING_SAMPLE_RATE: float = 0.0  # fraction of all requests profiled without opting in
+    PROFILING_INTERVAL_MS: float = 2.0
+    PROFILING_RING_SIZE: int = 50  # most recent profiles kept in memory
+    
+    # Cache
+    CACHE_ENABLED: bool = True
+    CACHE_TTL_SECONDS: float = 300.0  # upper bound on staleness; writes invalidate sooner
+    CACHE_MAX_ENTRIES: int = 2048  # in-process LRU bound
+    CACHE_VERSION_TTL_SECONDS: float = 1.0  # without Redis, how long a worker may miss another worker's write
+    CACHE_REDIS_URL: Optional[str] = None  # share one cache between workers, e.g. redis://localhost:6379/0
+    CACHE_KEY_PREFIX: str = "pipelineiq"
+    CACHE_LOCK_TIMEOUT_SECONDS: float = 30.0  # longest a miss waits on a concurrent computation
+    CACHE_LOCK_POLL_MS: float = 50.0
+    
     # CORS
     ORIGINS: list = [
         "http://localhost:3000",
@@ -0,0 +1,189 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from .config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+STATEMENT_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 250]
+
+# Per-request SQL counters; None outside a request (background threads, startup)
+_request_stats: ContextVar[Optional[Dict]] = ContextVar("request_stats", default=None)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+    
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+    
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+    
+    def render(self, name: str, labels: str) -> List[str]:
+        lines = [f'{name}_bucket{{{labels},le="{bound}"}} {count}' for bound, count in zip(self.buckets, self.counts)]
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+class RequestMetrics:
+    """Process-wide per-route latency and SQL metrics, rendered in Prometheus text format"""
+    
+    _lock = threading.Lock()
+    # (method, route) -> series
+    _latency: Dict[Tuple[str, str], Histogram] = {}
+    _statements: Dict[Tuple[str, str], Histogram] = {}
+    _sql_seconds: Dict[Tuple[str, str], float] = {}
+    # (method, route, status) -> count
+    _requests: Dict[Tuple[str, str, int], int] = {}
+    # (method, route) -> requests over the statement budget or repeating one statement
+    _n_plus_one: Dict[Tuple[str, str], int] = {}
+    
+    @staticmethod
+    def instrument(engine: Engine) -> None:
+        """Count statements and SQL time against the current request"""
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            stats = _request_stats.get()
+            if stats is not None and stats["finished"] is None:
+                conn.info.setdefault("query_started", []).append(time.perf_counter())
+        
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            stats = _request_stats.get()
+            if stats is not None and stats["finished"] is None and conn.info.get("query_started"):
+                stats["sql_seconds"] += time.perf_counter() - conn.info["query_started"].pop()
+                stats["statements"] += 1
+                stats["texts"][statement] += 1
+    
+    @staticmethod
+    def start_request() -> Tuple[Dict, object]:
+        stats = {"statements": 0, "sql_seconds": 0.0, "texts": Counter(), "finished": None}
+        return stats, _request_stats.set(stats)
+    
+    @staticmethod
+    def end_request(token: object) -> None:
+        _request_stats.reset(token)
+    
+    @staticmethod
+    def observe(method: str, route: str, status: int, seconds: float, stats: Dict) -> None:
+        """Record one finished request and flag likely N+1 query patterns"""
+        key = (method, route)
+        repeated, repeats = stats["texts"].most_common(1)[0] if stats["texts"] else ("", 0)
+        over_budget = stats["statements"] > settings.METRICS_STATEMENT_BUDGET
+        looping = repeats >= settings.METRICS_REPEATED_STATEMENT_THRESHOLD
+        
+        with RequestMetrics._lock:
+            RequestMetrics._latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            RequestMetrics._statements.setdefault(key, Histogram(STATEMENT_BUCKETS)).observe(stats["statements"])
+            RequestMetrics._sql_seconds[key] = RequestMetrics._sql_seconds.get(key, 0.0) + stats["sql_seconds"]
+            status_key = (method, route, status)
+            RequestMetrics._requests[status_key] = RequestMetrics._requests.get(status_key, 0) + 1
+            if over_budget or looping:
+                RequestMetrics._n_plus_one[key] = RequestMetrics._n_plus_one.get(key, 0) + 1
+        
+        if over_budget or looping:
+            logger.warning(
+                "Possible N+1 on %s %s: %d statements (budget %d), most repeated %dx: %s",
+                method, route, stats["statements"], settings.METRICS_STATEMENT_BUDGET,
+                repeats, " ".join(repeated.split())[:200],
+            )
+    
+    @staticmethod
+    def server_timing(seconds: float, stats: Dict) -> str:
+        return (
+            f"app;dur={seconds * 1000:.1f}, "
+            f'db;dur={stats["sql_seconds"] * 1000:.1f};desc="{stats["statements"]} statements"'
+        )
+    
+    @staticmethod
+    def render() -> str:
+        """All series in Prometheus text exposition format"""
+        def labels(method: str, route: str) -> str:
+            return f'method="{method}",route="{route}"'
+        
+        lines = [
+            "# HELP pipelineiq_http_requests_total HTTP requests by route and status.",
+            "# TYPE pipelineiq_http_requests_total counter",
+        ]
+        with RequestMetrics._lock:
+            for (method, route, status), count in sorted(RequestMetrics._requests.items()):
+                lines.append(f'pipelineiq_http_requests_total{{{labels(method, route)},status="{status}"}} {count}')
+            
+            lines += [
+                "# HELP pipelineiq_http_request_duration_seconds Request latency.",
+                "# TYPE pipelineiq_http_request_duration_seconds histogram",
+            ]
+            for (method, route), histogram in sorted(RequestMetrics._latency.items()):
+                lines += histogram.render("pipelineiq_http_request_duration_seconds", labels(method, route))
+            
+            lines += [
+                "# HELP pipelineiq_db_statements_per_request SQL statements issued per request.",
+                "# TYPE pipelineiq_db_statements_per_request histogram",
+            ]
+            for (method, route), histogram in sorted(RequestMetrics._statements.items()):
+                lines += histogram.render("pipelineiq_db_statements_per_request", labels(method, route))
+            
+            lines += [
+                "# HELP pipelineiq_db_seconds_total Time spent executing SQL.",
+                "# TYPE pipelineiq_db_seconds_total counter",
+            ]
+            for (method, route), seconds in sorted(RequestMetrics._sql_seconds.items()):
+                lines.append(f"pipelineiq_db_seconds_total{{{labels(method, route)}}} {seconds}")
+            
+            lines += [
+                "# HELP pipelineiq_n_plus_one_total Requests over the statement budget or repeating one statement.",
+                "# TYPE pipelineiq_n_plus_one_total counter",
+            ]
+            for (method, route), count in sorted(RequestMetrics._n_plus_one.items()):
+                lines.append(f"pipelineiq_n_plus_one_total{{{labels(method, route)}}} {count}")
+        return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request, attaching Server-Timing and recording route metrics"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        stats, token = RequestMetrics.start_request()
+        status = [500]
+        
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", RequestMetrics.server_timing(time.perf_counter() - started, stats))
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                # Background tasks run after this; they are not part of the request's cost
+                stats["finished"] = time.perf_counter()
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            RequestMetrics.end_request(token)
+            # Route templates keep label cardinality bounded; unmatched paths share one series
+            route = getattr(scope.get("route"), "path", "unmatched")
+            finished = stats["finished"] or time.perf_counter()
+            RequestMetrics.observe(scope["method"], route, status[0], finished - started, stats)
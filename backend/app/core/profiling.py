@@ -0,0 +1,211 @@
+import hmac
+import itertools
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+from starlette.datastructures import MutableHeaders
+from .config import get_settings
+
+settings = get_settings()
+
+# Innermost matching frame decides where a sample's time goes. C extensions have no
+# Python frame, so e.g. a NumPy ufunc called from app code counts as "app"; see hot_frames.
+CATEGORIES = [
+    ("sqlalchemy", ("sqlalchemy.",)),
+    ("serialization", ("pydantic.", "pydantic_core.", "fastapi.encoders", "json.")),
+    ("numpy_sklearn", ("numpy.", "sklearn.", "scipy.")),
+    ("app", ("app.",)),
+]
+SERIALIZATION_FUNCTIONS = {"serialize_response", "jsonable_encoder", "render"}
+
+# A thread whose innermost frame is in one of these is parked, not working
+IDLE_MODULES = {"threading", "queue", "selectors", "concurrent.futures.thread"}
+
+class StackSampler:
+    """Samples every thread's Python stack at a fixed interval into collapsed-stack counts"""
+    
+    def __init__(self, interval_ms: float):
+        self.interval = max(interval_ms, 0.1) / 1000
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    @staticmethod
+    def _label(frame) -> str:
+        return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+    
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or frame.f_globals.get("__name__") in IDLE_MODULES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(StackSampler._label(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+    
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, daemon=True, name="request-profiler")
+        self._thread.start()
+    
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+class RequestProfiler:
+    """Opt-in, admin-gated request profiles kept in a bounded in-memory ring
+    
+    The sampler sees every thread, so requests running concurrently with a
+    profiled one can show up in its stacks; only one request is profiled at a time.
+    """
+    
+    _lock = threading.Lock()
+    _active = threading.Lock()
+    _profiles: deque = deque(maxlen=settings.PROFILING_RING_SIZE)
+    _ids = itertools.count(1)
+    
+    @staticmethod
+    def enabled() -> bool:
+        return bool(settings.ADMIN_TOKEN)
+    
+    @staticmethod
+    def check_token(token: Optional[str]) -> bool:
+        return RequestProfiler.enabled() and token is not None and hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode())
+    
+    @staticmethod
+    def should_profile(headers: Dict[str, str]) -> bool:
+        """Explicit opt-in with the admin token, or a random sample of all traffic"""
+        if not RequestProfiler.enabled():
+            return False
+        if headers.get("x-profile") and RequestProfiler.check_token(headers.get("x-admin-token")):
+            return True
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+    
+    @staticmethod
+    def _category(stack: str) -> str:
+        for frame in reversed(stack.split(";")):
+            module, _, function = frame.partition(":")
+            if module.startswith("fastapi.") and function in SERIALIZATION_FUNCTIONS:
+                return "serialization"
+            for category, prefixes in CATEGORIES:
+                if module.startswith(prefixes):
+                    return category
+        return "other"
+    
+    @staticmethod
+    def next_id() -> int:
+        return next(RequestProfiler._ids)
+    
+    @staticmethod
+    def record(
+        profile_id: int,
+        method: str,
+        path: str,
+        route: str,
+        status: int,
+        duration: float,
+        stacks: Counter,
+        samples: int,
+    ) -> None:
+        """Summarize a finished profile into the ring"""
+        total = sum(stacks.values())
+        breakdown = Counter()
+        leaves = Counter()
+        for stack, count in stacks.items():
+            breakdown[RequestProfiler._category(stack)] += count
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        
+        profile = {
+            "id": profile_id,
+            "method": method,
+            "path": path,
+            "route": route,
+            "status": status,
+            "created_at": datetime.utcnow(),
+            "duration_ms": round(duration * 1000, 2),
+            "interval_ms": settings.PROFILING_INTERVAL_MS,
+            "samples": samples,
+            # Share of sampled stacks per category, applied to the request's wall time
+            "breakdown_ms": {
+                category: round(duration * 1000 * count / total, 2) for category, count in breakdown.most_common()
+            } if total else {},
+            # Innermost Python frames by samples, including time spent in C code they call
+            "hot_frames": [{"frame": frame, "samples": count} for frame, count in leaves.most_common(10)],
+            "stacks": stacks,
+        }
+        with RequestProfiler._lock:
+            RequestProfiler._profiles.append(profile)
+    
+    @staticmethod
+    def summaries() -> List[Dict]:
+        with RequestProfiler._lock:
+            profiles = list(RequestProfiler._profiles)
+        return [{k: v for k, v in p.items() if k != "stacks"} for p in reversed(profiles)]
+    
+    @staticmethod
+    def get(profile_id: int, top: int = 20) -> Optional[Dict]:
+        with RequestProfiler._lock:
+            profile = next((p for p in RequestProfiler._profiles if p["id"] == profile_id), None)
+        if profile is None:
+            return None
+        summary = {k: v for k, v in profile.items() if k != "stacks"}
+        summary["top_stacks"] = [{"stack": stack, "samples": count} for stack, count in profile["stacks"].most_common(top)]
+        return summary
+    
+    @staticmethod
+    def collapsed(profile_id: int) -> Optional[str]:
+        """Brendan Gregg collapsed-stack text for flamegraph.pl or speedscope"""
+        with RequestProfiler._lock:
+            profile = next((p for p in RequestProfiler._profiles if p["id"] == profile_id), None)
+        if profile is None:
+            return None
+        return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].most_common())
+
+class ProfilingMiddleware:
+    """ASGI middleware that samples opted-in requests and tags responses with X-Profile-Id"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        # Admin routes are never profiled so reading profiles does not evict them
+        if scope["type"] != "http" or not RequestProfiler.enabled() or scope["path"].startswith("/api/admin"):
+            await self.app(scope, receive, send)
+            return
+        
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        if not RequestProfiler.should_profile(headers) or not RequestProfiler._active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+        
+        profile_id = RequestProfiler.next_id()
+        sampler = StackSampler(settings.PROFILING_INTERVAL_MS)
+        status = [500]
+        started = time.perf_counter()
+        
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Id", str(profile_id))
+            await send(message)
+        
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            stacks = sampler.stop()
+            duration = time.perf_counter() - started
+            RequestProfiler._active.release()
+            route = getattr(scope.get("route"), "path", "unmatched")
+            RequestProfiler.record(
+                profile_id, scope["method"], scope["path"], route, status[0], duration, stacks, sampler.samples
+            )
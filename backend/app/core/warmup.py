@@ -0,0 +1,114 @@
+import importlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+from app.db.database import engine, read_engine
+from app.db.migrations import SchemaMigrator
+from .config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Loaded by the first analytics, scoring and budget requests; imported ahead of them
+ML_MODULES = [
+    "app.ml.scoring",
+    "app.ml.trainer",
+    "app.ml.budget_optimization",
+    "app.ml.budget_allocation",
+    "app.ml.budget_simulation",
+]
+
+class StartupWarmup:
+    """Background warm-up of a new worker: ML imports, connections and published deal models
+    
+    Runs after the app starts accepting requests, so nothing here delays the first
+    response; a request that arrives before its part is warm simply does the work itself.
+    """
+    
+    _lock = threading.Lock()
+    _thread: Optional[threading.Thread] = None
+    _status: Dict = {"status": "idle"}
+    _pending: List[int] = []
+    
+    @staticmethod
+    def start() -> None:
+        """Start the warm-up thread once per process"""
+        with StartupWarmup._lock:
+            if StartupWarmup._thread is not None:
+                return
+            StartupWarmup._status = {"status": "running", "started_at": datetime.utcnow()}
+            StartupWarmup._thread = threading.Thread(target=StartupWarmup.run, name="startup-warmup", daemon=True)
+            StartupWarmup._thread.start()
+    
+    @staticmethod
+    def status() -> Dict:
+        with StartupWarmup._lock:
+            return dict(StartupWarmup._status)
+    
+    @staticmethod
+    def _update(**changes) -> None:
+        with StartupWarmup._lock:
+            StartupWarmup._status.update(changes)
+    
+    @staticmethod
+    def pending_migrations() -> List[int]:
+        """Versions not yet applied to the primary database"""
+        return [m["version"] for m in SchemaMigrator.status(engine) if m["applied_at"] is None]
+    
+    @staticmethod
+    def check_schema() -> List[int]:
+        """Record the pending migrations at startup; /health reports unhealthy while any remain"""
+        pending = StartupWarmup.pending_migrations()
+        if pending:
+            logger.error("Database schema is behind: migrations %s pending, run `python migrate.py`", pending)
+        StartupWarmup._pending = pending
+        return pending
+    
+    @staticmethod
+    def schema_pending() -> List[int]:
+        """Pending migrations, re-read while any are recorded so running migrate.py clears them without a restart"""
+        if StartupWarmup._pending:
+            StartupWarmup._pending = StartupWarmup.pending_migrations()
+        return StartupWarmup._pending
+    
+    @staticmethod
+    def _connect() -> None:
+        """Open the first pooled connection of each engine"""
+        for bind in {engine, read_engine}:
+            with bind.connect() as conn:
+                conn.execute(text("SELECT 1"))
+    
+    @staticmethod
+    def _load_models() -> int:
+        """Read every published deal model into the weights cache; returns the number loaded"""
+        from app.ml.deal_probability import DealProbabilityService
+        if not os.path.isdir(settings.DEAL_MODEL_DIR):
+            return 0
+        loaded = 0
+        for scope in os.listdir(settings.DEAL_MODEL_DIR):
+            if DealProbabilityService.load_weights(scope) is not None:
+                loaded += 1
+        return loaded
+    
+    @staticmethod
+    def run() -> None:
+        started = time.perf_counter()
+        try:
+            configure_mappers()
+            StartupWarmup._connect()
+            for module in ML_MODULES:
+                importlib.import_module(module)
+            models_loaded = StartupWarmup._load_models()
+            StartupWarmup._update(
+                status="done",
+                models_loaded=models_loaded,
+                seconds=round(time.perf_counter() - started, 3),
+            )
+        except Exception as e:
+            StartupWarmup._update(status="failed", error=str(e))
+            logger.exception("Startup warm-up failed")
@@ -1,25 +1,50 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import get_settings
 
 settings = get_settings()
 
-# Create database engine
-if "sqlite" in settings.DATABASE_URL:
-    engine = create_engine(
-        settings.DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        echo=False,
-    )
-else:
-    engine = create_engine(
-        settings.DATABASE_URL,
-        echo=False,
-        pool_pre_ping=True,
-    )
+def create_db_engine(url: str) -> Engine:
+    """Engine with pool limits from settings; SQLite connections get WAL and cache pragmas"""
+    if "sqlite" not in url:
+        return create_engine(
+            url,
+            echo=False,
+            pool_pre_ping=True,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    
+    # In-memory databases use a single shared connection; pool sizing does not apply
+    options = {} if ":memory:" in url or url.endswith("://") else {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+    sqlite_engine = create_engine(url, connect_args={"check_same_thread": False}, echo=False, **options)
+    
+    @event.listens_for(sqlite_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.close()
+    
+    return sqlite_engine
 
-# Create session factory
+# Create database engines; reads fall back to the primary without a replica
+engine = create_db_engine(settings.DATABASE_URL)
+read_engine = create_db_engine(settings.READ_REPLICA_URL) if settings.READ_REPLICA_URL else engine
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Create declarative base for models
 Base = declarative_base()
@@ -31,3 +56,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    """Dependency for read-only routes; served by the read replica when one is configured"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
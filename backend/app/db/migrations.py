@@ -0,0 +1,218 @@
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import (
+    Column, DateTime, Float, ForeignKey, Index, Integer, MetaData, SmallInteger, String, Table,
+    inspect, insert, select, text,
+)
+from sqlalchemy.engine import Connection, Engine
+from app.db.database import Base
+import app.models  # registers every table on Base.metadata
+from app.models.attribution import ATTRIBUTION_MODEL_CODES
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping lives outside Base.metadata so the baseline never creates or drops it
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(255), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# (version, name, fn(connection)); migrations after the baseline must also be no-ops on a
+# database the baseline just built from the current models
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = []
+
+def migration(version: int, name: str):
+    """Register a migration step"""
+    def register(fn: Callable[[Connection], None]):
+        MIGRATIONS.append((version, name, fn))
+        return fn
+    return register
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return column in {c["name"] for c in inspect(conn).get_columns(table)}
+
+def _column_type(conn: Connection, table: str, column: str):
+    return next((c["type"] for c in inspect(conn).get_columns(table) if c["name"] == column), None)
+
+def _has_unique(conn: Connection, table: str, columns: List[str]) -> bool:
+    inspector = inspect(conn)
+    unique = [c["column_names"] for c in inspector.get_unique_constraints(table)]
+    unique += [i["column_names"] for i in inspector.get_indexes(table) if i["unique"]]
+    return columns in unique
+
+@migration(1, "baseline schema")
+def create_tables(conn: Connection) -> None:
+    """Tables missing from the database, at the current model definitions"""
+    Base.metadata.create_all(bind=conn)
+
+@migration(2, "lead score explanations")
+def add_lead_score_contributions(conn: Connection) -> None:
+    if not _has_column(conn, "lead_scores", "contributions"):
+        conn.execute(text("ALTER TABLE lead_scores ADD COLUMN contributions JSON"))
+
+@migration(3, "unique lead email per company")
+def add_lead_email_unique(conn: Connection) -> None:
+    if _has_unique(conn, "leads", ["company_id", "email"]):
+        return
+    duplicates = conn.execute(text(
+        "SELECT company_id, email FROM leads GROUP BY company_id, email HAVING COUNT(*) > 1 LIMIT 5"
+    )).all()
+    if duplicates:
+        raise RuntimeError(f"Duplicate leads per (company_id, email) must be merged first, e.g. {duplicates}")
+    conn.execute(text("CREATE UNIQUE INDEX uq_leads_company_email ON leads (company_id, email)"))
+
+@migration(4, "hot path indexes")
+def add_hot_path_indexes(conn: Connection) -> None:
+    """Composite and covering indexes for analytics, attribution and budget queries"""
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_campaigns_company_id ON campaigns (company_id)",
+        "CREATE INDEX IF NOT EXISTS ix_leads_company_stage ON leads (company_id, stage, deal_value)",
+        "CREATE INDEX IF NOT EXISTS ix_leads_company_created ON leads (company_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_leads_source_campaign_id ON leads (source_campaign_id)",
+        "CREATE INDEX IF NOT EXISTS ix_attribution_campaign_model "
+        "ON attribution_results (campaign_id, attribution_model, attributed_revenue)",
+        "CREATE INDEX IF NOT EXISTS ix_attribution_lead_model "
+        "ON attribution_results (lead_id, attribution_model, attributed_revenue)",
+    ]:
+        conn.execute(text(statement))
+
+# attribution_results as of migration 5, frozen so later model changes do not alter the
+# rebuild; the parent stubs only let the foreign keys resolve
+_v5 = MetaData()
+Table("leads", _v5, Column("id", Integer, primary_key=True))
+Table("campaigns", _v5, Column("id", Integer, primary_key=True))
+_attribution_results_v5 = Table(
+    "attribution_results",
+    _v5,
+    Column("id", Integer, primary_key=True),
+    Column("lead_id", Integer, ForeignKey("leads.id", ondelete="CASCADE"), nullable=False),
+    Column("campaign_id", Integer, ForeignKey("campaigns.id"), nullable=True),
+    Column("attribution_model", SmallInteger, nullable=False),
+    Column("weighted_attribution", Float),
+    Column("attributed_revenue", Float),
+    Index("ix_attribution_campaign_model", "campaign_id", "attribution_model", "attributed_revenue"),
+    Index("ix_attribution_lead_model", "lead_id", "attribution_model", "attributed_revenue"),
+)
+
+@migration(5, "compact attribution results")
+def compact_attribution_results(conn: Connection) -> None:
+    """Model names to small integer codes; zero-credit rows, created_at and the redundant id index dropped"""
+    if isinstance(_column_type(conn, "attribution_results", "attribution_model"), Integer):
+        return
+    before = conn.execute(text("SELECT COUNT(*) FROM attribution_results")).scalar()
+    conn.execute(text("ALTER TABLE attribution_results RENAME TO attribution_results_old"))
+    # Indexes follow the renamed table and would clash with the new table's names
+    for index in inspect(conn).get_indexes("attribution_results_old"):
+        conn.execute(text(f"DROP INDEX {index['name']}"))
+    _attribution_results_v5.create(conn)
+    
+    codes = " ".join(f"WHEN '{name}' THEN {code}" for name, code in ATTRIBUTION_MODEL_CODES.items())
+    names = ", ".join(f"'{name}'" for name in ATTRIBUTION_MODEL_CODES)
+    conn.execute(text(
+        "INSERT INTO attribution_results "
+        "(id, lead_id, campaign_id, attribution_model, weighted_attribution, attributed_revenue) "
+        f"SELECT id, lead_id, campaign_id, CASE attribution_model {codes} END, weighted_attribution, "
+        "attributed_revenue FROM attribution_results_old "
+        f"WHERE weighted_attribution <> 0 AND attribution_model IN ({names})"
+    ))
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('attribution_results', 'id'), "
+            "COALESCE(MAX(id), 0) + 1, false) FROM attribution_results"
+        ))
+    conn.execute(text("DROP TABLE attribution_results_old"))
+    after = conn.execute(text("SELECT COUNT(*) FROM attribution_results")).scalar()
+    # SQLite reuses the freed pages; VACUUM returns them to the filesystem
+    logger.info("Compacted attribution_results: %d rows kept of %d", after, before)
+
+@migration(6, "lead outcome times")
+def add_lead_feature_outcome_at(conn: Connection) -> None:
+    """When each Won/Lost lead got its outcome, the incremental training checkpoint"""
+    if _has_column(conn, "lead_features", "outcome_at"):
+        return
+    conn.execute(text("ALTER TABLE lead_features ADD COLUMN outcome_at TIMESTAMP"))
+    # The best record of older outcomes; at most replays them once into an incremental model
+    conn.execute(text(
+        "UPDATE lead_features SET outcome_at = updated_at "
+        "WHERE lead_id IN (SELECT id FROM leads WHERE stage IN ('Won', 'Lost'))"
+    ))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_lead_features_outcome_at ON lead_features (outcome_at)"))
+
+@migration(7, "campaign baseline totals")
+def add_campaign_baselines(conn: Connection) -> None:
+    """Pre-tracking totals that daily stats are added to"""
+    if _has_column(conn, "campaigns", "baseline_cost"):
+        return
+    conn.execute(text("ALTER TABLE campaigns ADD COLUMN baseline_impressions INTEGER"))
+    conn.execute(text("ALTER TABLE campaigns ADD COLUMN baseline_clicks INTEGER"))
+    conn.execute(text("ALTER TABLE campaigns ADD COLUMN baseline_cost FLOAT"))
+    # Totals of campaigns already tracked daily were overwritten with the daily sums; their
+    # baseline is zero, or the next rollup would count the daily rows twice
+    conn.execute(text(
+        "UPDATE campaigns SET baseline_impressions = 0, baseline_clicks = 0, baseline_cost = 0 "
+        "WHERE id IN (SELECT DISTINCT campaign_id FROM campaign_daily_stats)"
+    ))
+
+@migration(8, "shared cache versions")
+def add_cache_versions(conn: Connection) -> None:
+    """Per-company cache data versions that every worker reads, so writes invalidate across processes"""
+    Base.metadata.tables["cache_versions"].create(bind=conn, checkfirst=True)
+
+class SchemaMigrator:
+    """Applies versioned migrations in order, one transaction each, recorded in schema_migrations"""
+    
+    @staticmethod
+    def _lock(conn: Connection) -> None:
+        """Serialize workers migrating the same database at startup"""
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(4711047)"))
+        else:
+            # Any write takes SQLite's reserved lock until the transaction ends
+            conn.execute(schema_migrations.delete().where(schema_migrations.c.version == -1))
+    
+    @staticmethod
+    def status(engine: Engine) -> List[Dict]:
+        """Every known migration with when it was applied, None if pending (read-only)"""
+        with engine.connect() as conn:
+            applied = {}
+            if inspect(conn).has_table(schema_migrations.name):
+                applied = dict(conn.execute(select(schema_migrations.c.version, schema_migrations.c.applied_at)).all())
+        return [
+            {"version": version, "name": name, "applied_at": applied.get(version)}
+            for version, name, _ in sorted(MIGRATIONS)
+        ]
+    
+    @staticmethod
+    def migrate(engine: Engine, target: Optional[int] = None) -> List[int]:
+        """Apply pending migrations up to target (default: all); returns the versions applied"""
+        _metadata.create_all(bind=engine)
+        applied = []
+        for version, name, fn in sorted(MIGRATIONS):
+            if target is not None and version > target:
+                break
+            with engine.begin() as conn:
+                SchemaMigrator._lock(conn)
+                done = conn.execute(
+                    select(schema_migrations.c.version).where(schema_migrations.c.version == version)
+                ).first()
+                if done is not None:
+                    continue
+                fn(conn)
+                conn.execute(insert(schema_migrations), {
+                    "version": version, "name": name, "applied_at": datetime.utcnow(),
+                })
+            applied.append(version)
+            logger.info("Applied migration %d: %s", version, name)
+        return applied
+    
+    @staticmethod
+    def reset(engine: Engine) -> List[int]:
+        """Drop every table, bookkeeping included, and migrate from scratch (scratch databases only)"""
+        Base.metadata.drop_all(bind=engine)
+        _metadata.drop_all(bind=engine)
+        return SchemaMigrator.migrate(engine)
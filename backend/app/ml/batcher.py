@@ -0,0 +1,112 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+class MicroBatcher:
+    """Coalesces concurrent requests into one vectorized call
+    
+    Callers `await submit(item)`; a single consumer task collects items until
+    `max_batch_size` is reached or `max_wait_ms` has passed since the first one,
+    runs `process_batch` once in a worker thread and resolves every caller.
+    """
+    
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.batch_size_buckets = {1: 0, 2: 0, 4: 0, 8: 0, 16: 0, 32: 0, 64: 0, "+Inf": 0}
+        self.queue_latency_total = 0.0
+        self.queue_latency_max = 0.0
+        self.errors = 0
+    
+    def _ensure_worker(self) -> None:
+        """Start the consumer on the running loop; a restart keeps queued items unless the loop changed"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Queues are bound to their loop, so only a new loop gets a new one
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+    
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+    
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future, float]]:
+        """Block for the first item, then take more until the batch is full or the window closes"""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                # Drain whatever is already queued without waiting
+                while len(batch) < self.max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            self._record(len(batch), [started - enqueued for _, _, enqueued in batch])
+            
+            try:
+                results = await asyncio.to_thread(self.process_batch, [item for item, _, _ in batch])
+            except Exception as e:
+                self.errors += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+    
+    def _record(self, size: int, latencies: List[float]) -> None:
+        self.batches += 1
+        self.items += size
+        self.max_batch_seen = max(self.max_batch_seen, size)
+        for bucket in self.batch_size_buckets:
+            if bucket == "+Inf" or size <= bucket:
+                self.batch_size_buckets[bucket] += 1
+                break
+        self.queue_latency_total += sum(latencies)
+        self.queue_latency_max = max(self.queue_latency_max, max(latencies))
+    
+    def stats(self) -> Dict:
+        """Batch size and queue latency metrics"""
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "batch_size_histogram": {str(k): v for k, v in self.batch_size_buckets.items()},
+            "avg_queue_latency_ms": round(self.queue_latency_total / self.items * 1000, 3) if self.items else 0.0,
+            "max_queue_latency_ms": round(self.queue_latency_max * 1000, 3),
+            "errors": self.errors,
+            "config": {"max_batch_size": self.max_batch_size, "max_wait_ms": self.max_wait * 1000},
+        }
@@ -0,0 +1,269 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Candidate saturation scales, relative to the median spend of the pool
+SCALE_GRID = np.geomspace(0.05, 20.0, 41)
+
+class BudgetAllocator:
+    """Allocate a fixed budget across campaigns on fitted diminishing-returns curves
+    
+    Each campaign's revenue response is r(s) = a * log(1 + s / k). The saturation
+    scale k is shared per platform and fit on the pooled (spend, revenue) points;
+    the amplitude a is per campaign, shrunk toward the platform fit.
+    """
+    
+    # LRU of (company_id, model, platform) -> (data fingerprint, fitted parameters)
+    _curve_cache: "OrderedDict[Tuple[int, str, str], Tuple[str, Dict]]" = OrderedDict()
+    _curve_lock = threading.Lock()
+    
+    @staticmethod
+    def _fit_scale(spend: np.ndarray, revenue: np.ndarray) -> Tuple[float, float]:
+        """Least-squares (amplitude, scale) for revenue = A * log(1 + spend / k)"""
+        active = spend > 0
+        if not active.any():
+            return 0.0, 1.0
+        
+        spend, revenue = spend[active], revenue[active]
+        scales = SCALE_GRID * float(np.median(spend))
+        basis = np.log1p(spend[None, :] / scales[:, None])  # (scales, campaigns)
+        amplitude = (basis @ revenue) / np.maximum((basis * basis).sum(axis=1), 1e-12)
+        sse = ((revenue[None, :] - amplitude[:, None] * basis) ** 2).sum(axis=1)
+        best = int(np.argmin(sse))
+        return max(float(amplitude[best]), 0.0), float(scales[best])
+    
+    @staticmethod
+    def fit_curves(
+        company_id: int,
+        model: str,
+        metrics: List[Dict],
+    ) -> Dict[str, np.ndarray]:
+        """Curve parameters aligned with `metrics`, refit only for platforms whose data changed"""
+        spend = np.array([m["spend"] for m in metrics], dtype=np.float64)
+        revenue = np.array([m["attributed_revenue"] for m in metrics], dtype=np.float64)
+        platforms = np.array([m["platform"] for m in metrics], dtype=object)
+        campaign_ids = np.array([m["campaign_id"] for m in metrics], dtype=np.int64)
+        
+        amplitude = np.zeros(len(metrics))
+        scale = np.ones(len(metrics))
+        shrinkage = settings.BUDGET_CURVE_SHRINKAGE
+        
+        # Platforms with too few spending campaigns borrow the company-wide shape
+        pooled = BudgetAllocator._fit_scale(spend, revenue)
+        
+        for platform in np.unique(platforms):
+            rows = platforms == platform
+            fingerprint = hashlib.sha1(
+                campaign_ids[rows].tobytes() + spend[rows].tobytes() + revenue[rows].tobytes()
+                + repr(pooled).encode() + repr(shrinkage).encode()
+            ).hexdigest()
+            key = (company_id, model, platform)
+            with BudgetAllocator._curve_lock:
+                cached = BudgetAllocator._curve_cache.get(key)
+                if cached is not None:
+                    BudgetAllocator._curve_cache.move_to_end(key)
+            
+            if cached is None or cached[0] != fingerprint:
+                if (spend[rows] > 0).sum() >= 3:
+                    platform_amplitude, platform_scale = BudgetAllocator._fit_scale(spend[rows], revenue[rows])
+                else:
+                    platform_amplitude, platform_scale = pooled
+                
+                # Shrink each campaign's observed return toward the platform curve
+                predicted = platform_amplitude * np.log1p(spend[rows] / platform_scale)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    multiplier = np.where(
+                        predicted > 0,
+                        (revenue[rows] + shrinkage * predicted) / ((1 + shrinkage) * predicted),
+                        1.0,
+                    )
+                params = {
+                    "amplitude": platform_amplitude * multiplier,
+                    "scale": np.full(rows.sum(), platform_scale),
+                }
+                cached = (fingerprint, params)
+                with BudgetAllocator._curve_lock:
+                    BudgetAllocator._curve_cache[key] = cached
+                    BudgetAllocator._curve_cache.move_to_end(key)
+                    while len(BudgetAllocator._curve_cache) > settings.BUDGET_CURVE_CACHE_SIZE:
+                        BudgetAllocator._curve_cache.popitem(last=False)
+            
+            amplitude[rows] = cached[1]["amplitude"]
+            scale[rows] = cached[1]["scale"]
+        
+        return {"amplitude": amplitude, "scale": scale}
+    
+    @staticmethod
+    def response(curves: Dict[str, np.ndarray], spend: np.ndarray) -> np.ndarray:
+        """Expected revenue at the given spend"""
+        return curves["amplitude"] * np.log1p(spend / curves["scale"])
+    
+    @staticmethod
+    def marginal_roas(curves: Dict[str, np.ndarray], spend: np.ndarray) -> np.ndarray:
+        """Revenue from the next dollar at the given spend"""
+        return curves["amplitude"] / (curves["scale"] + spend)
+    
+    @staticmethod
+    def _water_fill(
+        amplitude: np.ndarray,
+        scale: np.ndarray,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        budget: float,
+    ) -> np.ndarray:
+        """Spend `budget` so every unclamped campaign ends at the same marginal ROAS"""
+        if len(amplitude) == 0:
+            return np.zeros(0)
+        if budget <= lower.sum():
+            return lower.copy()
+        if budget >= upper.sum():
+            return upper.copy()
+        
+        def allocate(level: float) -> np.ndarray:
+            # Marginal ROAS a / (k + s) equals level at s = a / level - k
+            return np.clip(amplitude / level - scale, lower, upper)
+        
+        # Bisection on the log of the common marginal ROAS
+        low, high = -30.0, 30.0
+        for _ in range(100):
+            mid = (low + high) / 2
+            if allocate(np.exp(mid)).sum() > budget:
+                low = mid
+            else:
+                high = mid
+        allocation = allocate(np.exp(high))
+        
+        # Hand the bisection residue to the campaigns that still have headroom
+        residue = budget - allocation.sum()
+        headroom = upper - allocation
+        unbounded = np.isinf(headroom)
+        if residue > 0 and unbounded.any():
+            allocation[unbounded] += residue / unbounded.sum()
+        elif residue > 0 and headroom.sum() > 0:
+            allocation += headroom * (residue / headroom.sum())
+        return allocation
+    
+    @staticmethod
+    def allocate(
+        curves: Dict[str, np.ndarray],
+        platforms: np.ndarray,
+        total_budget: float,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        platform_bounds: Optional[Dict[str, Tuple[float, Optional[float]]]] = None,
+    ) -> np.ndarray:
+        """Revenue-maximizing allocation under per-campaign and per-platform bounds"""
+        platform_bounds = platform_bounds or {}
+        allocation = np.zeros(len(lower))
+        free = np.ones(len(lower), dtype=bool)
+        remaining = float(total_budget)
+        
+        # Fix the most violated platform at its bound and re-solve the rest (KKT active set)
+        while True:
+            allocation[free] = BudgetAllocator._water_fill(
+                curves["amplitude"][free], curves["scale"][free], lower[free], upper[free], remaining
+            )
+            worst, worst_violation, worst_target = None, 0.0, 0.0
+            for platform, (platform_min, platform_max) in platform_bounds.items():
+                rows = free & (platforms == platform)
+                if not rows.any():
+                    continue
+                total = allocation[rows].sum()
+                if platform_max is not None and total - platform_max > worst_violation:
+                    worst, worst_violation, worst_target = platform, total - platform_max, platform_max
+                elif platform_min - total > worst_violation:
+                    worst, worst_violation, worst_target = platform, platform_min - total, platform_min
+            
+            if worst is None or worst_violation <= 1e-6 * max(total_budget, 1.0):
+                return allocation
+            
+            rows = free & (platforms == worst)
+            allocation[rows] = BudgetAllocator._water_fill(
+                curves["amplitude"][rows], curves["scale"][rows], lower[rows], upper[rows], worst_target
+            )
+            free &= ~rows
+            remaining -= allocation[rows].sum()
+            if not free.any():
+                return allocation
+    
+    @staticmethod
+    def optimize(
+        company_id: int,
+        model: str,
+        metrics: List[Dict],
+        total_budget: float,
+        min_per_campaign: float = 0.0,
+        max_per_campaign: Optional[float] = None,
+        campaign_bounds: Optional[Dict[int, Tuple[float, Optional[float]]]] = None,
+        platform_bounds: Optional[Dict[str, Tuple[float, Optional[float]]]] = None,
+    ) -> Dict:
+        """Fit curves, validate constraints and return the recommended allocation"""
+        if not metrics:
+            return {"total_budget": total_budget, "allocated": 0.0, "campaigns": [], "platforms": {}}
+        
+        n = len(metrics)
+        campaign_ids = [m["campaign_id"] for m in metrics]
+        platforms = np.array([m["platform"] for m in metrics], dtype=object)
+        current = np.array([m["spend"] for m in metrics], dtype=np.float64)
+        
+        lower = np.full(n, float(min_per_campaign))
+        upper = np.full(n, np.inf if max_per_campaign is None else float(max_per_campaign))
+        for i, campaign_id in enumerate(campaign_ids):
+            if campaign_bounds and campaign_id in campaign_bounds:
+                campaign_min, campaign_max = campaign_bounds[campaign_id]
+                lower[i] = campaign_min
+                upper[i] = np.inf if campaign_max is None else campaign_max
+        
+        if (lower > upper).any():
+            raise ValueError("A campaign's minimum spend exceeds its maximum")
+        if lower.sum() > total_budget:
+            raise ValueError(f"Minimum spends total {lower.sum():.2f}, more than the budget of {total_budget:.2f}")
+        for platform, (platform_min, platform_max) in (platform_bounds or {}).items():
+            rows = platforms == platform
+            if platform_max is not None and (platform_min > platform_max or lower[rows].sum() > platform_max):
+                raise ValueError(f"Platform '{platform}' bounds are infeasible")
+            if platform_min > upper[rows].sum():
+                raise ValueError(f"Platform '{platform}' cannot reach its minimum spend")
+        
+        curves = BudgetAllocator.fit_curves(company_id, model, metrics)
+        allocation = BudgetAllocator.allocate(curves, platforms, total_budget, lower, upper, platform_bounds)
+        
+        expected = BudgetAllocator.response(curves, allocation)
+        baseline = BudgetAllocator.response(curves, current)
+        marginal = BudgetAllocator.marginal_roas(curves, allocation)
+        
+        platform_totals = {}
+        for platform in np.unique(platforms):
+            rows = platforms == platform
+            platform_totals[platform] = {
+                "current_spend": float(current[rows].sum()),
+                "recommended_spend": float(allocation[rows].sum()),
+                "expected_revenue": float(expected[rows].sum()),
+            }
+        
+        return {
+            "total_budget": total_budget,
+            "allocated": float(allocation.sum()),
+            "current_spend": float(current.sum()),
+            "expected_revenue": float(expected.sum()),
+            "current_expected_revenue": float(baseline.sum()),
+            "campaigns": [
+                {
+                    "campaign_id": metrics[i]["campaign_id"],
+                    "campaign_name": metrics[i]["campaign_name"],
+                    "platform": metrics[i]["platform"],
+                    "current_spend": float(current[i]),
+                    "recommended_spend": round(float(allocation[i]), 2),
+                    "expected_revenue": float(expected[i]),
+                    "marginal_roas": float(marginal[i]),
+                    "curve": {"amplitude": float(curves["amplitude"][i]), "scale": float(curves["scale"][i])},
+                }
+                for i in np.argsort(-allocation, kind="stable")
+            ],
+            "platforms": platform_totals,
+        }
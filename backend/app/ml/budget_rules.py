@@ -0,0 +1,202 @@
+import operator
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.models import BudgetRuleSet
+import numpy as np
+
+# Numeric campaign metrics that rules can reference
+METRICS = [
+    "roas", "cac", "ctr", "cpc", "spend", "budget", "impressions", "clicks",
+    "num_leads", "num_conversions", "attributed_revenue",
+]
+
+# Counts are rendered as ints; the other metrics as floats
+INTEGER_METRICS = {"impressions", "clicks", "num_leads", "num_conversions"}
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+# Evaluated in order; an exclusive rule hides its campaigns from the rules after it
+DEFAULT_RULES = [
+    {
+        "name": "Launch Campaign",
+        "conditions": [{"metric": "spend", "op": "==", "value": 0}],
+        "action": "This campaign has no spend yet. Consider allocating budget.",
+        "confidence": 0.7,
+        "priority": "low",
+        "exclusive": True,
+    },
+    {
+        "name": "Increase Budget",
+        "conditions": [{"metric": "roas", "op": ">", "value": 1.5, "relative_to_avg": True}],
+        "action": "This campaign has {pct}% above-average ROAS. Increase budget by {pct}%",
+        "confidence": 0.85,
+        "priority": "high",
+        "adjustment": {"metric": "roas", "direction": "increase", "base": 20, "factor": 10, "max_pct": 50},
+    },
+    {
+        "name": "Reduce or Pause Campaign",
+        "conditions": [
+            {"metric": "roas", "op": "<", "value": 0.7, "relative_to_avg": True},
+            {"metric": "num_conversions", "op": "<", "value": 1},
+        ],
+        "action": "Low ROAS {roas:.2f} with minimal conversions. Consider pausing or reallocating.",
+        "confidence": 0.8,
+        "priority": "high",
+    },
+    {
+        "name": "Reduce Budget",
+        "conditions": [
+            {"metric": "roas", "op": "<", "value": 0.7, "relative_to_avg": True},
+            {"metric": "num_conversions", "op": ">=", "value": 1},
+        ],
+        "action": "ROAS is {pct}% below average. Reduce budget by {pct}%",
+        "confidence": 0.75,
+        "priority": "medium",
+        "adjustment": {"metric": "roas", "direction": "decrease", "base": 0, "factor": 30, "max_pct": 50},
+    },
+    {
+        "name": "High-Performing Segment",
+        "conditions": [
+            {"metric": "roas", "op": ">", "value": 2.0},
+            {"metric": "num_conversions", "op": ">=", "value": 2},
+        ],
+        "action": "Excellent ROAS of {roas:.2f}. This is a high-performing segment - test expanding audience.",
+        "confidence": 0.9,
+        "priority": "high",
+    },
+    {
+        "name": "Efficient Acquisition",
+        "conditions": [{"metric": "cac", "op": "<", "value": 0.5, "relative_to_avg": True}],
+        "action": "CAC is 50% below average. Consider scaling this channel.",
+        "confidence": 0.8,
+        "priority": "medium",
+    },
+    {
+        "name": "Improve Ad Creative",
+        "conditions": [
+            {"metric": "ctr", "op": "<", "value": 0.5},
+            {"metric": "impressions", "op": ">", "value": 1000},
+        ],
+        "action": "Low CTR of {ctr:.2f}%. Test new creative or audience targeting.",
+        "confidence": 0.7,
+        "priority": "medium",
+    },
+]
+
+class BudgetRuleEngine:
+    """Declarative budget recommendation rules evaluated as masks over all campaigns at once"""
+    
+    @staticmethod
+    def get_rules(company_id: int, db: Session) -> List[Dict]:
+        """Company's custom rules, or the defaults"""
+        rule_set = db.query(BudgetRuleSet).filter(BudgetRuleSet.company_id == company_id).first()
+        return rule_set.rules if rule_set is not None else DEFAULT_RULES
+    
+    @staticmethod
+    def validate_rules(rules: List[Dict]) -> None:
+        """Raise ValueError if an action template references unknown fields"""
+        sample = {metric: 0 if metric in INTEGER_METRICS else 0.0 for metric in METRICS}
+        sample.update(campaign_id=0, campaign_name="", platform="", pct=0)
+        for rule in rules:
+            try:
+                rule["action"].format(**sample)
+            except (KeyError, IndexError, ValueError, TypeError, AttributeError) as e:
+                raise ValueError(f"Invalid action template in rule '{rule['name']}': {e}")
+    
+    @staticmethod
+    def remove_company(company_id: int, db: Session) -> None:
+        """Drop a company's custom rules (caller commits)"""
+        db.query(BudgetRuleSet).filter(BudgetRuleSet.company_id == company_id).delete(synchronize_session=False)
+    
+    @staticmethod
+    def to_arrays(metrics: List[Dict]) -> Dict[str, np.ndarray]:
+        """Columnar view of campaign metric rows"""
+        return {
+            metric: np.fromiter((m[metric] for m in metrics), dtype=np.float64, count=len(metrics))
+            for metric in METRICS
+        }
+    
+    @staticmethod
+    def evaluate(
+        metrics: List[Dict],
+        rules: List[Dict],
+        limit: int = 10,
+        arrays: Optional[Dict[str, np.ndarray]] = None,
+    ) -> List[Dict]:
+        """Top recommendations by priority then confidence; campaign order breaks ties
+        
+        Pass `arrays` when metrics are already columnar to skip the row-to-column conversion.
+        """
+        n, num_rules = len(metrics), len(rules)
+        if n == 0 or num_rules == 0 or limit <= 0:
+            return []
+        
+        if arrays is None:
+            arrays = BudgetRuleEngine.to_arrays(metrics)
+        averages = {metric: float(values.mean()) for metric, values in arrays.items()}
+        
+        # Rank rules once; equal (priority, confidence) pairs share a rank
+        groups = sorted({(PRIORITY_ORDER.get(r["priority"], 3), -r["confidence"]) for r in rules})
+        group_rank = [groups.index((PRIORITY_ORDER.get(r["priority"], 3), -r["confidence"])) for r in rules]
+        
+        available = np.ones(n, dtype=bool)
+        keys = []
+        for rule_index, rule in enumerate(rules):
+            mask = available.copy()
+            for condition in rule["conditions"]:
+                threshold = condition["value"]
+                if condition.get("relative_to_avg"):
+                    threshold = threshold * averages[condition["metric"]]
+                mask &= OPERATORS[condition["op"]](arrays[condition["metric"]], threshold)
+            if rule.get("exclusive"):
+                available &= ~mask
+            
+            # Sort key: rank, then campaign, then rule order
+            matched = np.flatnonzero(mask).astype(np.int64)
+            keys.append((group_rank[rule_index] * n + matched) * num_rules + rule_index)
+        
+        keys = np.concatenate(keys)
+        if len(keys) > limit:
+            keys = keys[np.argpartition(keys, limit - 1)[:limit]]
+        keys.sort()
+        
+        recommendations = []
+        for key in keys.tolist():
+            rule = rules[key % num_rules]
+            campaign = metrics[(key // num_rules) % n]
+            recommendations.append(BudgetRuleEngine._build(rule, campaign, averages))
+        return recommendations
+    
+    @staticmethod
+    def _build(rule: Dict, campaign: Dict, averages: Dict[str, float]) -> Dict:
+        """Render one recommendation; only runs for the selected top K"""
+        pct = 0
+        adjustment = rule.get("adjustment")
+        if adjustment:
+            value, avg = campaign[adjustment["metric"]], averages[adjustment["metric"]]
+            distance = 0.0
+            if avg:
+                distance = (value - avg) / avg if adjustment["direction"] == "increase" else (avg - value) / avg
+            pct = int(min(adjustment["max_pct"], adjustment["base"] + int(distance * adjustment["factor"])))
+        
+        recommendation = {
+            "campaign_id": campaign["campaign_id"],
+            "campaign_name": campaign["campaign_name"],
+            "recommendation": rule["name"],
+            "action": rule["action"].format(**campaign, pct=pct),
+        }
+        if adjustment:
+            sign = 1 if adjustment["direction"] == "increase" else -1
+            recommendation["target_budget"] = campaign["budget"] * (1 + sign * pct / 100)
+        recommendation["confidence"] = rule["confidence"]
+        recommendation["priority"] = rule["priority"]
+        return recommendation
@@ -0,0 +1,184 @@
+import time
+from typing import Dict, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case
+from app.core.config import get_settings
+from app.models import Campaign, Lead
+
+settings = get_settings()
+
+PERCENTILES = [5, 25, 50, 75, 95]
+
+class BudgetSimulator:
+    """Monte Carlo what-if simulation of revenue and ROAS for proposed campaign budgets"""
+    
+    @staticmethod
+    def get_campaign_history(company_id: int, db: Session) -> Dict[str, np.ndarray]:
+        """Per-campaign lead, win and deal value history in one grouped query"""
+        won = Lead.stage == "Won"
+        rows = db.query(
+            Campaign.id,
+            Campaign.name,
+            Campaign.platform,
+            Campaign.cost,
+            func.count(Lead.id),
+            func.sum(case((won, 1), else_=0)),
+            func.sum(case((won, Lead.deal_value), else_=0.0)),
+            func.sum(case((won, Lead.deal_value * Lead.deal_value), else_=0.0)),
+        ).outerjoin(
+            Lead, Lead.source_campaign_id == Campaign.id
+        ).filter(
+            Campaign.company_id == company_id
+        ).group_by(Campaign.id).order_by(Campaign.id).all()
+        
+        return {
+            "campaign_id": np.array([r[0] for r in rows], dtype=np.int64),
+            "campaign_name": [r[1] for r in rows],
+            "platform": [r[2] for r in rows],
+            "spend": np.array([r[3] or 0.0 for r in rows], dtype=np.float64),
+            "leads": np.array([r[4] or 0 for r in rows], dtype=np.float64),
+            "wins": np.array([r[5] or 0 for r in rows], dtype=np.float64),
+            "won_value": np.array([r[6] or 0.0 for r in rows], dtype=np.float64),
+            "won_value_sq": np.array([r[7] or 0.0 for r in rows], dtype=np.float64),
+        }
+    
+    @staticmethod
+    def _parameters(history: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Lead yield, conversion prior and deal value moments, pooled where a campaign lacks history"""
+        spend, leads, wins = history["spend"], history["leads"], history["wins"]
+        
+        # Leads per dollar; campaigns without spend borrow the company rate
+        company_rate = leads.sum() / spend.sum() if spend.sum() > 0 else 0.0
+        lead_rate = np.where((spend > 0) & (leads > 0), leads / np.where(spend > 0, spend, 1.0), company_rate)
+        
+        # Deal value mean/variance of won deals; campaigns with <2 wins borrow the company moments
+        total_wins = wins.sum()
+        company_mean = history["won_value"].sum() / total_wins if total_wins else 0.0
+        company_var = max(history["won_value_sq"].sum() / total_wins - company_mean ** 2, 0.0) if total_wins else 0.0
+        enough = wins >= 2
+        safe_wins = np.where(enough, wins, 1.0)
+        value_mean = np.where(enough, history["won_value"] / safe_wins, company_mean)
+        value_var = np.where(
+            enough, np.maximum(history["won_value_sq"] / safe_wins - value_mean ** 2, 0.0), company_var
+        )
+        
+        return {
+            "lead_rate": lead_rate,
+            # Beta(wins + 1, losses + 1) posterior over each campaign's conversion rate
+            "alpha": wins + 1.0,
+            "beta": leads - wins + 1.0,
+            "value_mean": value_mean,
+            "value_var": value_var,
+        }
+    
+    @staticmethod
+    def _simulate_chunk(
+        rng: np.random.Generator,
+        params: Dict[str, np.ndarray],
+        budgets: np.ndarray,
+        scenarios: int,
+    ) -> np.ndarray:
+        """(scenarios x campaigns) matrix of simulated revenue"""
+        shape = (scenarios, len(budgets))
+        conversion = rng.beta(params["alpha"], params["beta"], size=shape)
+        # Poisson leads each converting with probability p: wins ~ Poisson(rate * budget * p)
+        wins = rng.poisson(params["lead_rate"] * budgets * conversion)
+        
+        # Sum of `wins` deal values ~ Gamma matched to the summed mean and variance
+        mean, var = params["value_mean"], params["value_var"]
+        revenue = wins * mean
+        stochastic = (var > 0) & (mean > 0)
+        if stochastic.any():
+            shape_param = wins[:, stochastic] * (mean[stochastic] ** 2 / var[stochastic])
+            revenue[:, stochastic] = rng.gamma(shape_param, var[stochastic] / mean[stochastic])
+        return revenue
+    
+    @staticmethod
+    def _summary(values: np.ndarray) -> Dict:
+        percentiles = np.percentile(values, PERCENTILES)
+        summary = {f"p{p}": float(v) for p, v in zip(PERCENTILES, percentiles)}
+        summary["mean"] = float(values.mean())
+        summary["std"] = float(values.std())
+        return summary
+    
+    @staticmethod
+    def simulate(
+        history: Dict[str, np.ndarray],
+        budgets: Dict[int, float],
+        scenarios: int,
+        seed: int = 0,
+        time_budget_ms: Optional[float] = None,
+    ) -> Dict:
+        """Simulate proposed budgets against current spend with common random numbers"""
+        campaign_ids = history["campaign_id"]
+        unknown = set(budgets) - set(campaign_ids.tolist())
+        if unknown:
+            raise ValueError(f"Unknown campaign ids: {sorted(unknown)}")
+        
+        # Campaigns without a proposal keep their current spend
+        current = history["spend"]
+        proposed = current.copy()
+        index = {campaign_id: i for i, campaign_id in enumerate(campaign_ids.tolist())}
+        for campaign_id, budget in budgets.items():
+            proposed[index[campaign_id]] = budget
+        
+        params = BudgetSimulator._parameters(history)
+        time_budget = (time_budget_ms if time_budget_ms is not None else settings.SIMULATION_TIME_BUDGET_MS) / 1000
+        # Small chunks bound memory and let the time budget cut in promptly
+        chunk = max(1, min(scenarios, 250_000 // max(len(current), 1)))
+        
+        started = time.perf_counter()
+        proposed_totals, current_totals = [], []
+        done = 0
+        while done < scenarios:
+            size = min(chunk, scenarios - done)
+            # Same seed stream for both budgets (common random numbers) to reduce noise in the uplift
+            chunk_seed = np.random.SeedSequence([seed, done])
+            proposed_totals.append(
+                BudgetSimulator._simulate_chunk(np.random.default_rng(chunk_seed), params, proposed, size).sum(axis=1)
+            )
+            current_totals.append(
+                BudgetSimulator._simulate_chunk(np.random.default_rng(chunk_seed), params, current, size).sum(axis=1)
+            )
+            done += size
+            if time.perf_counter() - started > time_budget:
+                break
+        
+        proposed_revenue = np.concatenate(proposed_totals)
+        current_revenue = np.concatenate(current_totals)
+        proposed_spend, current_spend = float(proposed.sum()), float(current.sum())
+        uplift = proposed_revenue - current_revenue
+        
+        return {
+            "scenarios_requested": scenarios,
+            "scenarios_run": int(done),
+            "truncated": done < scenarios,
+            "seed": seed,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+            "proposed": {
+                "spend": proposed_spend,
+                "revenue": BudgetSimulator._summary(proposed_revenue),
+                "roas": BudgetSimulator._summary(proposed_revenue / proposed_spend) if proposed_spend > 0 else None,
+            },
+            "current": {
+                "spend": current_spend,
+                "revenue": BudgetSimulator._summary(current_revenue),
+                "roas": BudgetSimulator._summary(current_revenue / current_spend) if current_spend > 0 else None,
+            },
+            "revenue_uplift": BudgetSimulator._summary(uplift),
+            "probability_of_uplift": float((uplift > 0).mean()),
+            "campaigns": [
+                {
+                    "campaign_id": int(campaign_ids[i]),
+                    "campaign_name": history["campaign_name"][i],
+                    "platform": history["platform"][i],
+                    "current_spend": float(current[i]),
+                    "proposed_spend": float(proposed[i]),
+                    "expected_leads": float(params["lead_rate"][i] * proposed[i]),
+                    "conversion_rate": float(params["alpha"][i] / (params["alpha"][i] + params["beta"][i])),
+                    "avg_deal_value": float(params["value_mean"][i]),
+                }
+                for i in range(len(campaign_ids))
+            ],
+        }
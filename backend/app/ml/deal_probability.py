@@ -1,88 +1,132 @@
 import pickle
 import os
-from typing import Dict, List
+import shutil
+import tempfile
+from typing import Dict, List, Optional, Set, Tuple
 import numpy as np
-from sklearn.linear_model import LogisticRegression
-from sklearn.preprocessing import StandardScaler
 from sqlalchemy.orm import Session
-from app.models import Lead, Campaign, Company
+from app.core.config import get_settings
+from app.models import Lead, LeadFeature
+from app.ml.inference import DealModelWeights
+from app.services.lead_features import LeadFeatureService, INDUSTRY_TO_NUMBER, STAGE_TO_NUMBER, FEATURE_COLUMNS
 from datetime import datetime
 
+settings = get_settings()
+
 class DealProbabilityService:
     """Service for AI-based deal probability scoring"""
     
-    MODEL_PATH = "app/ml/models/deal_probability_model.pkl"
-    SCALER_PATH = "app/ml/models/deal_probability_scaler.pkl"
+    # Each scope (global, company_<id>, industry_<code>) has its own artifact directory
+    GLOBAL_SCOPE = "global"
+    # Trainer state (sklearn objects); only read back by the trainer itself
+    MODEL_FILE = "deal_probability_model.pkl"
+    # Published inference weights; scoring only ever reads this file
+    WEIGHTS_FILE = "deal_probability_weights.npz"
+    HEURISTIC_VERSION = "heuristic"
+    
+    # In-process copies of published weights: scope -> (file mtime, weights)
+    _weights_cache: Dict[str, Tuple[int, Dict]] = {}
     
     @staticmethod
-    def train_model(db: Session) -> None:
-        """Train the deal probability model on historical data"""
-        # Get all leads with outcomes
-        leads = db.query(Lead).filter(Lead.deal_value > 0).all()
-        
-        if len(leads) < 5:
+    def company_scope(company_id: int) -> str:
+        return f"company_{company_id}"
+    
+    @staticmethod
+    def industry_scope(industry_code: int) -> str:
+        return f"industry_{industry_code}"
+    
+    @staticmethod
+    def _scope_dir(scope: str) -> str:
+        return os.path.join(settings.DEAL_MODEL_DIR, scope)
+    
+    @staticmethod
+    def _model_path(scope: str) -> str:
+        return os.path.join(DealProbabilityService._scope_dir(scope), DealProbabilityService.MODEL_FILE)
+    
+    @staticmethod
+    def _weights_path(scope: str) -> str:
+        return os.path.join(DealProbabilityService._scope_dir(scope), DealProbabilityService.WEIGHTS_FILE)
+    
+    @staticmethod
+    def train_model(db: Session, fingerprint: Optional[str] = None) -> None:
+        """Train the global deal probability model on historical data"""
+        # Feature vectors for all leads with a deal value, read in one query
+        LeadFeatureService.ensure_backfilled(db)
+        _, _, X, y = LeadFeatureService.load_matrix(db, require_deal_value=True)
+        DealProbabilityService.fit_and_publish(X, y, DealProbabilityService.GLOBAL_SCOPE, fingerprint)
+    
+    @staticmethod
+    def fit_and_publish(
+        X: np.ndarray,
+        y: np.ndarray,
+        scope: str,
+        fingerprint: Optional[str] = None,
+    ) -> str:
+        """Fit a logistic model for one scope and publish it. Safe to run in a worker process."""
+        if len(X) < 5 or len(set(y.tolist())) < 2:
             # Not enough data, create a dummy model
-            DealProbabilityService._create_dummy_model()
-            return
+            DealProbabilityService._create_dummy_model(fingerprint, scope)
+            return scope
         
-        # Feature engineering
-        X = []
-        y = []
+        # sklearn is only needed for fitting, so keep it off the import path
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import StandardScaler
         
-        for lead in leads:
-            # Features
-            num_touchpoints = len(lead.touchpoints) if lead.touchpoints else 0
-            stage_to_number = {"MQL": 1, "SQL": 2, "Opportunity": 3, "Won": 4, "Lost": 0}
-            stage = stage_to_number.get(lead.stage, 0)
-            
-            # Get campaign spend for this lead
-            campaign_spend = 0.0
-            if lead.touchpoints:
-                for campaign_id in lead.touchpoints:
-                    campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
-                    if campaign:
-                        campaign_spend += campaign.cost
-            
-            # Get company industry as numerical
-            industry_to_number = {"SaaS": 1, "Fintech": 2, "Healthcare": 3, "Enterprise": 4, "Other": 0}
-            industry = industry_to_number.get(lead.company.industry if lead.company else "Other", 0)
-            
-            features = [
-                num_touchpoints,
-                campaign_spend,
-                industry,
-                stage,
-                lead.deal_value / 1000 if lead.deal_value > 0 else 0  # Normalized
-            ]
-            
-            X.append(features)
-            # Target: 1 if Won, 0 if Lost
-            y.append(1 if lead.stage == "Won" else 0)
+        # Scale features
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
         
-        if len(X) > 1:
-            X = np.array(X)
-            y = np.array(y)
-            
-            # Scale features
+        # Train logistic regression
+        model = LogisticRegression(random_state=42)
+        model.fit(X_scaled, y)
+        
+        DealProbabilityService._publish_model(model, scaler, fingerprint, scope=scope)
+        return scope
+    
+    @staticmethod
+    def train_incremental(db: Session, fingerprint: Optional[str] = None) -> int:
+        """Update the global model with outcomes recorded since the last checkpoint. Returns samples consumed."""
+        from sklearn.linear_model import SGDClassifier
+        from sklearn.preprocessing import StandardScaler
+        
+        LeadFeatureService.ensure_backfilled(db)
+        bundle = DealProbabilityService._load_training_state(DealProbabilityService.GLOBAL_SCOPE)
+        
+        if bundle is not None and bundle.get("mode") == "incremental":
+            # Freshly unpickled, so updating them never affects readers
+            model = bundle["model"]
+            scaler = bundle["scaler"]
+            checkpoint = bundle.get("checkpoint")
+            seen = bundle.get("checkpoint_seen", set())
+        else:
+            # First incremental run bootstraps from the full outcome history
+            model = SGDClassifier(loss="log_loss", random_state=42)
             scaler = StandardScaler()
-            X_scaled = scaler.fit_transform(X)
-            
-            # Train logistic regression
-            model = LogisticRegression(random_state=42)
-            model.fit(X_scaled, y)
-            
-            # Save model and scaler
-            os.makedirs("app/ml/models", exist_ok=True)
-            pickle.dump(model, open(DealProbabilityService.MODEL_PATH, "wb"))
-            pickle.dump(scaler, open(DealProbabilityService.SCALER_PATH, "wb"))
+            checkpoint = None
+            seen = set()
+        
+        X, y, new_checkpoint, new_seen = LeadFeatureService.load_outcomes_since(
+            db, checkpoint, seen, overlap_seconds=settings.DEAL_MODEL_OUTCOME_OVERLAP_SECONDS
+        )
+        if len(X) == 0:
+            return 0
+        
+        # Running mean/variance, then one SGD pass over the new outcomes only
+        scaler.partial_fit(X)
+        model.partial_fit(scaler.transform(X), y, classes=np.array([0, 1]))
+        
+        DealProbabilityService._publish_model(
+            model, scaler, fingerprint, mode="incremental", checkpoint=new_checkpoint, checkpoint_seen=new_seen
+        )
+        return len(X)
     
     @staticmethod
-    def _create_dummy_model() -> None:
+    def _create_dummy_model(fingerprint: Optional[str] = None, scope: str = GLOBAL_SCOPE) -> None:
         """Create a dummy model for testing"""
-        # Create a simple model that assigns probabilities based on features
-        os.makedirs("app/ml/models", exist_ok=True)
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import StandardScaler
         
-        # Simple model
+        # Simple model that assigns probabilities based on features
         model = LogisticRegression(random_state=42)
         X_dummy = np.array([[1, 100, 1, 1, 10], [2, 200, 2, 2, 20]])
         y_dummy = np.array([0, 1])
@@ -91,8 +135,243 @@ class DealProbabilityService:
         X_scaled = scaler.fit_transform(X_dummy)
         model.fit(X_scaled, y_dummy)
         
-        pickle.dump(model, open(DealProbabilityService.MODEL_PATH, "wb"))
-        pickle.dump(scaler, open(DealProbabilityService.SCALER_PATH, "wb"))
+        DealProbabilityService._publish_model(model, scaler, fingerprint, scope=scope)
+    
+    @staticmethod
+    def _publish_model(
+        model,
+        scaler,
+        fingerprint: Optional[str],
+        scope: str = GLOBAL_SCOPE,
+        mode: str = "full",
+        checkpoint: Optional[datetime] = None,
+        checkpoint_seen: Optional[Set[Tuple[int, datetime]]] = None,
+        candidate: Optional[str] = None,
+    ) -> None:
+        """Atomically replace the published model bundle for a scope"""
+        os.makedirs(DealProbabilityService._scope_dir(scope), exist_ok=True)
+        trained_at = datetime.utcnow()
+        bundle = {
+            "model": model,
+            "scaler": scaler,
+            "fingerprint": fingerprint,
+            "scope": scope,
+            "mode": mode,
+            "checkpoint": checkpoint,
+            "checkpoint_seen": checkpoint_seen or set(),
+            "candidate": candidate,
+            "version": f"{scope}:{trained_at.strftime('%Y%m%d%H%M%S%f')}",
+            "trained_at": trained_at.isoformat(),
+        }
+        
+        metadata = {key: bundle[key] for key in ("fingerprint", "scope", "mode", "candidate", "version", "trained_at")}
+        metadata["checkpoint"] = checkpoint.isoformat() if checkpoint else None
+        
+        # Training state first, then the weights file that readers watch
+        DealProbabilityService._atomic_write(
+            DealProbabilityService._model_path(scope), lambda f: pickle.dump(bundle, f)
+        )
+        DealProbabilityService._atomic_write(
+            DealProbabilityService._weights_path(scope),
+            lambda f: DealModelWeights.save(f, DealModelWeights.export(model, scaler), metadata),
+        )
+    
+    @staticmethod
+    def record_fingerprint(fingerprint: Optional[str], scope: str = GLOBAL_SCOPE) -> None:
+        """Mark a scope's published model as trained on this data without refitting; its version is kept"""
+        bundle = DealProbabilityService._load_training_state(scope)
+        weights = DealProbabilityService.load_weights(scope)
+        if bundle is None or weights is None:
+            return
+        
+        bundle["fingerprint"] = fingerprint
+        metadata = dict(weights["metadata"], fingerprint=fingerprint)
+        arrays = {key: weights[key] for key in ("coef", "intercept", "mean", "scale")}
+        DealProbabilityService._atomic_write(
+            DealProbabilityService._model_path(scope), lambda f: pickle.dump(bundle, f)
+        )
+        DealProbabilityService._atomic_write(
+            DealProbabilityService._weights_path(scope), lambda f: DealModelWeights.save(f, arrays, metadata)
+        )
+    
+    @staticmethod
+    def _atomic_write(path: str, write) -> None:
+        """Write to a temp file in the same directory, then rename over `path`
+        so readers never observe a half-written artifact"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    @staticmethod
+    def remove_scope(scope: str) -> None:
+        """Unpublish a scope's model so its leads fall back to a broader one"""
+        shutil.rmtree(DealProbabilityService._scope_dir(scope), ignore_errors=True)
+        DealProbabilityService._weights_cache.pop(scope, None)
+    
+    @staticmethod
+    def _load_training_state(scope: str) -> Optional[Dict]:
+        """Load the pickled sklearn objects the trainer continues from"""
+        path = DealProbabilityService._model_path(scope)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    
+    @staticmethod
+    def load_weights(scope: str = GLOBAL_SCOPE) -> Optional[Dict]:
+        """Load a scope's published inference weights, reusing the cached copy if unchanged"""
+        path = DealProbabilityService._weights_path(scope)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            DealProbabilityService._weights_cache.pop(scope, None)
+            return None
+        
+        cached = DealProbabilityService._weights_cache.get(scope)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, DealModelWeights.load(path))
+            DealProbabilityService._weights_cache[scope] = cached
+        
+        return cached[1]
+    
+    @staticmethod
+    def load_metadata(scope: str = GLOBAL_SCOPE) -> Optional[Dict]:
+        """Metadata (fingerprint, version, mode) of a scope's published model"""
+        weights = DealProbabilityService.load_weights(scope)
+        return weights["metadata"] if weights is not None else None
+    
+    @staticmethod
+    def resolve_weights(company_id: Optional[int] = None, industry_code: Optional[int] = None) -> Optional[Dict]:
+        """Most specific published model for a lead: company, then industry, then global"""
+        scopes = []
+        if company_id is not None and settings.DEAL_MODEL_PER_COMPANY:
+            scopes.append(DealProbabilityService.company_scope(company_id))
+        if industry_code is not None and settings.DEAL_MODEL_PER_INDUSTRY:
+            scopes.append(DealProbabilityService.industry_scope(industry_code))
+        scopes.append(DealProbabilityService.GLOBAL_SCOPE)
+        
+        for scope in scopes:
+            weights = DealProbabilityService.load_weights(scope)
+            if weights is not None:
+                return weights
+        return None
+    
+    @staticmethod
+    def _version(weights: Optional[Dict]) -> str:
+        if weights is None:
+            return DealProbabilityService.HEURISTIC_VERSION
+        metadata = weights["metadata"]
+        return metadata.get("version") or metadata.get("fingerprint") or "unversioned"
+    
+    @staticmethod
+    def current_version(company_id: Optional[int] = None, industry_code: Optional[int] = None) -> str:
+        """Version of the model used for scoring a company's leads right now"""
+        return DealProbabilityService._version(DealProbabilityService.resolve_weights(company_id, industry_code))
+    
+    @staticmethod
+    def current_versions(companies: Dict[int, Optional[int]]) -> Dict[int, str]:
+        """current_version for many companies (company_id -> industry_code), reading each published scope once"""
+        try:
+            published = set(os.listdir(settings.DEAL_MODEL_DIR))
+        except FileNotFoundError:
+            published = set()
+        scope_weights = {}
+        
+        def weights_for(scope: str) -> Optional[Dict]:
+            if scope not in published:
+                return None
+            if scope not in scope_weights:
+                scope_weights[scope] = DealProbabilityService.load_weights(scope)
+            return scope_weights[scope]
+        
+        versions = {}
+        for company_id, industry_code in companies.items():
+            weights = None
+            if company_id is not None and settings.DEAL_MODEL_PER_COMPANY:
+                weights = weights_for(DealProbabilityService.company_scope(company_id))
+            if weights is None and industry_code is not None and settings.DEAL_MODEL_PER_INDUSTRY:
+                weights = weights_for(DealProbabilityService.industry_scope(industry_code))
+            if weights is None:
+                weights = weights_for(DealProbabilityService.GLOBAL_SCOPE)
+            versions[company_id] = DealProbabilityService._version(weights)
+        return versions
+    
+    @staticmethod
+    def predict_batch(
+        X: np.ndarray,
+        company_ids: Optional[np.ndarray] = None,
+        explain: bool = False,
+    ):
+        """Predict close probabilities (0-100) for a feature matrix, using each row's company model
+        
+        With explain=True also returns an (n, features) matrix of log-odds contributions;
+        rows scored by the heuristic fallback are NaN.
+        """
+        if len(X) == 0:
+            return (np.empty(0), np.empty((0, X.shape[1]))) if explain else np.empty(0)
+        
+        if company_ids is None:
+            groups = [(None, None, slice(None))]
+        else:
+            # Sort rows by company once; each company's rows are then one contiguous index range
+            unique_ids, inverse = np.unique(np.asarray(company_ids).astype(np.int64), return_inverse=True)
+            order = np.argsort(inverse, kind="stable")
+            bounds = np.concatenate(([0], np.cumsum(np.bincount(inverse, minlength=len(unique_ids)))))
+            groups = []
+            for i, company_id in enumerate(unique_ids):
+                rows = order[bounds[i]:bounds[i + 1]]
+                # A company has a single industry, so any row's code identifies it
+                industry_code = int(X[rows[0], 2])
+                groups.append((int(company_id), industry_code, rows))
+        
+        probabilities = np.empty(len(X))
+        contributions = np.full(X.shape, np.nan) if explain else None
+        for company_id, industry_code, rows in groups:
+            probabilities[rows], group_contributions = DealProbabilityService._predict_group(
+                X[rows], company_id, industry_code, explain
+            )
+            if group_contributions is not None:
+                contributions[rows] = group_contributions
+        
+        # Clamp between 0 and 100
+        probabilities = np.clip(probabilities, 0, 100)
+        return (probabilities, contributions) if explain else probabilities
+    
+    @staticmethod
+    def _predict_group(
+        X: np.ndarray,
+        company_id: Optional[int],
+        industry_code: Optional[int],
+        explain: bool = False,
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Score rows that share one model"""
+        try:
+            # Scoring never trains; until a model is published the heuristic below is used
+            weights = DealProbabilityService.resolve_weights(company_id, industry_code)
+            if weights is None:
+                raise FileNotFoundError(DealProbabilityService.WEIGHTS_FILE)
+            
+            probabilities = DealModelWeights.predict_proba(weights, X) * 100
+            contributions = DealModelWeights.contributions(weights, X) if explain else None
+            return probabilities, contributions
+        except Exception:
+            return DealProbabilityService._heuristic_batch(X), None
+    
+    @staticmethod
+    def _heuristic_batch(X: np.ndarray) -> np.ndarray:
+        """Fallback simple heuristic used when no model is available"""
+        stage_boost = np.select(
+            [X[:, 3] == STAGE_TO_NUMBER["SQL"], X[:, 3] == STAGE_TO_NUMBER["Opportunity"], X[:, 3] == STAGE_TO_NUMBER["Won"]],
+            [15.0, 30.0, 100.0],
+            default=0.0,
+        )
+        return 20.0 + X[:, 0] * 5 + np.minimum(X[:, 1] / 100, 30) + stage_boost
     
     @staticmethod
     def predict_probability(
@@ -104,72 +383,41 @@ class DealProbabilityService:
         db: Session = None
     ) -> float:
         """Predict deal close probability for a lead"""
-        try:
-            # Load model and scaler
-            if not os.path.exists(DealProbabilityService.MODEL_PATH):
-                DealProbabilityService.train_model(db)
-            
-            model = pickle.load(open(DealProbabilityService.MODEL_PATH, "rb"))
-            scaler = pickle.load(open(DealProbabilityService.SCALER_PATH, "rb"))
-            
-            # Prepare features
-            industry_to_number = {"SaaS": 1, "Fintech": 2, "Healthcare": 3, "Enterprise": 4, "Other": 0}
-            stage_to_number = {"MQL": 1, "SQL": 2, "Opportunity": 3, "Won": 4, "Lost": 0}
-            
-            features = np.array([[
-                num_touchpoints,
-                campaign_spend,
-                industry_to_number.get(industry, 0),
-                stage_to_number.get(stage, 0),
-                deal_value / 1000 if deal_value > 0 else 0
-            ]])
-            
-            # Scale and predict
-            features_scaled = scaler.transform(features)
-            probability = float(model.predict_proba(features_scaled)[0][1]) * 100
-            
-            # Clamp between 0 and 100
-            return max(0, min(100, probability))
-        except Exception as e:
-            # Fallback simple heuristic
-            base_prob = 20.0
-            base_prob += num_touchpoints * 5
-            base_prob += min(campaign_spend / 100, 30)
-            stage_boost = {"MQL": 0, "SQL": 15, "Opportunity": 30, "Won": 100, "Lost": 0}.get(stage, 0)
-            base_prob += stage_boost
-            return max(0, min(100, base_prob))
+        features = np.array([[
+            num_touchpoints,
+            campaign_spend,
+            INDUSTRY_TO_NUMBER.get(industry, 0),
+            STAGE_TO_NUMBER.get(stage, 0),
+            deal_value / 1000 if deal_value > 0 else 0
+        ]], dtype=np.float64)
+        
+        return float(DealProbabilityService.predict_batch(features)[0])
     
     @staticmethod
     def get_high_probability_leads(threshold: float, db: Session) -> List[Dict]:
         """Get leads with high close probability"""
-        leads = db.query(Lead).all()
-        high_prob_leads = []
+        LeadFeatureService.ensure_backfilled(db)
+        rows = db.query(
+            Lead.id, Lead.name, Lead.stage, Lead.deal_value, Lead.company_id, *FEATURE_COLUMNS
+        ).join(LeadFeature, LeadFeature.lead_id == Lead.id).all()
         
-        for lead in leads:
-            campaign_spend = 0.0
-            if lead.touchpoints:
-                for campaign_id in lead.touchpoints:
-                    campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
-                    if campaign:
-                        campaign_spend += campaign.cost
-            
-            prob = DealProbabilityService.predict_probability(
-                len(lead.touchpoints) if lead.touchpoints else 0,
-                campaign_spend,
-                lead.company.industry if lead.company else "Other",
-                lead.stage,
-                lead.deal_value,
-                db
-            )
-            
+        if not rows:
+            return []
+        
+        X = np.array([row[5:] for row in rows], dtype=np.float64)
+        company_ids = np.array([row[4] for row in rows])
+        probabilities = DealProbabilityService.predict_batch(X, company_ids)
+        
+        high_prob_leads = []
+        for row, prob in zip(rows, probabilities):
             if prob >= threshold:
                 high_prob_leads.append({
-                    "lead_id": lead.id,
-                    "lead_name": lead.name,
-                    "stage": lead.stage,
-                    "deal_value": lead.deal_value,
-                    "probability": prob,
-                    "num_touchpoints": len(lead.touchpoints) if lead.touchpoints else 0
+                    "lead_id": row[0],
+                    "lead_name": row[1],
+                    "stage": row[2],
+                    "deal_value": row[3],
+                    "probability": float(prob),
+                    "num_touchpoints": int(row[5])
                 })
         
         return sorted(high_prob_leads, key=lambda x: x["probability"], reverse=True)
@@ -0,0 +1,62 @@
+from typing import BinaryIO, Dict, Optional
+import numpy as np
+
+class DealModelWeights:
+    """Dependency-free logistic scorer over weights exported from the trained model"""
+    
+    @staticmethod
+    def export(model, scaler) -> Dict[str, np.ndarray]:
+        """Extract the arrays needed for inference from fitted sklearn objects"""
+        return {
+            "coef": np.asarray(model.coef_, dtype=np.float64).ravel(),
+            "intercept": np.asarray(model.intercept_, dtype=np.float64).ravel()[:1],
+            "mean": np.asarray(scaler.mean_, dtype=np.float64),
+            "scale": np.asarray(scaler.scale_, dtype=np.float64),
+        }
+    
+    @staticmethod
+    def save(f: BinaryIO, weights: Dict[str, np.ndarray], metadata: Dict[str, Optional[str]]) -> None:
+        """Write weights plus string metadata as an uncompressed .npz"""
+        arrays = dict(weights)
+        for key, value in metadata.items():
+            arrays[f"meta_{key}"] = np.array("" if value is None else str(value))
+        np.savez(f, **arrays)
+    
+    @staticmethod
+    def load(path: str) -> Dict:
+        """Load weights and metadata; never unpickles"""
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files if not key.startswith("meta_")}
+            metadata = {key[5:]: (str(data[key]) or None) for key in data.files if key.startswith("meta_")}
+        
+        weights = DealModelWeights.from_arrays(arrays["coef"], arrays["intercept"], arrays["mean"], arrays["scale"])
+        weights["metadata"] = metadata
+        return weights
+    
+    @staticmethod
+    def from_arrays(coef: np.ndarray, intercept: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> Dict:
+        """Build scoring weights directly from in-memory arrays"""
+        weights = {
+            "coef": np.asarray(coef, dtype=np.float64).ravel(),
+            "intercept": np.asarray(intercept, dtype=np.float64).ravel()[:1],
+            "mean": np.asarray(mean, dtype=np.float64),
+            "scale": np.asarray(scale, dtype=np.float64),
+        }
+        # Fold standardization into the linear term once: (x - mean) / scale . coef
+        scale = np.where(weights["scale"] == 0, 1.0, weights["scale"])
+        weights["scaled_coef"] = weights["coef"] / scale
+        weights["scaled_intercept"] = float(weights["intercept"][0] - np.dot(weights["mean"], weights["scaled_coef"]))
+        return weights
+    
+    @staticmethod
+    def contributions(weights: Dict, X: np.ndarray) -> np.ndarray:
+        """Per-feature log-odds contributions: standardized features times coefficients"""
+        scale = np.where(weights["scale"] == 0, 1.0, weights["scale"])
+        return (X - weights["mean"]) / scale * weights["coef"]
+    
+    @staticmethod
+    def predict_proba(weights: Dict, X: np.ndarray) -> np.ndarray:
+        """Probability of the positive class for each row of X"""
+        logits = X @ weights["scaled_coef"] + weights["scaled_intercept"]
+        # Numerically stable logistic
+        return np.exp(-np.logaddexp(0.0, -logits))
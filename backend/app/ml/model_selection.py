@@ -0,0 +1,217 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import get_settings
+from app.ml.deal_probability import DealProbabilityService
+from app.ml.inference import DealModelWeights
+
+settings = get_settings()
+
+# Only linear logistic models: the published artifact is DealModelWeights,
+# so every candidate must expose coef_/intercept_ and a log-loss probability
+CANDIDATES = [
+    {"name": "logreg_c1", "estimator": "logistic", "params": {"C": 1.0}},
+    {"name": "logreg_c0.1", "estimator": "logistic", "params": {"C": 0.1}},
+    {"name": "logreg_c10", "estimator": "logistic", "params": {"C": 10.0}},
+    {"name": "logreg_c0.01", "estimator": "logistic", "params": {"C": 0.01}},
+    {"name": "logreg_balanced", "estimator": "logistic", "params": {"C": 1.0, "class_weight": "balanced"}},
+    {"name": "sgd_l2", "estimator": "sgd", "params": {"alpha": 1e-4}},
+    {"name": "sgd_elasticnet", "estimator": "sgd", "params": {"alpha": 1e-4, "penalty": "elasticnet"}},
+]
+# What DealProbabilityService.fit_and_publish fits
+DEFAULT_CANDIDATE = "logreg_c1"
+
+# (X_train_scaled, y_train, X_test_raw, y_test, mean, scale) per fold
+Fold = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+def _build(candidate: Dict):
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    if candidate["estimator"] == "sgd":
+        return SGDClassifier(loss="log_loss", random_state=42, **candidate["params"])
+    return LogisticRegression(random_state=42, max_iter=1000, **candidate["params"])
+
+def _evaluate(candidate: Dict, folds: List[Fold]) -> Dict:
+    """Cross-validate one candidate on precomputed folds. Runs in a worker process."""
+    from sklearn.metrics import roc_auc_score
+    
+    aucs, train_seconds, latencies = [], 0.0, []
+    for X_train, y_train, X_test, y_test, mean, scale in folds:
+        model = _build(candidate)
+        start = time.perf_counter()
+        model.fit(X_train, y_train)
+        train_seconds += time.perf_counter() - start
+        
+        # Latency is measured on the production scorer, not on sklearn
+        weights = DealModelWeights.from_arrays(model.coef_, model.intercept_, mean, scale)
+        start = time.perf_counter()
+        probabilities = DealModelWeights.predict_proba(weights, X_test)
+        latencies.append((time.perf_counter() - start) / max(len(X_test), 1) * 1e6)
+        aucs.append(roc_auc_score(y_test, probabilities))
+    
+    return {
+        "name": candidate["name"],
+        "auc": float(np.mean(aucs)),
+        "auc_std": float(np.std(aucs)),
+        "train_seconds": round(train_seconds, 4),
+        "latency_us": round(float(np.median(latencies)), 4),
+    }
+
+class DealModelSelector:
+    """Time-budgeted cross-validated model selection for the deal model"""
+    
+    REPORT_FILE = "model_report.json"
+    
+    # Fold matrices keyed by (scope, fingerprint, folds); reused across candidates and runs
+    _fold_cache: Dict[Tuple[str, Optional[str], int], List[Fold]] = {}
+    
+    @staticmethod
+    def build_folds(X: np.ndarray, y: np.ndarray, n_folds: int, cache_key=None) -> List[Fold]:
+        """Stratified folds with the scaler fit on each training split only"""
+        if cache_key is not None and cache_key in DealModelSelector._fold_cache:
+            return DealModelSelector._fold_cache[cache_key]
+        
+        from sklearn.model_selection import StratifiedKFold
+        from sklearn.preprocessing import StandardScaler
+        
+        folds = []
+        splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=42)
+        for train_idx, test_idx in splitter.split(X, y):
+            scaler = StandardScaler().fit(X[train_idx])
+            folds.append((
+                scaler.transform(X[train_idx]), y[train_idx],
+                X[test_idx], y[test_idx],
+                scaler.mean_, scaler.scale_,
+            ))
+        
+        if cache_key is not None:
+            # Only the latest data version per scope is worth keeping
+            for key in [k for k in DealModelSelector._fold_cache if k[0] == cache_key[0]]:
+                del DealModelSelector._fold_cache[key]
+            DealModelSelector._fold_cache[cache_key] = folds
+        return folds
+    
+    @staticmethod
+    def evaluate_candidates(
+        candidates: List[Dict],
+        folds: List[Fold],
+        budget_seconds: float,
+        workers: int,
+    ) -> Tuple[List[Dict], List[str]]:
+        """Evaluate candidates in order until the wall-clock budget runs out"""
+        deadline = time.perf_counter() + budget_seconds
+        results, skipped = [], []
+        
+        if workers <= 1:
+            for candidate in candidates:
+                if time.perf_counter() >= deadline:
+                    skipped.append(candidate["name"])
+                    continue
+                results.append(_evaluate(candidate, folds))
+            return results, skipped
+        
+        context = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(candidates)), mp_context=context)
+        not_done = set()
+        try:
+            futures = {pool.submit(_evaluate, candidate, folds): candidate["name"] for candidate in candidates}
+            done, not_done = wait(futures, timeout=max(0.0, deadline - time.perf_counter()))
+            for future in futures:
+                if future in done and future.exception() is None:
+                    results.append(future.result())
+                else:
+                    skipped.append(futures[future])
+        finally:
+            # Over-budget candidates are abandoned, not waited for. Cancelling only drops queued
+            # ones; fits already running would keep their worker busy past the budget.
+            processes = list((pool._processes or {}).values()) if not_done else []
+            pool.shutdown(wait=False, cancel_futures=True)
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join(timeout=1.0)
+        return results, skipped
+    
+    @staticmethod
+    def select_and_publish(
+        X: np.ndarray,
+        y: np.ndarray,
+        scope: str,
+        fingerprint: Optional[str] = None,
+    ) -> Dict:
+        """Cross-validate candidates, publish the winner if it beats the current model, and write a report"""
+        class_counts = np.bincount(y, minlength=2) if len(y) else np.zeros(2, dtype=int)
+        n_folds = min(settings.DEAL_MODEL_CV_FOLDS, int(class_counts.min()))
+        if n_folds < 2:
+            # Too few outcomes to validate anything; plain fit (or dummy model)
+            DealProbabilityService.fit_and_publish(X, y, scope, fingerprint)
+            return {"scope": scope, "published": DEFAULT_CANDIDATE, "reason": "insufficient data for cross-validation"}
+        
+        started = time.perf_counter()
+        metadata = DealProbabilityService.load_metadata(scope)
+        current = (metadata.get("candidate") or DEFAULT_CANDIDATE) if metadata else None
+        
+        # The current configuration is evaluated first so it is always comparable
+        ordered = sorted(CANDIDATES, key=lambda c: c["name"] != (current or DEFAULT_CANDIDATE))
+        folds = DealModelSelector.build_folds(X, y, n_folds, cache_key=(scope, fingerprint, n_folds))
+        results, skipped = DealModelSelector.evaluate_candidates(
+            ordered, folds, settings.DEAL_MODEL_SELECTION_BUDGET_SECONDS, settings.DEAL_MODEL_TRAIN_WORKERS
+        )
+        
+        by_name = {r["name"]: r for r in results}
+        eligible = [r for r in results if r["latency_us"] <= settings.DEAL_MODEL_MAX_LATENCY_US]
+        best = max(eligible, key=lambda r: r["auc"]) if eligible else None
+        baseline = by_name.get(current) if current else None
+        
+        if best is None:
+            chosen, reason = current or DEFAULT_CANDIDATE, "no candidate met the latency ceiling"
+        elif baseline is None:
+            chosen, reason = best["name"], "no current model to compare against" if current is None else "current model was not evaluated within budget"
+        elif best["auc"] > baseline["auc"] and best["latency_us"] <= max(baseline["latency_us"], settings.DEAL_MODEL_MAX_LATENCY_US):
+            chosen, reason = best["name"], "beats current model on AUC within latency constraints"
+        else:
+            # Keep the current configuration, refit on the new data
+            chosen, reason = current, "current model not beaten"
+        
+        # Refit the chosen configuration on all data and publish it
+        from sklearn.preprocessing import StandardScaler
+        candidate = next(c for c in CANDIDATES if c["name"] == chosen)
+        scaler = StandardScaler()
+        model = _build(candidate)
+        model.fit(scaler.fit_transform(X), y)
+        DealProbabilityService._publish_model(model, scaler, fingerprint, scope=scope, mode="select", candidate=chosen)
+        
+        report = {
+            "scope": scope,
+            "fingerprint": fingerprint,
+            "created_at": datetime.utcnow().isoformat(),
+            "num_samples": int(len(y)),
+            "folds": n_folds,
+            "budget_seconds": settings.DEAL_MODEL_SELECTION_BUDGET_SECONDS,
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+            "max_latency_us": settings.DEAL_MODEL_MAX_LATENCY_US,
+            "previous": current,
+            "published": chosen,
+            "reason": reason,
+            "candidates": sorted(results, key=lambda r: r["auc"], reverse=True),
+            "skipped": skipped,
+        }
+        DealModelSelector._write_report(scope, report)
+        return report
+    
+    @staticmethod
+    def _write_report(scope: str, report: Dict) -> None:
+        path = os.path.join(DealProbabilityService._scope_dir(scope), DealModelSelector.REPORT_FILE)
+        DealProbabilityService._atomic_write(path, lambda f: f.write(json.dumps(report, indent=2).encode()))
+    
+    @staticmethod
+    def load_report(scope: str = DealProbabilityService.GLOBAL_SCOPE) -> Optional[Dict]:
+        path = os.path.join(DealProbabilityService._scope_dir(scope), DealModelSelector.REPORT_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
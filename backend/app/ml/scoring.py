@@ -0,0 +1,250 @@
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from sqlalchemy import case, func, insert, or_
+from app.core.config import get_settings
+from app.db.database import SessionLocal
+from app.models import Lead, Campaign, Company, LeadFeature, LeadScore
+from app.ml.batcher import MicroBatcher
+from app.ml.deal_probability import DealProbabilityService
+from app.schemas.lead import LeadScoreRequest
+from app.services.lead_features import LeadFeatureService, FEATURE_COLUMNS, FEATURE_NAMES, INDUSTRY_TO_NUMBER, STAGE_TO_NUMBER, chunked
+import numpy as np
+
+settings = get_settings()
+
+class LeadScoringService:
+    """Service persisting deal probability scores for indexed threshold and top-N reads"""
+    
+    @staticmethod
+    def refresh_scores(
+        db: Session,
+        lead_ids: Optional[List[int]] = None,
+        company_id: Optional[int] = None,
+    ) -> int:
+        """Score leads in batch with the current model and persist the results (caller commits)"""
+        query = db.query(LeadFeature.lead_id, LeadFeature.company_id, *FEATURE_COLUMNS)
+        if company_id is not None:
+            query = query.filter(LeadFeature.company_id == company_id)
+        
+        if lead_ids is not None:
+            rows = []
+            for chunk in chunked(list(set(lead_ids))):
+                rows.extend(query.filter(LeadFeature.lead_id.in_(chunk)).all())
+        else:
+            rows = query.all()
+        
+        if not rows:
+            return 0
+        
+        data = np.array(rows, dtype=np.float64)
+        company_ids = data[:, 1].astype(np.int64)
+        explain = settings.SCORING_STORE_EXPLANATIONS
+        if explain:
+            # One vectorized pass yields every lead's per-feature contributions
+            probabilities, contributions = DealProbabilityService.predict_batch(data[:, 2:], company_ids, explain=True)
+        else:
+            probabilities, contributions = DealProbabilityService.predict_batch(data[:, 2:], company_ids), None
+        versions = DealProbabilityService.current_versions(
+            dict(zip(company_ids.tolist(), data[:, 4].astype(np.int64).tolist()))
+        )
+        now = datetime.utcnow()
+        
+        score_rows = [
+            {
+                "lead_id": int(lead_id),
+                "company_id": int(row_company_id),
+                "model_version": versions[int(row_company_id)],
+                "probability": float(prob),
+                "contributions": LeadScoringService._explanation(contributions[i]) if explain else None,
+                "scored_at": now,
+            }
+            for i, (lead_id, row_company_id, prob) in enumerate(zip(data[:, 0], data[:, 1], probabilities))
+        ]
+        
+        scored_ids = [row["lead_id"] for row in score_rows]
+        for chunk in chunked(scored_ids):
+            db.query(LeadScore).filter(LeadScore.lead_id.in_(chunk)).delete(synchronize_session=False)
+        db.execute(insert(LeadScore), score_rows)
+        return len(score_rows)
+    
+    @staticmethod
+    def _explanation(row: np.ndarray) -> Optional[Dict[str, float]]:
+        """Feature name -> contribution, or None when the row was scored by the heuristic"""
+        if np.isnan(row).any():
+            return None
+        return {name: round(float(value), 4) for name, value in zip(FEATURE_NAMES, row)}
+    
+    @staticmethod
+    def refresh_stale(db: Session, company_id: Optional[int] = None) -> int:
+        """Rescore leads whose score is missing, from an older model, or older than their features"""
+        companies = db.query(LeadFeature.company_id, func.max(LeadFeature.industry_code)).group_by(
+            LeadFeature.company_id
+        )
+        if company_id is not None:
+            companies = companies.filter(LeadFeature.company_id == company_id)
+        versions = DealProbabilityService.current_versions(dict(companies.all()))
+        if not versions:
+            return 0
+        
+        # Each company may be scored by its own model: one CASE maps every company to the version
+        # its scores should carry, with the most common version as the default branch
+        default_version = Counter(versions.values()).most_common(1)[0][0]
+        others = {row_company_id: version for row_company_id, version in versions.items() if version != default_version}
+        expected_version = default_version
+        if others:
+            expected_version = case(others, value=LeadFeature.company_id, else_=default_version)
+        query = db.query(LeadFeature.lead_id).outerjoin(
+            LeadScore, LeadScore.lead_id == LeadFeature.lead_id
+        ).filter(
+            or_(
+                LeadScore.lead_id.is_(None),
+                LeadScore.model_version != expected_version,
+                LeadScore.scored_at < LeadFeature.updated_at,
+            )
+        )
+        if company_id is not None:
+            query = query.filter(LeadFeature.company_id == company_id)
+        stale_ids = [lead_id for (lead_id,) in query.all()]
+        
+        if not stale_ids:
+            return 0
+        
+        count = LeadScoringService.refresh_scores(db, lead_ids=stale_ids)
+        db.commit()
+        return count
+    
+    @staticmethod
+    def ensure_scored(company_id: int, db: Session) -> None:
+        """Score a company on first read so the endpoint never returns an empty cold table"""
+        has_scores = db.query(LeadScore.lead_id).filter(LeadScore.company_id == company_id).first()
+        if has_scores is None:
+            LeadFeatureService.ensure_backfilled(db)
+            LeadScoringService.refresh_scores(db, company_id=company_id)
+            db.commit()
+    
+    @staticmethod
+    def remove_leads(lead_ids: List[int], db: Session) -> None:
+        """Drop persisted scores for deleted leads (caller commits)"""
+        for chunk in chunked(list(set(lead_ids))):
+            db.query(LeadScore).filter(LeadScore.lead_id.in_(chunk)).delete(synchronize_session=False)
+    
+    @staticmethod
+    def remove_company(company_id: int, db: Session) -> None:
+        """Drop persisted scores for a company (caller commits)"""
+        db.query(LeadScore).filter(LeadScore.company_id == company_id).delete(synchronize_session=False)
+    
+    @staticmethod
+    def get_scored_leads(
+        company_id: int,
+        threshold: float,
+        limit: int,
+        offset: int,
+        db: Session,
+    ) -> Dict:
+        """Page through a company's leads at or above a probability threshold, best first"""
+        base = db.query(LeadScore).filter(
+            LeadScore.company_id == company_id,
+            LeadScore.probability >= threshold,
+        )
+        total = base.count()
+        
+        rows = db.query(
+            LeadScore.lead_id,
+            Lead.name,
+            Lead.stage,
+            Lead.deal_value,
+            LeadScore.probability,
+            LeadFeature.num_touchpoints,
+            LeadScore.model_version,
+            LeadScore.contributions,
+        ).join(
+            Lead, Lead.id == LeadScore.lead_id
+        ).outerjoin(
+            LeadFeature, LeadFeature.lead_id == LeadScore.lead_id
+        ).filter(
+            LeadScore.company_id == company_id,
+            LeadScore.probability >= threshold,
+        ).order_by(
+            LeadScore.probability.desc(), LeadScore.lead_id
+        ).offset(offset).limit(limit).all()
+        
+        return {
+            "total": total,
+            "leads": [
+                {
+                    "lead_id": lead_id,
+                    "lead_name": name,
+                    "stage": stage,
+                    "deal_value": deal_value,
+                    "probability": probability,
+                    "num_touchpoints": num_touchpoints or 0,
+                    "model_version": model_version,
+                    "contributions": contributions,
+                }
+                for lead_id, name, stage, deal_value, probability, num_touchpoints, model_version, contributions in rows
+            ],
+        }
+    
+    @staticmethod
+    def score_requests(requests: List[LeadScoreRequest]) -> List[Dict]:
+        """Score not-yet-stored leads in one vectorized call; unknown companies get an error entry"""
+        db = SessionLocal()
+        try:
+            # Two lookups for the whole batch instead of per lead
+            campaign_ids = {campaign_id for r in requests for campaign_id in (r.touchpoints or [])}
+            costs = dict(
+                db.query(Campaign.id, Campaign.cost).filter(Campaign.id.in_(campaign_ids)).all()
+            ) if campaign_ids else {}
+            company_ids = {r.company_id for r in requests}
+            industries = dict(
+                db.query(Company.id, Company.industry).filter(Company.id.in_(company_ids)).all()
+            )
+        finally:
+            db.close()
+        
+        known = [r for r in requests if r.company_id in industries]
+        results = [
+            {"company_id": r.company_id, "probability": None, "model_version": None, "error": "Company not found"}
+            for r in requests
+        ]
+        if not known:
+            return results
+        
+        X = np.array([
+            [
+                len(r.touchpoints or []),
+                sum(costs.get(campaign_id) or 0.0 for campaign_id in (r.touchpoints or [])),
+                INDUSTRY_TO_NUMBER.get(industries[r.company_id], 0),
+                STAGE_TO_NUMBER.get(r.stage, 0),
+                r.deal_value / 1000 if r.deal_value > 0 else 0,
+            ]
+            for r in known
+        ], dtype=np.float64)
+        company_array = np.array([r.company_id for r in known])
+        probabilities = DealProbabilityService.predict_batch(X, company_array)
+        # One model lookup per distinct company in the batch
+        versions = DealProbabilityService.current_versions({
+            company_id: INDUSTRY_TO_NUMBER.get(industries[company_id], 0)
+            for company_id in {r.company_id for r in known}
+        })
+        
+        scored = iter(probabilities)
+        for i, r in enumerate(requests):
+            if r.company_id not in industries:
+                continue
+            results[i] = {
+                "company_id": r.company_id,
+                "probability": float(next(scored)),
+                "model_version": versions[r.company_id],
+                "error": None,
+            }
+        return results
+
+# Shared by all requests in this worker process
+lead_scorer = MicroBatcher(
+    LeadScoringService.score_requests,
+    max_batch_size=settings.SCORING_BATCH_MAX_SIZE,
+    max_wait_ms=settings.SCORING_BATCH_MAX_WAIT_MS,
+)
@@ -0,0 +1,209 @@
+import hashlib
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case
+from app.core.config import get_settings
+from app.db.database import SessionLocal
+from app.models import LeadFeature
+from app.ml.deal_probability import DealProbabilityService
+from app.ml.model_selection import DealModelSelector
+from app.ml.scoring import LeadScoringService
+from app.services.lead_features import LeadFeatureService, STAGE_TO_NUMBER
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# (X, y, scope, fingerprint) for one model fit
+TrainingJob = Tuple[np.ndarray, np.ndarray, str, str]
+
+class DealModelTrainer:
+    """Background trainer that refits deal models only when their training data changes"""
+    
+    _lock = threading.Lock()
+    _last_check: Optional[float] = None
+    
+    @staticmethod
+    def compute_fingerprints(db: Session) -> Dict[int, Dict]:
+        """Summarize each company's training data in one grouped query"""
+        rows = db.query(
+            LeadFeature.company_id,
+            func.count(LeadFeature.lead_id),
+            func.max(LeadFeature.lead_id),
+            func.max(LeadFeature.updated_at),
+            func.sum(LeadFeature.is_won),
+            func.sum(case((LeadFeature.stage_code == STAGE_TO_NUMBER["Lost"], 1), else_=0)),
+            func.sum(LeadFeature.stage_code),
+            func.sum(LeadFeature.campaign_spend),
+            func.sum(LeadFeature.deal_value_scaled),
+            func.max(LeadFeature.industry_code),
+        ).filter(LeadFeature.deal_value_scaled > 0).group_by(LeadFeature.company_id).all()
+        
+        fingerprints = {}
+        for row in rows:
+            raw = "|".join(str(v) for v in row[:-1])
+            fingerprints[row[0]] = {
+                "fingerprint": hashlib.sha1(raw.encode()).hexdigest(),
+                "num_samples": row[1],
+                "num_won": row[4] or 0,
+                "industry_code": row[-1],
+            }
+        return fingerprints
+    
+    @staticmethod
+    def _combine(fingerprints: List[str]) -> str:
+        return hashlib.sha1("|".join(sorted(fingerprints)).encode()).hexdigest()
+    
+    @staticmethod
+    def compute_fingerprint(db: Session) -> str:
+        """Fingerprint of the global training set"""
+        fingerprints = DealModelTrainer.compute_fingerprints(db)
+        return DealModelTrainer._combine([f["fingerprint"] for f in fingerprints.values()])
+    
+    @staticmethod
+    def _has_enough_data(stats: Dict) -> bool:
+        """Per-tenant models need enough samples of both outcomes"""
+        return (
+            stats["num_samples"] >= settings.DEAL_MODEL_MIN_COMPANY_SAMPLES
+            and 0 < stats["num_won"] < stats["num_samples"]
+        )
+    
+    @staticmethod
+    def _plan(fingerprints: Dict[int, Dict], force: bool) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        """List (scope, filter_kind, fingerprint) for every scope whose model is stale"""
+        def is_stale(scope: str, fingerprint: str) -> bool:
+            metadata = DealProbabilityService.load_metadata(scope)
+            return force or metadata is None or metadata.get("fingerprint") != fingerprint
+        
+        plan = []
+        global_fingerprint = DealModelTrainer._combine([f["fingerprint"] for f in fingerprints.values()])
+        if is_stale(DealProbabilityService.GLOBAL_SCOPE, global_fingerprint):
+            plan.append((DealProbabilityService.GLOBAL_SCOPE, None, global_fingerprint))
+        
+        if settings.DEAL_MODEL_PER_COMPANY:
+            for company_id, stats in fingerprints.items():
+                scope = DealProbabilityService.company_scope(company_id)
+                if not DealModelTrainer._has_enough_data(stats):
+                    # Small tenants fall back to the industry/global model
+                    if DealProbabilityService.load_metadata(scope) is not None:
+                        DealProbabilityService.remove_scope(scope)
+                    continue
+                if is_stale(scope, stats["fingerprint"]):
+                    plan.append((scope, "company", stats["fingerprint"]))
+        
+        if settings.DEAL_MODEL_PER_INDUSTRY:
+            industries: Dict[int, List[Dict]] = {}
+            for stats in fingerprints.values():
+                industries.setdefault(stats["industry_code"], []).append(stats)
+            for industry_code, members in industries.items():
+                scope = DealProbabilityService.industry_scope(industry_code)
+                combined = {
+                    "num_samples": sum(m["num_samples"] for m in members),
+                    "num_won": sum(m["num_won"] for m in members),
+                }
+                if not DealModelTrainer._has_enough_data(combined):
+                    if DealProbabilityService.load_metadata(scope) is not None:
+                        DealProbabilityService.remove_scope(scope)
+                    continue
+                fingerprint = DealModelTrainer._combine([m["fingerprint"] for m in members])
+                if is_stale(scope, fingerprint):
+                    plan.append((scope, "industry", fingerprint))
+        
+        return plan
+    
+    @staticmethod
+    def run_jobs(jobs: List[TrainingJob], workers: int) -> List[str]:
+        """Fit and publish models, in parallel on a process pool when workers > 1"""
+        if workers <= 1 or len(jobs) <= 1:
+            return [DealProbabilityService.fit_and_publish(*job) for job in jobs]
+        
+        # spawn: forking a process that holds DB connections and threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=context) as pool:
+            futures = [pool.submit(DealProbabilityService.fit_and_publish, *job) for job in jobs]
+            return [future.result() for future in futures]
+    
+    @staticmethod
+    def train_if_stale(db: Optional[Session] = None, force: bool = False) -> bool:
+        """Retrain and publish every model whose fingerprint changed. Returns True if anything trained."""
+        # Only one training run at a time; concurrent callers simply skip
+        if not DealModelTrainer._lock.acquire(blocking=False):
+            return False
+        
+        owns_session = db is None
+        if owns_session:
+            db = SessionLocal()
+        
+        try:
+            LeadFeatureService.ensure_backfilled(db)
+            fingerprints = DealModelTrainer.compute_fingerprints(db)
+            plan = DealModelTrainer._plan(fingerprints, force)
+            
+            trained = False
+            if plan and plan[0][0] == DealProbabilityService.GLOBAL_SCOPE and \
+                    settings.DEAL_MODEL_TRAINING_MODE == "incremental" and not force:
+                # Cost is proportional to new Won/Lost outcomes, not to the whole table
+                _, _, global_fingerprint = plan.pop(0)
+                consumed = DealProbabilityService.train_incremental(db, fingerprint=global_fingerprint)
+                if consumed == 0:
+                    if DealProbabilityService.load_metadata() is None:
+                        DealProbabilityService.train_model(db, fingerprint=global_fingerprint)
+                        trained = True
+                    else:
+                        # No new outcomes (e.g. only spend changed): the model is current for this data
+                        DealProbabilityService.record_fingerprint(global_fingerprint)
+                trained = trained or consumed > 0
+            
+            if plan:
+                # Feature vectors are read once and partitioned per scope
+                _, company_ids, X, y = LeadFeatureService.load_matrix(db, require_deal_value=True)
+                jobs = []
+                for scope, kind, fingerprint in plan:
+                    if kind == "company":
+                        mask = company_ids == int(scope.split("_", 1)[1])
+                    elif kind == "industry":
+                        mask = X[:, 2] == int(scope.split("_", 1)[1])
+                    else:
+                        mask = slice(None)
+                    jobs.append((X[mask], y[mask], scope, fingerprint))
+                
+                if jobs[0][2] == DealProbabilityService.GLOBAL_SCOPE and settings.DEAL_MODEL_TRAINING_MODE == "select":
+                    # The global model is chosen by time-budgeted cross-validation
+                    DealModelSelector.select_and_publish(*jobs.pop(0))
+                DealModelTrainer.run_jobs(jobs, settings.DEAL_MODEL_TRAIN_WORKERS)
+                trained = True
+            
+            # New model versions make the affected scores stale; others only catch up with features
+            LeadScoringService.refresh_stale(db)
+            return trained
+        finally:
+            if owns_session:
+                db.close()
+            DealModelTrainer._lock.release()
+    
+    @staticmethod
+    def request_training() -> None:
+        """Debounced, non-blocking trigger for a background staleness check"""
+        now = time.monotonic()
+        last_check = DealModelTrainer._last_check
+        if last_check is not None and now - last_check < settings.DEAL_MODEL_TRAIN_DEBOUNCE_SECONDS:
+            return
+        if DealModelTrainer._lock.locked():
+            return
+        
+        DealModelTrainer._last_check = now
+        thread = threading.Thread(target=DealModelTrainer._run_background, daemon=True)
+        thread.start()
+    
+    @staticmethod
+    def _run_background() -> None:
+        """Thread entry point; training errors must never surface in a request"""
+        try:
+            DealModelTrainer.train_if_stale()
+        except Exception:
+            logger.exception("Deal model training failed")
@@ -3,6 +3,12 @@ from .company import Company
 from .campaign import Campaign
 from .lead import Lead
 from .attribution import AttributionResult
+from .lead_feature import LeadFeature
+from .lead_touchpoint import LeadTouchpoint
+from .lead_score import LeadScore
+from .budget_rule_set import BudgetRuleSet
+from .campaign_daily_stat import CampaignDailyStat
+from .cache_version import CacheVersion
 
 __all__ = [
     "User",
@@ -10,4 +16,10 @@ __all__ = [
     "Campaign",
     "Lead",
     "AttributionResult",
+    "LeadFeature",
+    "LeadTouchpoint",
+    "LeadScore",
+    "BudgetRuleSet",
+    "CampaignDailyStat",
+    "CacheVersion",
 ]
@@ -1,18 +1,45 @@
-from sqlalchemy import Column, Integer, DateTime, Float, ForeignKey, String, func
+from sqlalchemy import Column, Integer, Float, ForeignKey, Index, SmallInteger
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import relationship
-from datetime import datetime
 from app.db.database import Base
 
+# Stored codes; append new models, never renumber. 0 is never stored, so unknown names match nothing.
+ATTRIBUTION_MODEL_CODES = {"linear": 1, "first_touch": 2, "last_touch": 3, "time_decay": 4}
+ATTRIBUTION_MODEL_NAMES = {code: name for name, code in ATTRIBUTION_MODEL_CODES.items()}
+
+class AttributionModelCode(TypeDecorator):
+    """Attribution model name in Python, small integer code in the database"""
+    
+    impl = SmallInteger
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return ATTRIBUTION_MODEL_CODES.get(value, 0)
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return ATTRIBUTION_MODEL_NAMES.get(value)
+
+# Credit of one campaign for one lead under one model; zero-credit touchpoints are not stored
 class AttributionResult(Base):
     __tablename__ = "attribution_results"
+    __table_args__ = (
+        # Revenue per campaign for one model, answered from the index alone; campaign first,
+        # since a four-valued model prefix would read a quarter of the table for every tenant
+        Index("ix_attribution_campaign_model", "campaign_id", "attribution_model", "attributed_revenue"),
+        # Per-lead replace on recalculation, and index-only totals over a tenant's leads
+        Index("ix_attribution_lead_model", "lead_id", "attribution_model", "attributed_revenue"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     lead_id = Column(Integer, ForeignKey("leads.id", ondelete="CASCADE"), nullable=False)
     campaign_id = Column(Integer, ForeignKey("campaigns.id"), nullable=True)
-    attribution_model = Column(String(50), nullable=False)  # linear, first_touch, last_touch, time_decay
+    attribution_model = Column(AttributionModelCode, nullable=False)  # linear, first_touch, last_touch, time_decay
     weighted_attribution = Column(Float, default=0.0)
     attributed_revenue = Column(Float, default=0.0)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     # Relationships
     lead = relationship("Lead", back_populates="attribution_results")
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, JSON
+from datetime import datetime
+from app.db.database import Base
+
+class BudgetRuleSet(Base):
+    __tablename__ = "budget_rule_sets"
+    
+    # Per-company override of the default budget recommendation rules
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), primary_key=True)
+    rules = Column(JSON, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer
+from app.db.database import Base
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+    
+    # Per-company data version of cached analytics, shared by every worker; no foreign key,
+    # so a deleted company's version is never reset and reused by stale entries
+    company_id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
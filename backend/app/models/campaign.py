@@ -7,13 +7,18 @@ class Campaign(Base):
     __tablename__ = "campaigns"
     
     id = Column(Integer, primary_key=True, index=True)
-    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(255), nullable=False)
     platform = Column(String(50), nullable=False)  # Google, LinkedIn, Meta
     budget = Column(Float, default=0.0)
     impressions = Column(Integer, default=0)
     clicks = Column(Integer, default=0)
     cost = Column(Float, default=0.0)
+    # Lifetime totals from before daily stats were first ingested; totals are then these plus the
+    # daily rows. NULL until then, when impressions/clicks/cost are edited directly.
+    baseline_impressions = Column(Integer, nullable=True)
+    baseline_clicks = Column(Integer, nullable=True)
+    baseline_cost = Column(Float, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
     # Relationships
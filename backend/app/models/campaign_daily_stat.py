@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, Date, Float, ForeignKey
+from app.db.database import Base
+
+class CampaignDailyStat(Base):
+    __tablename__ = "campaign_daily_stats"
+    
+    # One row per campaign per day; Campaign impressions/clicks/cost are rolled up from these
+    campaign_id = Column(Integer, ForeignKey("campaigns.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    impressions = Column(Integer, default=0, nullable=False)
+    clicks = Column(Integer, default=0, nullable=False)
+    cost = Column(Float, default=0.0, nullable=False)
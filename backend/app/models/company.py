@@ -12,6 +12,6 @@ class Company(Base):
     annual_ad_spend = Column(Float, default=0.0)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
-    # Relationships
-    campaigns = relationship("Campaign", back_populates="company", cascade="all, delete-orphan")
-    leads = relationship("Lead", back_populates="company", cascade="all, delete-orphan")
+    # Relationships; children go with ON DELETE CASCADE or DeletionService, never loaded just to be deleted
+    campaigns = relationship("Campaign", back_populates="company", cascade="all, delete-orphan", passive_deletes=True)
+    leads = relationship("Lead", back_populates="company", cascade="all, delete-orphan", passive_deletes=True)
@@ -1,14 +1,21 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, JSON, func
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index, JSON, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.database import Base
 
 class Lead(Base):
     __tablename__ = "leads"
+    __table_args__ = (
+        UniqueConstraint("company_id", "email", name="uq_leads_company_email"),
+        # Funnel and won counts per stage; deal_value makes the sums index-only
+        Index("ix_leads_company_stage", "company_id", "stage", "deal_value"),
+        # Date-range dashboards
+        Index("ix_leads_company_created", "company_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
-    source_campaign_id = Column(Integer, ForeignKey("campaigns.id"), nullable=True)
+    source_campaign_id = Column(Integer, ForeignKey("campaigns.id"), nullable=True, index=True)
     email = Column(String(255), nullable=False)
     name = Column(String(255), nullable=False)
     touchpoints = Column(JSON, default=[])  # List of campaign touchpoints
@@ -19,4 +26,7 @@ class Lead(Base):
     # Relationships
     company = relationship("Company", back_populates="leads")
     source_campaign = relationship("Campaign", back_populates="leads")
-    attribution_results = relationship("AttributionResult", back_populates="lead", cascade="all, delete-orphan")
+    # Rows go with ON DELETE CASCADE or DeletionService; never loaded just to be deleted
+    attribution_results = relationship(
+        "AttributionResult", back_populates="lead", cascade="all, delete-orphan", passive_deletes=True
+    )
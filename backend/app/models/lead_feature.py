@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, DateTime, Float, ForeignKey
+from datetime import datetime
+from app.db.database import Base
+
+class LeadFeature(Base):
+    __tablename__ = "lead_features"
+    
+    # Precomputed deal probability features, maintained on write by LeadFeatureService
+    lead_id = Column(Integer, ForeignKey("leads.id", ondelete="CASCADE"), primary_key=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False, index=True)
+    num_touchpoints = Column(Integer, default=0, nullable=False)
+    campaign_spend = Column(Float, default=0.0, nullable=False)
+    industry_code = Column(Integer, default=0, nullable=False)
+    stage_code = Column(Integer, default=0, nullable=False)
+    deal_value_scaled = Column(Float, default=0.0, nullable=False)
+    is_won = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)
+    # When the lead entered its current Won/Lost stage; unlike updated_at, spend and industry refreshes keep it
+    outcome_at = Column(DateTime, nullable=True, index=True)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index, JSON
+from datetime import datetime
+from app.db.database import Base
+
+class LeadScore(Base):
+    __tablename__ = "lead_scores"
+    
+    # Persisted deal probability per lead, refreshed in batch by LeadScoringService
+    lead_id = Column(Integer, ForeignKey("leads.id", ondelete="CASCADE"), primary_key=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    model_version = Column(String(64), nullable=False)
+    probability = Column(Float, nullable=False)
+    contributions = Column(JSON, nullable=True)  # {feature: log-odds contribution}; null for the heuristic
+    scored_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+# Serves threshold and top-N queries per company as an index range scan
+Index("ix_lead_scores_company_probability", LeadScore.company_id, LeadScore.probability.desc())
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from app.db.database import Base
+
+class LeadTouchpoint(Base):
+    __tablename__ = "lead_touchpoints"
+    
+    # Campaign -> lead index derived from Lead.touchpoints, used to fan out campaign changes
+    lead_id = Column(Integer, ForeignKey("leads.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    campaign_id = Column(Integer, nullable=False, index=True)
@@ -1,5 +1,4 @@
 from pydantic import BaseModel
-from datetime import datetime
 
 class AttributionResultBase(BaseModel):
     attribution_model: str
@@ -10,7 +9,6 @@ class AttributionResult(AttributionResultBase):
     id: int
     lead_id: int
     campaign_id: int
-    created_at: datetime
     
     class Config:
         from_attributes = True
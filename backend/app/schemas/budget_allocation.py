@@ -0,0 +1,22 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Literal
+from datetime import date
+
+class SpendBounds(BaseModel):
+    min: float = Field(0.0, ge=0)
+    max: Optional[float] = Field(None, ge=0)
+
+class BudgetAllocationRequest(BaseModel):
+    total_budget: float = Field(gt=0)
+    model: Literal["linear", "first_touch", "last_touch", "time_decay"] = "linear"
+    min_per_campaign: float = Field(0.0, ge=0)
+    max_per_campaign: Optional[float] = Field(None, ge=0)
+    campaign_bounds: Dict[int, SpendBounds] = {}
+    platform_bounds: Dict[str, SpendBounds] = {}
+    start_date: Optional[date] = None  # fit response curves on this window of daily stats
+    end_date: Optional[date] = None
+
+class BudgetSimulationRequest(BaseModel):
+    budgets: Dict[int, float] = {}  # campaign_id -> proposed spend; others keep current spend
+    scenarios: int = Field(20000, ge=100)
+    seed: int = 0
@@ -0,0 +1,36 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
+from datetime import datetime
+
+RuleMetric = Literal["roas", "cac", "ctr", "cpc", "spend", "budget", "impressions", "clicks", "num_leads", "num_conversions", "attributed_revenue"]
+
+class RuleCondition(BaseModel):
+    metric: RuleMetric
+    op: Literal[">", ">=", "<", "<=", "==", "!="]
+    value: float
+    relative_to_avg: bool = False  # compare against value * tenant average of the metric
+
+class RuleAdjustment(BaseModel):
+    metric: RuleMetric
+    direction: Literal["increase", "decrease"]
+    base: float = 0.0
+    factor: float = 10.0  # percent per unit of relative distance from the tenant average
+    max_pct: float = 50.0
+
+class BudgetRule(BaseModel):
+    name: str
+    conditions: List[RuleCondition]
+    action: str  # format string over campaign metrics plus {pct}
+    confidence: float = Field(ge=0, le=1)
+    priority: Literal["high", "medium", "low"]
+    adjustment: Optional[RuleAdjustment] = None
+    exclusive: bool = False  # matching campaigns are not evaluated by later rules
+
+class BudgetRuleSetUpdate(BaseModel):
+    rules: List[BudgetRule]
+
+class BudgetRuleSet(BaseModel):
+    company_id: int
+    custom: bool
+    rules: List[BudgetRule]
+    updated_at: Optional[datetime] = None
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import date, datetime
 
 class CampaignBase(BaseModel):
     name: str
@@ -28,3 +28,13 @@ class Campaign(CampaignBase):
     
     class Config:
         from_attributes = True
+
+class CampaignDailyStatIn(BaseModel):
+    campaign_id: int
+    date: date
+    impressions: int = Field(0, ge=0)
+    clicks: int = Field(0, ge=0)
+    cost: float = Field(0.0, ge=0)
+
+class CampaignDailyStatsIngest(BaseModel):
+    rows: List[CampaignDailyStatIn]
@@ -29,3 +29,15 @@ class Lead(LeadBase):
     
     class Config:
         from_attributes = True
+
+class LeadScoreRequest(BaseModel):
+    company_id: int
+    touchpoints: List[int] = []
+    stage: str = "MQL"
+    deal_value: float = 0.0
+
+class LeadScoreResult(BaseModel):
+    company_id: int
+    probability: Optional[float] = None
+    model_version: Optional[str] = None
+    error: Optional[str] = None  # set instead of a score, e.g. for an unknown company
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+class SyntheticDataRequest(BaseModel):
+    companies: int = Field(1, ge=1)
+    campaigns_per_company: int = Field(12, ge=1)
+    leads_per_company: int = Field(1000, ge=0)
+    touchpoint_lengths: Optional[Dict[int, float]] = None  # length -> weight; uniform 1-4 by default
+    stage_mix: Optional[Dict[str, float]] = None  # stage -> weight; demo seed mix by default
+    days: int = Field(365, ge=1)  # spread lead creation dates over this many days
+    seed: int = 0
+    derived: bool = True  # also build feature, score and attribution rows
+
+class SyntheticDataResult(BaseModel):
+    company_ids: List[int]
+    seed: int
+    counts: Dict[str, int]
+    elapsed_seconds: float
+    leads_per_second: float
@@ -1,10 +1,12 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, insert, select, update
 from app.models import Lead, Campaign, AttributionResult
-from datetime import datetime, timedelta
+from app.services.lead_features import chunked
 from typing import List, Dict
 import math
 
+ATTRIBUTION_MODELS = ["linear", "first_touch", "last_touch", "time_decay"]
+
 class AttributionService:
     """Service for multi-touch attribution models"""
     
@@ -43,23 +45,15 @@ class AttributionService:
         if not lead or not lead.touchpoints:
             return {"model": "first_touch", "results": []}
         
-        results = []
-        first_campaign_id = lead.touchpoints[0]
-        
-        for i, campaign_id in enumerate(lead.touchpoints):
-            weight = 1.0 if i == 0 else 0.0
-            attributed_revenue = lead.deal_value if i == 0 else 0.0
-            
-            result = AttributionResult(
-                lead_id=lead_id,
-                campaign_id=campaign_id,
-                attribution_model="first_touch",
-                weighted_attribution=weight,
-                attributed_revenue=attributed_revenue,
-            )
-            results.append(result)
-        
-        return {"model": "first_touch", "results": results}
+        # Later touchpoints get no credit and are not stored
+        result = AttributionResult(
+            lead_id=lead_id,
+            campaign_id=lead.touchpoints[0],
+            attribution_model="first_touch",
+            weighted_attribution=1.0,
+            attributed_revenue=lead.deal_value,
+        )
+        return {"model": "first_touch", "results": [result]}
     
     @staticmethod
     def calculate_last_touch_attribution(lead_id: int, db: Session) -> Dict:
@@ -70,21 +64,15 @@ class AttributionService:
         if not lead or not lead.touchpoints:
             return {"model": "last_touch", "results": []}
         
-        results = []
-        for i, campaign_id in enumerate(lead.touchpoints):
-            weight = 1.0 if i == len(lead.touchpoints) - 1 else 0.0
-            attributed_revenue = lead.deal_value if i == len(lead.touchpoints) - 1 else 0.0
-            
-            result = AttributionResult(
-                lead_id=lead_id,
-                campaign_id=campaign_id,
-                attribution_model="last_touch",
-                weighted_attribution=weight,
-                attributed_revenue=attributed_revenue,
-            )
-            results.append(result)
-        
-        return {"model": "last_touch", "results": results}
+        # Earlier touchpoints get no credit and are not stored
+        result = AttributionResult(
+            lead_id=lead_id,
+            campaign_id=lead.touchpoints[-1],
+            attribution_model="last_touch",
+            weighted_attribution=1.0,
+            attributed_revenue=lead.deal_value,
+        )
+        return {"model": "last_touch", "results": [result]}
     
     @staticmethod
     def calculate_time_decay_attribution(lead_id: int, db: Session, decay_rate: float = 0.5) -> Dict:
@@ -159,21 +147,101 @@ class AttributionService:
         else:
             return {"model": model, "results": []}
     
+    @staticmethod
+    def touch_weights(model: str, num_touchpoints: int, decay_rate: float = 0.5) -> List[float]:
+        """Per-touchpoint credit for a model, matching the per-lead calculations"""
+        if num_touchpoints == 0:
+            return []
+        if model == "linear":
+            return [1.0 / num_touchpoints] * num_touchpoints
+        if model == "first_touch":
+            return [1.0] + [0.0] * (num_touchpoints - 1)
+        if model == "last_touch":
+            return [0.0] * (num_touchpoints - 1) + [1.0]
+        if model == "time_decay":
+            weights = [decay_rate ** (num_touchpoints - 1 - i) for i in range(num_touchpoints)]
+            total_weight = sum(weights)
+            return [w / total_weight for w in weights]
+        return []
+    
+    @staticmethod
+    def calculate_attribution_batch(lead_ids: List[int], db: Session, models: List[str] = ATTRIBUTION_MODELS) -> int:
+        """Recalculate attribution for many leads with one delete and one bulk insert per chunk (caller commits)
+        
+        Zero-credit touchpoints are skipped, as in the per-lead calculations.
+        """
+        written = 0
+        for chunk in chunked(list(set(lead_ids))):
+            leads = db.query(Lead.id, Lead.touchpoints, Lead.deal_value).filter(Lead.id.in_(chunk)).all()
+            db.query(AttributionResult).filter(
+                AttributionResult.lead_id.in_(chunk),
+                AttributionResult.attribution_model.in_(models),
+            ).delete(synchronize_session=False)
+            
+            rows = []
+            for lead_id, touchpoints, deal_value in leads:
+                touchpoints = touchpoints or []
+                deal_value = deal_value or 0.0
+                for model in models:
+                    weights = AttributionService.touch_weights(model, len(touchpoints))
+                    for campaign_id, weight in zip(touchpoints, weights):
+                        if weight == 0.0:
+                            continue
+                        rows.append({
+                            "lead_id": lead_id,
+                            "campaign_id": campaign_id,
+                            "attribution_model": model,
+                            "weighted_attribution": weight,
+                            "attributed_revenue": deal_value * weight,
+                        })
+            
+            if rows:
+                # Table-level insert skips the ORM bulk bookkeeping
+                db.execute(insert(AttributionResult.__table__), rows)
+            written += len(rows)
+        return written
+    
+    @staticmethod
+    def remove_leads(lead_ids: List[int], db: Session) -> None:
+        """Drop attribution rows of deleted leads (caller commits)"""
+        for chunk in chunked(list(set(lead_ids))):
+            db.query(AttributionResult).filter(AttributionResult.lead_id.in_(chunk)).delete(synchronize_session=False)
+    
+    @staticmethod
+    def remove_company(company_id: int, db: Session) -> None:
+        """Drop attribution rows of every lead of a company (caller commits)"""
+        company_leads = select(Lead.id).where(Lead.company_id == company_id)
+        db.query(AttributionResult).filter(
+            AttributionResult.lead_id.in_(company_leads)
+        ).delete(synchronize_session=False)
+    
+    @staticmethod
+    def detach_campaigns(campaign_ids, db: Session) -> None:
+        """Keep credit given to deleted campaigns without the campaign, in one update (caller commits)"""
+        db.execute(
+            update(AttributionResult)
+            .where(AttributionResult.campaign_id.in_(campaign_ids))
+            .values(campaign_id=None)
+            .execution_options(synchronize_session=False)
+        )
+    
     @staticmethod
     def get_attributed_revenue_by_campaign(company_id: int, model: str, db: Session) -> Dict:
         """Get total attributed revenue by campaign"""
+        # Outer join: zero-credit rows are not stored, so a campaign without credit still lists at 0
         results = db.query(
             Campaign.id,
             Campaign.name,
             Campaign.platform,
             func.sum(AttributionResult.attributed_revenue).label("total_attributed_revenue")
-        ).join(
-            AttributionResult, Campaign.id == AttributionResult.campaign_id
-        ).filter(
+        ).outerjoin(
+            AttributionResult,
             and_(
-                Campaign.company_id == company_id,
+                Campaign.id == AttributionResult.campaign_id,
                 AttributionResult.attribution_model == model
             )
+        ).filter(
+            Campaign.company_id == company_id
         ).group_by(Campaign.id, Campaign.name, Campaign.platform).all()
         
         return {
@@ -0,0 +1,159 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from app.models import Campaign, CampaignDailyStat
+from app.services.lead_features import chunked
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional
+
+# Rows per INSERT ... ON CONFLICT statement
+UPSERT_BATCH_SIZE = 5000
+
+class CampaignStatsService:
+    """Service for the campaign_daily_stats fact table and the Campaign lifetime rollup"""
+    
+    @staticmethod
+    def _insert(db: Session):
+        """Dialect insert construct that supports ON CONFLICT"""
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert(CampaignDailyStat)
+    
+    @staticmethod
+    def unknown_campaigns(campaign_ids: List[int], db: Session) -> List[int]:
+        """Campaign ids that do not exist"""
+        wanted = set(campaign_ids)
+        found = set()
+        for chunk in chunked(list(wanted)):
+            found.update(campaign_id for (campaign_id,) in db.query(Campaign.id).filter(Campaign.id.in_(chunk)).all())
+        return sorted(wanted - found)
+    
+    @staticmethod
+    def company_ids(campaign_ids: List[int], db: Session) -> List[int]:
+        """Distinct owning companies of the given campaigns"""
+        companies = set()
+        for chunk in chunked(list(set(campaign_ids))):
+            companies.update(
+                company_id for (company_id,) in db.query(Campaign.company_id).filter(Campaign.id.in_(chunk)).distinct()
+            )
+        return sorted(companies)
+    
+    @staticmethod
+    def upsert_daily(rows: List[Dict], db: Session) -> List[int]:
+        """Idempotently write daily rows in large batches; returns the touched campaign ids (caller commits)"""
+        # Last write wins within a payload; Postgres rejects duplicate keys in one statement
+        deduped = {(row["campaign_id"], row["date"]): row for row in rows}
+        values = list(deduped.values())
+        
+        insert = CampaignStatsService._insert(db)
+        statement = insert.on_conflict_do_update(
+            index_elements=[CampaignDailyStat.campaign_id, CampaignDailyStat.date],
+            set_={
+                "impressions": insert.excluded.impressions,
+                "clicks": insert.excluded.clicks,
+                "cost": insert.excluded.cost,
+            },
+        )
+        for start in range(0, len(values), UPSERT_BATCH_SIZE):
+            db.execute(statement, values[start:start + UPSERT_BATCH_SIZE])
+        
+        return sorted({campaign_id for campaign_id, _ in deduped})
+    
+    @staticmethod
+    def rollup(campaign_ids: List[int], db: Session) -> None:
+        """Recompute Campaign lifetime totals as baseline plus the fact table (caller commits)
+        
+        The first rollup of a campaign freezes its existing totals as the baseline. SET
+        expressions read the row as it was, so that happens in the same statement.
+        """
+        def total(column):
+            return select(func.coalesce(func.sum(column), 0)).where(
+                CampaignDailyStat.campaign_id == Campaign.id
+            ).scalar_subquery()
+        
+        def baseline(baseline_column, lifetime_column):
+            return func.coalesce(baseline_column, lifetime_column, 0)
+        
+        for chunk in chunked(list(set(campaign_ids))):
+            db.execute(
+                update(Campaign)
+                .where(Campaign.id.in_(chunk))
+                .values(
+                    baseline_impressions=baseline(Campaign.baseline_impressions, Campaign.impressions),
+                    baseline_clicks=baseline(Campaign.baseline_clicks, Campaign.clicks),
+                    baseline_cost=baseline(Campaign.baseline_cost, Campaign.cost),
+                    impressions=baseline(Campaign.baseline_impressions, Campaign.impressions)
+                    + total(CampaignDailyStat.impressions),
+                    clicks=baseline(Campaign.baseline_clicks, Campaign.clicks) + total(CampaignDailyStat.clicks),
+                    cost=baseline(Campaign.baseline_cost, Campaign.cost) + total(CampaignDailyStat.cost),
+                )
+                .execution_options(synchronize_session=False)
+            )
+    
+    @staticmethod
+    def remove_campaign(campaign_id: int, db: Session) -> None:
+        """Drop a campaign's daily rows (caller commits)"""
+        db.query(CampaignDailyStat).filter(CampaignDailyStat.campaign_id == campaign_id).delete(synchronize_session=False)
+    
+    @staticmethod
+    def remove_company(company_id: int, db: Session) -> None:
+        """Drop daily rows for every campaign of a company (caller commits)"""
+        campaign_ids = select(Campaign.id).where(Campaign.company_id == company_id)
+        db.query(CampaignDailyStat).filter(
+            CampaignDailyStat.campaign_id.in_(campaign_ids)
+        ).delete(synchronize_session=False)
+    
+    @staticmethod
+    def range_totals(company_id: int, start_date: Optional[date], end_date: Optional[date], db: Session):
+        """Subquery of per-campaign impressions, clicks and cost within an inclusive date range"""
+        query = db.query(
+            CampaignDailyStat.campaign_id.label("campaign_id"),
+            func.sum(CampaignDailyStat.impressions).label("impressions"),
+            func.sum(CampaignDailyStat.clicks).label("clicks"),
+            func.sum(CampaignDailyStat.cost).label("cost"),
+        ).join(
+            Campaign, Campaign.id == CampaignDailyStat.campaign_id
+        ).filter(Campaign.company_id == company_id)
+        if start_date is not None:
+            query = query.filter(CampaignDailyStat.date >= start_date)
+        if end_date is not None:
+            query = query.filter(CampaignDailyStat.date <= end_date)
+        return query.group_by(CampaignDailyStat.campaign_id).subquery()
+    
+    @staticmethod
+    def datetime_filters(column, start_date: Optional[date], end_date: Optional[date]) -> List:
+        """Filters restricting a datetime column to an inclusive date range"""
+        filters = []
+        if start_date is not None:
+            filters.append(column >= datetime.combine(start_date, time.min))
+        if end_date is not None:
+            filters.append(column < datetime.combine(end_date + timedelta(days=1), time.min))
+        return filters
+    
+    @staticmethod
+    def get_daily_stats(
+        campaign_id: int,
+        start_date: Optional[date],
+        end_date: Optional[date],
+        db: Session,
+    ) -> List[Dict]:
+        """Daily rows for one campaign with cumulative spend for pacing"""
+        query = db.query(CampaignDailyStat).filter(CampaignDailyStat.campaign_id == campaign_id)
+        if start_date is not None:
+            query = query.filter(CampaignDailyStat.date >= start_date)
+        if end_date is not None:
+            query = query.filter(CampaignDailyStat.date <= end_date)
+        
+        days = []
+        cumulative = 0.0
+        for row in query.order_by(CampaignDailyStat.date).all():
+            cumulative += row.cost
+            days.append({
+                "date": row.date,
+                "impressions": row.impressions,
+                "clicks": row.clicks,
+                "cost": row.cost,
+                "cumulative_cost": cumulative,
+            })
+        return days
@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.core.cache import ResponseCache
+from app.core.config import get_settings
+from app.db.database import SessionLocal
+from app.models import Company, Campaign, Lead
+from app.services.attribution import AttributionService
+from app.services.campaign_stats import CampaignStatsService
+from app.services.lead_features import LeadFeatureService, chunked
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class DeletionService:
+    """Set-based deletes of leads, campaigns and companies with every row that hangs off them
+    
+    Dependent rows are deleted explicitly rather than left to ON DELETE CASCADE, which
+    SQLite only honours with foreign key enforcement switched on.
+    """
+    
+    _lock = threading.Lock()
+    # company_id -> progress of its most recent purge in this process
+    _purges: Dict[int, Dict] = {}
+    
+    @staticmethod
+    def delete_leads(lead_ids: List[int], db: Session) -> None:
+        """Delete leads with their features, scores and attribution (caller commits)"""
+        from app.ml.scoring import LeadScoringService
+        LeadFeatureService.remove_leads(lead_ids, db)
+        LeadScoringService.remove_leads(lead_ids, db)
+        AttributionService.remove_leads(lead_ids, db)
+        for chunk in chunked(list(set(lead_ids))):
+            db.query(Lead).filter(Lead.id.in_(chunk)).delete(synchronize_session=False)
+    
+    @staticmethod
+    def _detach_campaigns(campaign_ids, db: Session) -> None:
+        """Null out references to campaigns about to be deleted; leads and credit are kept"""
+        AttributionService.detach_campaigns(campaign_ids, db)
+        db.execute(
+            update(Lead)
+            .where(Lead.source_campaign_id.in_(campaign_ids))
+            .values(source_campaign_id=None)
+            .execution_options(synchronize_session=False)
+        )
+    
+    @staticmethod
+    def delete_campaign(campaign_id: int, db: Session) -> None:
+        """Delete a campaign with its daily stats; leads and attribution lose the reference (caller commits)"""
+        CampaignStatsService.remove_campaign(campaign_id, db)
+        DeletionService._detach_campaigns([campaign_id], db)
+        db.query(Campaign).filter(Campaign.id == campaign_id).delete(synchronize_session=False)
+    
+    @staticmethod
+    def delete_company(company_id: int, db: Session) -> None:
+        """Delete a company and everything it owns in a fixed number of statements (caller commits)"""
+        from app.ml.budget_rules import BudgetRuleEngine
+        from app.ml.scoring import LeadScoringService
+        LeadFeatureService.remove_company(company_id, db)
+        LeadScoringService.remove_company(company_id, db)
+        AttributionService.remove_company(company_id, db)
+        BudgetRuleEngine.remove_company(company_id, db)
+        CampaignStatsService.remove_company(company_id, db)
+        db.query(Lead).filter(Lead.company_id == company_id).delete(synchronize_session=False)
+        DeletionService._detach_campaigns(select(Campaign.id).where(Campaign.company_id == company_id), db)
+        db.query(Campaign).filter(Campaign.company_id == company_id).delete(synchronize_session=False)
+        db.query(Company).filter(Company.id == company_id).delete(synchronize_session=False)
+    
+    @staticmethod
+    def start_purge(company_id: int) -> Tuple[Dict, bool]:
+        """Register a purge; returns its progress and False when one is already running"""
+        with DeletionService._lock:
+            purge = DeletionService._purges.get(company_id)
+            if purge is not None and purge["status"] == "running":
+                return dict(purge), False
+            purge = DeletionService._purges[company_id] = {
+                "company_id": company_id,
+                "status": "running",
+                "leads_deleted": 0,
+                "batches": 0,
+                "started_at": datetime.utcnow(),
+                "finished_at": None,
+                "error": None,
+            }
+            return dict(purge), True
+    
+    @staticmethod
+    def purge_status(company_id: int) -> Optional[Dict]:
+        with DeletionService._lock:
+            purge = DeletionService._purges.get(company_id)
+            return dict(purge) if purge is not None else None
+    
+    @staticmethod
+    def _update_purge(company_id: int, **changes) -> None:
+        with DeletionService._lock:
+            DeletionService._purges[company_id].update(changes)
+    
+    @staticmethod
+    def purge_company(company_id: int, batch_size: Optional[int] = None) -> None:
+        """Background job: delete a tenant's leads in bounded transactions, then the company itself"""
+        batch_size = batch_size or settings.PURGE_BATCH_SIZE
+        db = SessionLocal()
+        leads_deleted = batches = 0
+        try:
+            while True:
+                lead_ids = [
+                    lead_id for (lead_id,) in
+                    db.query(Lead.id).filter(Lead.company_id == company_id).limit(batch_size).all()
+                ]
+                if not lead_ids:
+                    break
+                DeletionService.delete_leads(lead_ids, db)
+                db.commit()
+                leads_deleted += len(lead_ids)
+                batches += 1
+                DeletionService._update_purge(company_id, leads_deleted=leads_deleted, batches=batches)
+                ResponseCache.invalidate(company_id)
+                # Commit boundaries alone rarely let a waiting SQLite writer in
+                time.sleep(settings.PURGE_PAUSE_MS / 1000)
+            
+            DeletionService.delete_company(company_id, db)
+            db.commit()
+            ResponseCache.invalidate(company_id)
+            DeletionService._update_purge(company_id, status="done", finished_at=datetime.utcnow())
+        except Exception as e:
+            db.rollback()
+            DeletionService._update_purge(company_id, status="failed", finished_at=datetime.utcnow(), error=str(e))
+            logger.exception("Purge of company %d failed", company_id)
+        finally:
+            db.close()
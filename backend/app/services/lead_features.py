@@ -0,0 +1,218 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, select, update
+from app.models import Lead, Campaign, Company, LeadFeature, LeadTouchpoint
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Iterable, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+INDUSTRY_TO_NUMBER = {"SaaS": 1, "Fintech": 2, "Healthcare": 3, "Enterprise": 4, "Other": 0}
+STAGE_TO_NUMBER = {"MQL": 1, "SQL": 2, "Opportunity": 3, "Won": 4, "Lost": 0}
+OUTCOME_STAGES = ("Won", "Lost")
+
+FEATURE_COLUMNS = [
+    LeadFeature.num_touchpoints,
+    LeadFeature.campaign_spend,
+    LeadFeature.industry_code,
+    LeadFeature.stage_code,
+    LeadFeature.deal_value_scaled,
+]
+FEATURE_NAMES = [column.key for column in FEATURE_COLUMNS]
+
+# Keep IN (...) lists well below SQLite's bound parameter limit
+CHUNK_SIZE = 500
+
+def chunked(ids: List[int], size: int = CHUNK_SIZE) -> Iterable[List[int]]:
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+class LeadFeatureService:
+    """Service maintaining the precomputed lead feature store"""
+    
+    @staticmethod
+    def _spend_subquery():
+        """Correlated subquery summing the cost of every campaign a lead touched"""
+        return select(func.coalesce(func.sum(Campaign.cost), 0.0)).select_from(LeadTouchpoint).join(
+            Campaign, Campaign.id == LeadTouchpoint.campaign_id
+        ).where(
+            LeadTouchpoint.lead_id == LeadFeature.lead_id
+        ).scalar_subquery()
+    
+    @staticmethod
+    def refresh_leads(lead_ids: List[int], db: Session) -> None:
+        """Recompute touchpoint index and feature rows for the given leads (caller commits)"""
+        lead_ids = list(set(lead_ids))
+        if not lead_ids:
+            return
+        
+        for chunk in chunked(lead_ids):
+            # The current feature row's stage and outcome time come along: a lead still in the
+            # Won/Lost stage it had, and already trainable, keeps its outcome time when rebuilt below
+            rows = db.query(
+                Lead.id, Lead.company_id, Lead.touchpoints, Lead.stage, Lead.deal_value, Company.industry,
+                LeadFeature.stage_code, LeadFeature.deal_value_scaled, LeadFeature.outcome_at,
+            ).outerjoin(Company, Company.id == Lead.company_id).outerjoin(
+                LeadFeature, LeadFeature.lead_id == Lead.id
+            ).filter(Lead.id.in_(chunk)).all()
+            
+            db.query(LeadTouchpoint).filter(LeadTouchpoint.lead_id.in_(chunk)).delete(synchronize_session=False)
+            db.query(LeadFeature).filter(LeadFeature.lead_id.in_(chunk)).delete(synchronize_session=False)
+            
+            touchpoint_rows = []
+            feature_rows = []
+            now = datetime.utcnow()
+            for row in rows:
+                lead_id, company_id, touchpoints, stage, deal_value, industry = row[:6]
+                previous_code, previous_value, previous_at = row[6:]
+                touchpoints = touchpoints or []
+                deal_value = deal_value or 0.0
+                for position, campaign_id in enumerate(touchpoints):
+                    touchpoint_rows.append({"lead_id": lead_id, "position": position, "campaign_id": campaign_id})
+                
+                stage_code = STAGE_TO_NUMBER.get(stage, 0)
+                outcome_at = None
+                if stage in OUTCOME_STAGES:
+                    # A closed lead whose deal value first turns positive becomes a new training outcome
+                    unchanged = previous_at is not None and previous_code == stage_code and (previous_value or 0) > 0
+                    outcome_at = previous_at if unchanged else now
+                
+                feature_rows.append({
+                    "lead_id": lead_id,
+                    "company_id": company_id,
+                    "num_touchpoints": len(touchpoints),
+                    "campaign_spend": 0.0,
+                    "industry_code": INDUSTRY_TO_NUMBER.get(industry or "Other", 0),
+                    "stage_code": stage_code,
+                    "deal_value_scaled": deal_value / 1000 if deal_value > 0 else 0,
+                    "is_won": 1 if stage == "Won" else 0,
+                    "updated_at": now,
+                    "outcome_at": outcome_at,
+                })
+            
+            if touchpoint_rows:
+                db.execute(insert(LeadTouchpoint), touchpoint_rows)
+            if feature_rows:
+                db.execute(insert(LeadFeature), feature_rows)
+            
+            # Spend is filled in set-based from the touchpoint index
+            db.execute(
+                update(LeadFeature)
+                .where(LeadFeature.lead_id.in_(chunk))
+                .values(campaign_spend=LeadFeatureService._spend_subquery())
+                .execution_options(synchronize_session=False)
+            )
+    
+    @staticmethod
+    def refresh_for_campaign(campaign_id: int, db: Session) -> List[int]:
+        """Fan a campaign cost change out to every lead that touched it; returns affected lead ids (caller commits)"""
+        return LeadFeatureService.refresh_for_campaigns([campaign_id], db)
+    
+    @staticmethod
+    def refresh_for_campaigns(campaign_ids: List[int], db: Session) -> List[int]:
+        """Fan cost changes of many campaigns out in one update per chunk (caller commits)"""
+        lead_ids = set()
+        for chunk in chunked(list(set(campaign_ids))):
+            affected = select(LeadTouchpoint.lead_id).where(LeadTouchpoint.campaign_id.in_(chunk))
+            lead_ids.update(lead_id for (lead_id,) in db.execute(affected.distinct()).all())
+            db.execute(
+                update(LeadFeature)
+                .where(LeadFeature.lead_id.in_(affected))
+                .values(campaign_spend=LeadFeatureService._spend_subquery(), updated_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+        return list(lead_ids)
+    
+    @staticmethod
+    def refresh_for_company(company_id: int, industry: str, db: Session) -> None:
+        """Apply a company industry change to its leads' features (caller commits)"""
+        db.query(LeadFeature).filter(LeadFeature.company_id == company_id).update(
+            {
+                LeadFeature.industry_code: INDUSTRY_TO_NUMBER.get(industry, 0),
+                LeadFeature.updated_at: datetime.utcnow(),
+            },
+            synchronize_session=False,
+        )
+    
+    @staticmethod
+    def remove_leads(lead_ids: List[int], db: Session) -> None:
+        """Drop index and feature rows for deleted leads (caller commits)"""
+        for chunk in chunked(list(set(lead_ids))):
+            db.query(LeadTouchpoint).filter(LeadTouchpoint.lead_id.in_(chunk)).delete(synchronize_session=False)
+            db.query(LeadFeature).filter(LeadFeature.lead_id.in_(chunk)).delete(synchronize_session=False)
+    
+    @staticmethod
+    def remove_company(company_id: int, db: Session) -> None:
+        """Drop index and feature rows for every lead of a company (caller commits)"""
+        company_leads = select(Lead.id).where(Lead.company_id == company_id)
+        db.query(LeadTouchpoint).filter(LeadTouchpoint.lead_id.in_(company_leads)).delete(synchronize_session=False)
+        db.query(LeadFeature).filter(LeadFeature.company_id == company_id).delete(synchronize_session=False)
+    
+    @staticmethod
+    def ensure_backfilled(db: Session) -> None:
+        """Build feature rows for leads that predate the feature store"""
+        missing = [
+            lead_id for (lead_id,) in db.query(Lead.id).outerjoin(
+                LeadFeature, LeadFeature.lead_id == Lead.id
+            ).filter(LeadFeature.lead_id.is_(None)).all()
+        ]
+        if missing:
+            LeadFeatureService.refresh_leads(missing, db)
+            db.commit()
+    
+    @staticmethod
+    def load_matrix(
+        db: Session,
+        company_id: Optional[int] = None,
+        require_deal_value: bool = False,
+    ) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray", "np.ndarray"]:
+        """Load (lead_ids, company_ids, X, y) feature arrays in a single query"""
+        # Every route imports this module; numpy loads with the first matrix instead
+        import numpy as np
+        query = db.query(LeadFeature.lead_id, LeadFeature.company_id, *FEATURE_COLUMNS, LeadFeature.is_won)
+        if company_id is not None:
+            query = query.filter(LeadFeature.company_id == company_id)
+        if require_deal_value:
+            query = query.filter(LeadFeature.deal_value_scaled > 0)
+        
+        rows = query.order_by(LeadFeature.lead_id).all()
+        if not rows:
+            empty_ids = np.empty(0, dtype=np.int64)
+            return empty_ids, empty_ids, np.empty((0, len(FEATURE_COLUMNS))), empty_ids
+        
+        data = np.array(rows, dtype=np.float64)
+        return data[:, 0].astype(np.int64), data[:, 1].astype(np.int64), data[:, 2:-1], data[:, -1].astype(np.int64)
+    
+    @staticmethod
+    def load_outcomes_since(
+        db: Session,
+        since: Optional[datetime] = None,
+        seen: Optional[Set[Tuple[int, datetime]]] = None,
+        overlap_seconds: float = 0.0,
+    ) -> Tuple["np.ndarray", "np.ndarray", Optional[datetime], Set[Tuple[int, datetime]]]:
+        """Load (X, y, checkpoint, seen) for leads that reached Won/Lost after `since`
+        
+        outcome_at is stamped before its transaction commits, so a slow writer can land behind
+        the checkpoint: the last `overlap_seconds` are re-read and the (lead_id, outcome_at)
+        pairs in `seen` skipped. The returned `seen` covers the overlap behind the new checkpoint.
+        """
+        import numpy as np
+        seen = seen or set()
+        # outcome_at, not updated_at: spend, industry and other edits must not replay learned outcomes
+        query = db.query(*FEATURE_COLUMNS, LeadFeature.is_won, LeadFeature.lead_id, LeadFeature.outcome_at).filter(
+            LeadFeature.outcome_at.isnot(None),
+            LeadFeature.deal_value_scaled > 0,
+        )
+        if since is not None:
+            query = query.filter(LeadFeature.outcome_at > since - timedelta(seconds=overlap_seconds))
+        
+        rows = query.order_by(LeadFeature.outcome_at, LeadFeature.lead_id).all()
+        new_rows = [row for row in rows if (row[-2], row[-1]) not in seen]
+        if not new_rows:
+            return np.empty((0, len(FEATURE_COLUMNS))), np.empty(0, dtype=np.int64), since, seen
+        
+        checkpoint = max(rows[-1][-1], since) if since is not None else rows[-1][-1]
+        horizon = checkpoint - timedelta(seconds=overlap_seconds)
+        seen = {(row[-2], row[-1]) for row in rows if row[-1] > horizon}
+        data = np.array([row[:-2] for row in new_rows], dtype=np.float64)
+        return data[:, :-1], data[:, -1].astype(np.int64), checkpoint, seen
@@ -0,0 +1,254 @@
+import csv
+import json
+import logging
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple, Union
+import anyio.from_thread
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from app.core.cache import ResponseCache
+from app.core.config import get_settings
+from app.db.database import SessionLocal
+from app.models import Lead, Company, Campaign
+from app.schemas.lead import LeadCreate
+from app.services.attribution import AttributionService
+from app.services.lead_features import LeadFeatureService, chunked
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class LeadIngestionService:
+    """Streaming bulk lead import: validate in chunks, insert set-based, dedup on (company_id, email)"""
+    
+    @staticmethod
+    def iter_lines(stream: AsyncIterator[bytes]) -> Iterator[str]:
+        """Decoded, newline-terminated lines of a byte stream, read from a worker thread without buffering the body"""
+        buffer = b""
+        while True:
+            data = anyio.from_thread.run(anext, stream, None)
+            if data is None:
+                break
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                yield line.decode("utf-8", errors="replace").rstrip("\r").lstrip("\ufeff") + "\n"
+        if buffer:
+            yield buffer.decode("utf-8", errors="replace").rstrip("\r").lstrip("\ufeff") + "\n"
+    
+    @staticmethod
+    def iter_records(lines: Iterator[str], fmt: str) -> Iterator[Tuple[int, Union[str, List[str], csv.Error]]]:
+        """(first line number, record) pairs; CSV goes through one reader so quoted fields may span lines"""
+        if fmt == "ndjson":
+            for line_number, text in enumerate(lines, 1):
+                if text.strip():
+                    yield line_number, text
+            return
+        
+        reader = csv.reader(lines)
+        while True:
+            line_number = reader.line_num + 1
+            try:
+                values = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield line_number, e
+                continue
+            if any(value.strip() for value in values):
+                yield line_number, values
+    
+    @staticmethod
+    def _parse_record(record: Union[str, List[str], csv.Error], fmt: str, header: Optional[List[str]]) -> Dict:
+        """Raw field dict for one NDJSON object or CSV record"""
+        if fmt == "ndjson":
+            row = json.loads(record)
+            if not isinstance(row, dict):
+                raise ValueError("Expected a JSON object")
+            return row
+        
+        if isinstance(record, csv.Error):
+            raise ValueError(f"Malformed CSV: {record}")
+        if len(record) != len(header):
+            raise ValueError(f"Expected {len(header)} fields, got {len(record)}")
+        # Empty cells fall back to schema defaults
+        row = {key: value for key, value in zip(header, record) if value != ""}
+        touchpoints = row.get("touchpoints")
+        if touchpoints is not None:
+            row["touchpoints"] = (
+                json.loads(touchpoints) if touchpoints.startswith("[")
+                else [t for t in touchpoints.replace("|", ";").split(";") if t.strip()]
+            )
+        return row
+    
+    @staticmethod
+    def _known_ids(model, ids: Set[int], cache: Set[int], db: Session) -> Set[int]:
+        """Ids that exist, looking up only the ones not seen in earlier chunks"""
+        missing = list(ids - cache)
+        for chunk in chunked(missing):
+            cache.update(row_id for (row_id,) in db.query(model.id).filter(model.id.in_(chunk)).all())
+        return ids & cache
+    
+    @staticmethod
+    def _existing_emails(rows: List[Dict], db: Session) -> Set[Tuple[int, str]]:
+        """(company_id, email) pairs in `rows` that are already stored"""
+        by_company: Dict[int, List[str]] = {}
+        for row in rows:
+            by_company.setdefault(row["company_id"], []).append(row["email"])
+        
+        existing = set()
+        for company_id, emails in by_company.items():
+            for chunk in chunked(emails):
+                existing.update(
+                    (company_id, email) for (email,) in db.query(Lead.email).filter(
+                        Lead.company_id == company_id, Lead.email.in_(chunk)
+                    ).all()
+                )
+        return existing
+    
+    @staticmethod
+    def _insert(db: Session):
+        """Dialect insert that skips rows violating the (company_id, email) constraint"""
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert(Lead).on_conflict_do_nothing().returning(Lead.id)
+    
+    @staticmethod
+    def _error(report: Dict, line_number: int, message: str) -> None:
+        report["failed"] += 1
+        if len(report["errors"]) < settings.LEAD_BULK_MAX_ERRORS:
+            report["errors"].append({"line": line_number, "error": message})
+        else:
+            report["errors_truncated"] = True
+    
+    @staticmethod
+    def process_chunk(
+        batch: List[Tuple[int, Union[str, List[str], csv.Error]]],
+        fmt: str,
+        header: Optional[List[str]],
+        report: Dict,
+        caches: Dict[str, Set[int]],
+        db: Session,
+    ) -> List[int]:
+        """Validate, dedup and insert one chunk, committing it; returns the new lead ids"""
+        valid = []
+        for line_number, record in batch:
+            report["received"] += 1
+            try:
+                lead = LeadCreate(**LeadIngestionService._parse_record(record, fmt, header))
+            except ValidationError as e:
+                LeadIngestionService._error(report, line_number, "; ".join(
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+                ))
+                continue
+            except (ValueError, TypeError) as e:
+                LeadIngestionService._error(report, line_number, str(e))
+                continue
+            valid.append((line_number, lead))
+        
+        companies = LeadIngestionService._known_ids(
+            Company, {lead.company_id for _, lead in valid}, caches["companies"], db
+        )
+        campaigns = LeadIngestionService._known_ids(
+            Campaign, {lead.source_campaign_id for _, lead in valid if lead.source_campaign_id is not None},
+            caches["campaigns"], db
+        )
+        
+        # In-memory dedup within the chunk; first occurrence wins
+        seen = set()
+        rows = []
+        for line_number, lead in valid:
+            if lead.company_id not in companies:
+                LeadIngestionService._error(report, line_number, "Company not found")
+                continue
+            if lead.source_campaign_id is not None and lead.source_campaign_id not in campaigns:
+                LeadIngestionService._error(report, line_number, "Campaign not found")
+                continue
+            key = (lead.company_id, lead.email)
+            if key in seen:
+                report["duplicates"] += 1
+                continue
+            seen.add(key)
+            rows.append({
+                "company_id": lead.company_id,
+                "source_campaign_id": lead.source_campaign_id,
+                "email": lead.email,
+                "name": lead.name,
+                "touchpoints": lead.touchpoints or [],
+                "stage": lead.stage,
+                "deal_value": lead.deal_value,
+            })
+        
+        # Leads stored by earlier imports; the unique constraint catches concurrent writers
+        existing = LeadIngestionService._existing_emails(rows, db) if rows else set()
+        rows = [row for row in rows if (row["company_id"], row["email"]) not in existing]
+        report["duplicates"] += len(existing)
+        if not rows:
+            return []
+        
+        lead_ids = [lead_id for (lead_id,) in db.execute(LeadIngestionService._insert(db), rows).all()]
+        db.commit()
+        ResponseCache.invalidate(*{row["company_id"] for row in rows})
+        report["inserted"] += len(lead_ids)
+        report["duplicates"] += len(rows) - len(lead_ids)
+        return lead_ids
+    
+    @staticmethod
+    async def ingest(stream: AsyncIterator[bytes], fmt: str, db: Session) -> Tuple[List[int], Dict]:
+        """Import a streamed NDJSON or CSV body chunk by chunk; bad rows are reported, not fatal"""
+        return await run_in_threadpool(LeadIngestionService._ingest, stream, fmt, db)
+    
+    @staticmethod
+    def _ingest(stream: AsyncIterator[bytes], fmt: str, db: Session) -> Tuple[List[int], Dict]:
+        started = time.perf_counter()
+        report = {"format": fmt, "received": 0, "inserted": 0, "duplicates": 0, "failed": 0, "errors": []}
+        caches = {"companies": set(), "campaigns": set()}
+        lead_ids = []
+        header = None
+        batch = []
+        
+        records = LeadIngestionService.iter_records(LeadIngestionService.iter_lines(stream), fmt)
+        for line_number, record in records:
+            if fmt == "csv" and header is None:
+                if isinstance(record, csv.Error):
+                    LeadIngestionService._error(report, line_number, f"Malformed CSV header: {record}")
+                    break
+                header = [column.strip() for column in record]
+                continue
+            batch.append((line_number, record))
+            if len(batch) >= settings.LEAD_BULK_CHUNK_SIZE:
+                lead_ids.extend(LeadIngestionService.process_chunk(batch, fmt, header, report, caches, db))
+                batch = []
+        if batch:
+            lead_ids.extend(LeadIngestionService.process_chunk(batch, fmt, header, report, caches, db))
+        
+        report["errors"].sort(key=lambda error: error["line"])
+        elapsed = time.perf_counter() - started
+        report["elapsed_ms"] = round(elapsed * 1000, 2)
+        report["rows_per_second"] = round(report["received"] / elapsed, 1) if elapsed > 0 else 0.0
+        report["enqueued"] = len(lead_ids)
+        return lead_ids, report
+    
+    @staticmethod
+    def _company_ids(lead_ids: List[int], db: Session) -> Set[int]:
+        return {company_id for (company_id,) in db.query(Lead.company_id).filter(Lead.id.in_(lead_ids)).distinct()}
+    
+    @staticmethod
+    def process_new_leads(lead_ids: List[int]) -> None:
+        """Background follow-up: feature, score and attribution rows for imported leads"""
+        from app.ml.scoring import LeadScoringService
+        db = SessionLocal()
+        try:
+            for chunk in chunked(lead_ids, settings.LEAD_BULK_CHUNK_SIZE):
+                LeadFeatureService.refresh_leads(chunk, db)
+                LeadScoringService.refresh_scores(db, lead_ids=chunk)
+                AttributionService.calculate_attribution_batch(chunk, db)
+                db.commit()
+                ResponseCache.invalidate(*LeadIngestionService._company_ids(chunk, db))
+        except Exception:
+            db.rollback()
+            logger.exception("Bulk lead follow-up failed")
+        finally:
+            db.close()
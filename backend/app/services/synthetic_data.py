@@ -0,0 +1,188 @@
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from app.core.config import get_settings
+from app.models import Company, Campaign, Lead
+from app.ml.scoring import LeadScoringService
+from app.services.attribution import AttributionService
+from app.services.lead_features import LeadFeatureService
+
+settings = get_settings()
+
+PLATFORMS = ["Google", "LinkedIn", "Meta"]
+INDUSTRIES = ["SaaS", "Fintech", "Healthcare", "Enterprise"]
+
+# Same deal value menus as the demo seed
+DEAL_VALUES = {
+    "Won": [15000, 20000, 25000, 30000, 35000, 40000, 50000],
+    "Opportunity": [10000, 15000, 20000, 25000],
+    "SQL": [5000, 10000, 15000],
+}
+OTHER_DEAL_VALUES = [0, 5000, 10000]
+
+DEFAULT_STAGE_MIX = {"MQL": 0.1, "SQL": 0.2, "Opportunity": 0.3, "Won": 0.3, "Lost": 0.1}
+DEFAULT_TOUCHPOINT_LENGTHS = {1: 0.25, 2: 0.25, 3: 0.25, 4: 0.25}
+
+class SyntheticDataGenerator:
+    """Deterministic bulk generator of companies, campaigns and leads for load and benchmark datasets"""
+    
+    @staticmethod
+    def _distribution(weights: Dict) -> Tuple[List, np.ndarray]:
+        """(keys, probabilities) from a weight mapping"""
+        keys = list(weights)
+        p = np.array([weights[key] for key in keys], dtype=np.float64)
+        if not keys or (p < 0).any() or p.sum() <= 0:
+            raise ValueError("Weights must be non-negative and not all zero")
+        return keys, p / p.sum()
+    
+    @staticmethod
+    def _rng(seed: int, *stream: int) -> np.random.Generator:
+        """Independent stream per (company, batch) so output does not depend on what ran before"""
+        return np.random.default_rng(np.random.SeedSequence([seed, *stream]))
+    
+    @staticmethod
+    def _campaign_rows(rng: np.random.Generator, company_id: int, count: int, now: datetime) -> List[Dict]:
+        """Campaign rows with lognormal reach, beta CTR and gamma CPC"""
+        platforms = rng.choice(PLATFORMS, count)
+        impressions = rng.lognormal(12.0, 1.0, count).astype(np.int64)
+        clicks = (impressions * rng.beta(2.0, 80.0, count)).astype(np.int64)
+        cost = np.round(clicks * rng.gamma(2.0, 1.5, count), 2)
+        budget = np.round(cost * rng.uniform(1.0, 2.0, count), -2)
+        return [
+            {
+                "company_id": company_id,
+                "name": f"{platforms[i]} Campaign {i + 1}",
+                "platform": str(platforms[i]),
+                "budget": float(budget[i]),
+                "impressions": int(impressions[i]),
+                "clicks": int(clicks[i]),
+                "cost": float(cost[i]),
+                "created_at": now,
+            }
+            for i in range(count)
+        ]
+    
+    @staticmethod
+    def _lead_rows(
+        rng: np.random.Generator,
+        company_id: int,
+        campaign_ids: np.ndarray,
+        first_index: int,
+        count: int,
+        stages: Tuple[List, np.ndarray],
+        lengths: Tuple[List, np.ndarray],
+        days: int,
+        now: datetime,
+    ) -> List[Dict]:
+        """Lead rows with the requested stage mix and touchpoint lengths"""
+        stage_keys, stage_p = stages
+        length_keys, length_p = lengths
+        stage = np.asarray(stage_keys, dtype=object)[rng.choice(len(stage_keys), count, p=stage_p)]
+        length = np.minimum(np.asarray(length_keys)[rng.choice(len(length_keys), count, p=length_p)], len(campaign_ids))
+        
+        # Distinct campaigns per lead: the first `length` columns of a random permutation
+        max_length = int(length.max()) if count else 0
+        order = np.argsort(rng.random((count, len(campaign_ids))), axis=1)[:, :max_length]
+        touchpoints = campaign_ids[order]
+        
+        deal_value = np.zeros(count)
+        for stage_name in stage_keys:
+            rows = stage == stage_name
+            deal_value[rows] = rng.choice(DEAL_VALUES.get(stage_name, OTHER_DEAL_VALUES), rows.sum())
+        age_seconds = rng.uniform(0, days * 86400, count)
+        
+        leads = []
+        for i in range(count):
+            lead_touchpoints = touchpoints[i, :length[i]].tolist()
+            index = first_index + i
+            leads.append({
+                "company_id": company_id,
+                "source_campaign_id": lead_touchpoints[0] if lead_touchpoints else None,
+                "email": f"lead_{index}@synthetic-{company_id}.example.com",
+                "name": f"Synthetic Lead {index}",
+                "touchpoints": lead_touchpoints,
+                "stage": stage[i],
+                "deal_value": float(deal_value[i]),
+                "created_at": now - timedelta(seconds=float(age_seconds[i])),
+            })
+        return leads
+    
+    @staticmethod
+    def generate(
+        db: Session,
+        companies: int = 1,
+        campaigns_per_company: int = 12,
+        leads_per_company: int = 1000,
+        touchpoint_lengths: Optional[Dict[int, float]] = None,
+        stage_mix: Optional[Dict[str, float]] = None,
+        days: int = 365,
+        seed: int = 0,
+        derived: bool = True,
+        batch_size: Optional[int] = None,
+    ) -> Dict:
+        """Bulk-insert a synthetic dataset, committing per batch; derived rows are optional"""
+        stages = SyntheticDataGenerator._distribution(stage_mix or DEFAULT_STAGE_MIX)
+        lengths = SyntheticDataGenerator._distribution(touchpoint_lengths or DEFAULT_TOUCHPOINT_LENGTHS)
+        if min(lengths[0]) < 0:
+            raise ValueError("Touchpoint lengths must be non-negative")
+        batch_size = batch_size or settings.SYNTHETIC_BATCH_SIZE
+        # Midnight anchor keeps lead timestamps reproducible within a day
+        now = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+        
+        names = [f"Synthetic {seed}-{company_index}" for company_index in range(companies)]
+        if db.query(Company.id).filter(Company.name.in_(names)).first():
+            raise ValueError(f"A synthetic dataset with seed {seed} already exists")
+        
+        started = time.perf_counter()
+        counts = {"companies": 0, "campaigns": 0, "leads": 0, "attribution_results": 0}
+        company_ids = []
+        
+        for company_index in range(companies):
+            rng = SyntheticDataGenerator._rng(seed, company_index)
+            company_id = db.execute(
+                insert(Company).returning(Company.id),
+                {
+                    "name": names[company_index],
+                    "industry": str(rng.choice(INDUSTRIES)),
+                    "annual_ad_spend": float(np.round(rng.lognormal(12.0, 0.8), -3)),
+                    "created_at": now,
+                },
+            ).scalar_one()
+            # Ids ascend in insertion order; sorting avoids sort_by_parameter_order, which
+            # makes SQLite fall back to one INSERT per row
+            campaign_ids = np.sort(np.array([
+                campaign_id for (campaign_id,) in db.execute(
+                    insert(Campaign).returning(Campaign.id),
+                    SyntheticDataGenerator._campaign_rows(rng, company_id, campaigns_per_company, now),
+                ).all()
+            ], dtype=np.int64))
+            db.commit()
+            company_ids.append(company_id)
+            counts["companies"] += 1
+            counts["campaigns"] += len(campaign_ids)
+            
+            for batch_index, first in enumerate(range(0, leads_per_company, batch_size)):
+                rows = SyntheticDataGenerator._lead_rows(
+                    SyntheticDataGenerator._rng(seed, company_index, batch_index + 1),
+                    company_id, campaign_ids, first, min(batch_size, leads_per_company - first),
+                    stages, lengths, days, now,
+                )
+                lead_ids = [lead_id for (lead_id,) in db.execute(insert(Lead).returning(Lead.id), rows).all()]
+                if derived:
+                    LeadFeatureService.refresh_leads(lead_ids, db)
+                    LeadScoringService.refresh_scores(db, lead_ids=lead_ids)
+                    counts["attribution_results"] += AttributionService.calculate_attribution_batch(lead_ids, db)
+                db.commit()
+                counts["leads"] += len(lead_ids)
+        
+        elapsed = time.perf_counter() - started
+        return {
+            "company_ids": company_ids,
+            "seed": seed,
+            "counts": counts,
+            "elapsed_seconds": round(elapsed, 2),
+            "leads_per_second": round(counts["leads"] / elapsed, 1) if elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,78 @@
+"""Benchmark per-company deal model training wall-clock versus worker count
+
+Usage (from backend/):
+    python -m benchmarks.bench_deal_model_training --companies 32 --leads 20000 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+# Artifacts go to a scratch directory; must be set before app settings are loaded
+os.environ.setdefault("DEAL_MODEL_DIR", tempfile.mkdtemp(prefix="pipelineiq-bench-models-"))
+
+import numpy as np
+from app.ml.deal_probability import DealProbabilityService
+from app.ml.trainer import DealModelTrainer
+
+def make_jobs(num_companies: int, leads_per_company: int, seed: int):
+    """Synthetic feature matrices shaped like LeadFeatureService.load_matrix output"""
+    rng = np.random.default_rng(seed)
+    jobs = []
+    for company_id in range(1, num_companies + 1):
+        n = leads_per_company
+        X = np.column_stack([
+            rng.integers(1, 6, n),                 # num_touchpoints
+            rng.gamma(2.0, 5000.0, n),             # campaign_spend
+            np.full(n, company_id % 5),            # industry_code
+            rng.integers(0, 5, n),                 # stage_code
+            rng.choice([5, 10, 15, 20, 25, 50], n),  # deal_value_scaled
+        ]).astype(np.float64)
+        logits = 0.4 * X[:, 0] + 0.00005 * X[:, 1] + 0.8 * X[:, 3] - 3.0
+        y = (rng.random(n) < 1 / (1 + np.exp(-logits))).astype(np.int64)
+        jobs.append((X, y, DealProbabilityService.company_scope(company_id), f"bench-{company_id}"))
+    return jobs
+
+def run(num_companies: int, leads_per_company: int, workers_list, repeats: int, seed: int):
+    jobs = make_jobs(num_companies, leads_per_company, seed)
+    results = []
+    for workers in workers_list:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            DealModelTrainer.run_jobs(jobs, workers)
+            timings.append(time.perf_counter() - start)
+        results.append({
+            "workers": workers,
+            "best_seconds": round(min(timings), 4),
+            "median_seconds": round(float(np.median(timings)), 4),
+        })
+        print(f"workers={workers:<3} best={min(timings):.3f}s median={np.median(timings):.3f}s")
+    
+    baseline = results[0]["best_seconds"]
+    for result in results:
+        result["speedup"] = round(baseline / result["best_seconds"], 2) if result["best_seconds"] else None
+    return {
+        "companies": num_companies,
+        "leads_per_company": leads_per_company,
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--companies", type=int, default=32)
+    parser.add_argument("--leads", type=int, default=20000, help="leads per company")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report to this path")
+    args = parser.parse_args()
+    
+    report = run(args.companies, args.leads, args.workers, args.repeats, args.seed)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
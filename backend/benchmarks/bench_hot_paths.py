@@ -0,0 +1,267 @@
+"""Benchmark attribution, analytics, scoring and budget hot paths against synthetic datasets
+
+Each dataset size runs in its own process so settings, engines and peak memory
+do not leak between runs. SQLite datasets are cached in --data-dir.
+
+Usage (from backend/):
+    python -m benchmarks.bench_hot_paths --sizes 10000 100000 --output report.json
+    python -m benchmarks.bench_hot_paths --sizes 10000 --baseline benchmarks/baseline.json
+    python -m benchmarks.bench_hot_paths --sizes 10000 --write-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_hot_paths --sizes 100000 --postgres-url postgresql://localhost/pipelineiq_bench
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+# Timed paths; the worker reports them in this order
+PATHS = [
+    "attribution.per_lead",
+    "attribution.batch_1000",
+    "analytics.overview",
+    "analytics.funnel",
+    "analytics.revenue_by_channel",
+    "analytics.top_campaigns",
+    "analytics.deal_probability",
+    "analytics.budget_optimization",
+    "analytics.budget_allocation",
+    "analytics.budget_simulation",
+    "analytics.budget_rules_get",
+    "analytics.budget_rules_put",
+    "analytics.budget_rules_delete",
+    "deal_probability.get_high_probability_leads",
+    "deal_probability.train_model",
+    "budget.get_campaign_metrics",
+]
+
+def percentile(values, q):
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def summarize(timings_ms, statements, peak_bytes):
+    return {
+        "runs": len(timings_ms),
+        "p50_ms": round(percentile(timings_ms, 50), 3),
+        "p95_ms": round(percentile(timings_ms, 95), 3),
+        "p99_ms": round(percentile(timings_ms, 99), 3),
+        "mean_ms": round(sum(timings_ms) / len(timings_ms), 3),
+        "max_ms": round(max(timings_ms), 3),
+        "sql_statements": statements,
+        "peak_memory_mb": round(peak_bytes / 2 ** 20, 2),
+    }
+
+def run_worker(size: int, leads_per_company: int, campaigns: int, repeats: int, seed: int) -> dict:
+    """Build or reuse the dataset in DATABASE_URL, then time every path"""
+    import random
+    import tracemalloc
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event, func
+    from app.db.database import engine, SessionLocal
+    from app.db.migrations import SchemaMigrator
+    from app.models import Company, Lead
+    from app.services.attribution import AttributionService
+    from app.services.synthetic_data import SyntheticDataGenerator
+    from app.ml.budget_optimization import BudgetOptimizationService
+    from app.ml.budget_rules import DEFAULT_RULES
+    from app.ml.deal_probability import DealProbabilityService
+    from app.ml.trainer import DealModelTrainer
+    from main import app
+    
+    # Importing the app no longer migrates; reused datasets are brought up to date here
+    SchemaMigrator.migrate(engine)
+    db = SessionLocal()
+    companies = max(1, math.ceil(size / leads_per_company))
+    if db.query(func.count(Lead.id)).scalar() != companies * (size // companies):
+        SchemaMigrator.reset(engine)
+        started = time.perf_counter()
+        SyntheticDataGenerator.generate(
+            db, companies=companies, campaigns_per_company=campaigns,
+            leads_per_company=size // companies, seed=seed,
+        )
+        print(f"  built {size} leads in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    
+    company_id = db.query(func.min(Company.id)).scalar()
+    lead_ids = [lead_id for (lead_id,) in db.query(Lead.id).filter(Lead.company_id == company_id).all()]
+    DealProbabilityService.train_model(db)
+    # Keep the deal-probability endpoint from retraining in the background mid-run
+    DealModelTrainer._last_check = time.monotonic() + 10 ** 9
+    
+    statements = [0]
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(*args):
+        statements[0] += 1
+    
+    client = TestClient(app)
+    rng = random.Random(seed)
+    base = "/api/analytics"
+    
+    def request(method, url, **kwargs):
+        response = client.request(method, url, **kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {url} -> {response.status_code}: {response.text[:200]}")
+    
+    def per_lead_attribution():
+        lead_id = rng.choice(lead_ids)
+        for model in ["linear", "first_touch", "last_touch", "time_decay"]:
+            result = AttributionService.calculate_attribution_for_lead(lead_id, model, db)
+            if result["results"]:
+                AttributionService.save_attribution_results(db, result["results"])
+    
+    def batch_attribution():
+        AttributionService.calculate_attribution_batch(rng.sample(lead_ids, min(1000, len(lead_ids))), db)
+        db.commit()
+    
+    paths = {
+        "attribution.per_lead": per_lead_attribution,
+        "attribution.batch_1000": batch_attribution,
+        "analytics.overview": lambda: request("GET", f"{base}/overview/{company_id}"),
+        "analytics.funnel": lambda: request("GET", f"{base}/funnel/{company_id}"),
+        "analytics.revenue_by_channel": lambda: request("GET", f"{base}/revenue-by-channel/{company_id}"),
+        "analytics.top_campaigns": lambda: request("GET", f"{base}/top-campaigns/{company_id}"),
+        "analytics.deal_probability": lambda: request("GET", f"{base}/deal-probability/{company_id}"),
+        "analytics.budget_optimization": lambda: request("GET", f"{base}/budget-optimization/{company_id}"),
+        "analytics.budget_allocation": lambda: request(
+            "POST", f"{base}/budget-allocation/{company_id}", json={"total_budget": 100000}
+        ),
+        "analytics.budget_simulation": lambda: request(
+            "POST", f"{base}/budget-simulation/{company_id}", json={"scenarios": 5000}
+        ),
+        "analytics.budget_rules_get": lambda: request("GET", f"{base}/budget-rules/{company_id}"),
+        "analytics.budget_rules_put": lambda: request(
+            "PUT", f"{base}/budget-rules/{company_id}", json={"rules": DEFAULT_RULES}
+        ),
+        "analytics.budget_rules_delete": lambda: request("DELETE", f"{base}/budget-rules/{company_id}"),
+        "deal_probability.get_high_probability_leads": lambda: DealProbabilityService.get_high_probability_leads(0.5, db),
+        "deal_probability.train_model": lambda: DealProbabilityService.train_model(db),
+        "budget.get_campaign_metrics": lambda: BudgetOptimizationService.get_campaign_metrics(company_id, db),
+    }
+    
+    results = {}
+    for name in PATHS:
+        fn = paths[name]
+        fn()  # warm-up
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        
+        # One extra traced run for statement count and peak memory; tracing skews timings
+        statements[0] = 0
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = summarize(timings, statements[0], peak)
+        print(f"  {name:<45} p50={results[name]['p50_ms']:>9.2f}ms sql={statements[0]}", file=sys.stderr)
+    
+    db.close()
+    return results
+
+def run_dataset(label: str, database_url: str, args) -> dict:
+    """Run one dataset in a fresh interpreter"""
+    env = dict(os.environ)
+    env["DATABASE_URL"] = database_url
+    env["DEAL_MODEL_DIR"] = tempfile.mkdtemp(prefix="pipelineiq-bench-models-")
+    # Repeated identical reads would only measure cache hits
+    env["CACHE_ENABLED"] = "true" if args.cache else "false"
+    env.pop("CACHE_REDIS_URL", None)
+    command = [
+        sys.executable, "-W", "ignore", "-m", "benchmarks.bench_hot_paths", "--worker",
+        "--sizes", label.split("-")[-1], "--leads-per-company", str(args.leads_per_company),
+        "--campaigns", str(args.campaigns), "--repeats", str(args.repeats), "--seed", str(args.seed),
+    ]
+    print(f"{label}:", file=sys.stderr)
+    output = subprocess.run(command, env=env, cwd=BACKEND_DIR, check=True, stdout=subprocess.PIPE, text=True)
+    return json.loads(output.stdout)
+
+def compare(report: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """Paths slower than baseline beyond tolerance, or issuing more SQL statements"""
+    regressions = []
+    for dataset, paths in report["datasets"].items():
+        for name, stats in paths.items():
+            before = baseline.get("datasets", {}).get(dataset, {}).get(name)
+            if before is None:
+                continue
+            slower = stats["p50_ms"] - before["p50_ms"]
+            if slower > min_delta_ms and stats["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+                regressions.append(f"{dataset} {name}: p50 {before['p50_ms']}ms -> {stats['p50_ms']}ms")
+            if stats["sql_statements"] > before["sql_statements"]:
+                regressions.append(
+                    f"{dataset} {name}: SQL statements {before['sql_statements']} -> {stats['sql_statements']}"
+                )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="total leads")
+    parser.add_argument("--leads-per-company", type=int, default=50000)
+    parser.add_argument("--campaigns", type=int, default=50, help="campaigns per company")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "pipelineiq-bench"))
+    parser.add_argument("--postgres-url", help="also run against this (scratch) PostgreSQL database")
+    parser.add_argument("--output", help="write the JSON report to this path")
+    parser.add_argument("--baseline", help="fail if results regress against this report")
+    parser.add_argument("--write-baseline", help="store the results as a new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative p50 slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="ignore slowdowns smaller than this")
+    parser.add_argument("--cache", action="store_true", help="time with the response cache enabled")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.worker:
+        result = run_worker(args.sizes[0], args.leads_per_company, args.campaigns, args.repeats, args.seed)
+        print(json.dumps(result))
+        return
+    
+    os.makedirs(args.data_dir, exist_ok=True)
+    datasets = {}
+    for size in args.sizes:
+        sqlite_path = os.path.join(args.data_dir, f"bench-{size}-seed{args.seed}.db")
+        datasets[f"sqlite-{size}"] = run_dataset(f"sqlite-{size}", f"sqlite:///{sqlite_path}", args)
+        if args.postgres_url:
+            datasets[f"postgresql-{size}"] = run_dataset(f"postgresql-{size}", args.postgres_url, args)
+    
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeats": args.repeats,
+        "seed": args.seed,
+        "datasets": datasets,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.write_baseline:
+        with open(args.write_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("REGRESSIONS:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
+        print("No regressions against baseline", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Benchmark worker cold start: process spawn to the first 200 of each endpoint
+
+Every run starts a fresh interpreter that imports the app, runs its lifespan
+startup and requests each endpoint once, in order, as a new worker would
+after a restart or scale-out. The server socket layer is left out; it costs
+the same with or without the app's startup work. The dataset is built once
+in --data-dir.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --leads 20000 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+
+# (label, method, path, body) in request order; {company_id} is filled in by the worker
+ENDPOINTS = [
+    ("health", "GET", "/health", None),
+    ("analytics.overview", "GET", "/api/analytics/overview/{company_id}", None),
+    ("analytics.deal_probability", "GET", "/api/analytics/deal-probability/{company_id}", None),
+    ("analytics.budget_optimization", "GET", "/api/analytics/budget-optimization/{company_id}", None),
+    ("leads.score", "POST", "/api/leads/score", [
+        {"company_id": "{company_id}", "touchpoints": [], "stage": "SQL", "deal_value": 10000.0}
+    ]),
+    ("attribution.summary", "GET", "/api/attribution/summary/{company_id}", None),
+]
+
+def build_dataset(leads: int, seed: int) -> None:
+    """Migrated schema, synthetic leads and a published deal model in DATABASE_URL / DEAL_MODEL_DIR"""
+    from app.db.database import engine, SessionLocal
+    from app.db.migrations import SchemaMigrator
+    from app.ml.deal_probability import DealProbabilityService
+    from app.services.synthetic_data import SyntheticDataGenerator
+    
+    SchemaMigrator.reset(engine)
+    db = SessionLocal()
+    SyntheticDataGenerator.generate(db, companies=1, campaigns_per_company=20, leads_per_company=leads, seed=seed)
+    DealProbabilityService.train_model(db)
+    db.close()
+
+def run_worker(spawned_at: float, company_id: int) -> dict:
+    """Import the app, start it and take every endpoint's first response, timed from spawn"""
+    imported_at = time.time()
+    from fastapi.testclient import TestClient
+    from main import app
+    ready_at = time.time()
+    
+    first = {}
+    with TestClient(app) as client:
+        started_at = time.time()
+        for label, method, path, body in ENDPOINTS:
+            if body is not None:
+                body = json.loads(json.dumps(body).replace('"{company_id}"', str(company_id)))
+            requested = time.perf_counter()
+            response = client.request(method, path.format(company_id=company_id), json=body)
+            first[label] = {
+                "status": response.status_code,
+                "latency_ms": round((time.perf_counter() - requested) * 1000, 2),
+                "since_spawn_s": round(time.time() - spawned_at, 4),
+            }
+    return {
+        "interpreter_s": round(imported_at - spawned_at, 4),
+        "import_s": round(ready_at - imported_at, 4),
+        "lifespan_startup_s": round(started_at - ready_at, 4),
+        "first": first,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--leads", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "pipelineiq-startup"))
+    parser.add_argument("--output", help="write the JSON report to this path")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--build", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.build:
+        build_dataset(args.leads, args.seed)
+        return
+    if args.worker:
+        print(json.dumps(run_worker(float(os.environ["STARTUP_SPAWNED_AT"]), 1)))
+        return
+    
+    os.makedirs(args.data_dir, exist_ok=True)
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(args.data_dir, f'startup-{args.leads}-seed{args.seed}.db')}"
+    env["DEAL_MODEL_DIR"] = os.path.join(args.data_dir, f"models-{args.leads}-seed{args.seed}")
+    env.pop("CACHE_REDIS_URL", None)
+    env.pop("READ_REPLICA_URL", None)
+    if not os.path.exists(os.path.join(env["DEAL_MODEL_DIR"], "global")):
+        print(f"building {args.leads} leads in {args.data_dir}", file=sys.stderr)
+        subprocess.run(
+            [sys.executable, "-W", "ignore", "-m", "benchmarks.bench_startup", "--build",
+             "--leads", str(args.leads), "--seed", str(args.seed)],
+            env=env, cwd=BACKEND_DIR, check=True,
+        )
+    
+    runs = []
+    for _ in range(args.runs):
+        env["STARTUP_SPAWNED_AT"] = repr(time.time())
+        output = subprocess.run(
+            [sys.executable, "-W", "ignore", "-m", "benchmarks.bench_startup", "--worker"],
+            env=env, cwd=BACKEND_DIR, check=True, stdout=subprocess.PIPE, text=True,
+        )
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    
+    def median(values):
+        return round(statistics.median(values), 4)
+    
+    report = {
+        "runs": args.runs,
+        "leads": args.leads,
+        "interpreter_s": median([run["interpreter_s"] for run in runs]),
+        "import_s": median([run["import_s"] for run in runs]),
+        "lifespan_startup_s": median([run["lifespan_startup_s"] for run in runs]),
+        "first_200_s": median([run["first"]["health"]["since_spawn_s"] for run in runs]),
+        "all_endpoints_200_s": median([run["first"][ENDPOINTS[-1][0]]["since_spawn_s"] for run in runs]),
+        "first_request_ms": {
+            label: median([run["first"][label]["latency_ms"] for run in runs]) for label, _, _, _ in ENDPOINTS
+        },
+        "non_200": sorted({
+            f"{label}: {run['first'][label]['status']}"
+            for run in runs for label, _, _, _ in ENDPOINTS if run["first"][label]["status"] != 200
+        }),
+    }
+    print(
+        f"first 200 {report['first_200_s']:.3f}s, all endpoints {report['all_endpoints_200_s']:.3f}s "
+        f"(import {report['import_s']:.3f}s, lifespan {report['lifespan_startup_s']:.3f}s)",
+        file=sys.stderr,
+    )
+    for label, latency in report["first_request_ms"].items():
+        print(f"  {label:<32} first request {latency:>9.2f}ms", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if report["non_200"]:
+        print(f"NON-200 RESPONSES: {', '.join(report['non_200'])}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
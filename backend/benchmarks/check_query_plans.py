@@ -0,0 +1,161 @@
+"""Fail when a hot analytics, attribution or budget query falls back to a full table scan
+
+Runs the hot routes and services against a small synthetic dataset, captures every
+statement they issue and EXPLAINs it. SQLite plans are checked for a bare
+"SCAN <table>" or an index probe on low-selectivity columns only (e.g. the
+attribution model); PostgreSQL plans for a Seq Scan with enable_seqscan off, which
+the planner only keeps when no index can serve the query.
+
+Usage (from backend/):
+    python -m benchmarks.check_query_plans
+    python -m benchmarks.check_query_plans --show
+    python -m benchmarks.check_query_plans --postgres-url postgresql://localhost/pipelineiq_plans
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+SQLITE_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+SQLITE_SEARCH = re.compile(r"^SEARCH (?:TABLE )?(\w+)(?: AS \w+)? USING .*\((.*)\)")
+# An index probe constrained only by these reads a large slice of the table for every tenant
+LOW_SELECTIVITY_COLUMNS = {"attribution_model", "stage", "platform"}
+EXPLAINED = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+def sqlite_full_scans(conn, statement, parameters, tables):
+    """Tables the plan reads start to finish, and the plan text"""
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    details = [row[-1] for row in rows]
+    scans = []
+    for detail in details:
+        match = SQLITE_FULL_SCAN.match(detail)
+        if match and match.group(1) in tables:
+            scans.append(match.group(1))
+        match = SQLITE_SEARCH.match(detail)
+        if match and match.group(1) in tables:
+            columns = set(re.findall(r"(\w+)\s*[=<>]", match.group(2)))
+            if columns and columns <= LOW_SELECTIVITY_COLUMNS:
+                scans.append(f"{match.group(1)} by {', '.join(sorted(columns))}")
+    return scans, "\n".join(details)
+
+def postgres_full_scans(conn, statement, parameters, tables):
+    conn.exec_driver_sql("SET enable_seqscan = off")
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+    scans = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in tables:
+            scans.append(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return scans, json.dumps(plan, indent=1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--postgres-url", help="check this (scratch) PostgreSQL database instead of SQLite")
+    parser.add_argument("--show", action="store_true", help="print every plan, not just regressions")
+    args = parser.parse_args()
+    
+    work_dir = tempfile.mkdtemp(prefix="pipelineiq-plans-")
+    os.environ["DATABASE_URL"] = args.postgres_url or f"sqlite:///{os.path.join(work_dir, 'plans.db')}"
+    os.environ["DEAL_MODEL_DIR"] = os.path.join(work_dir, "models")
+    # Cached reads issue no SQL and would hide the plans
+    os.environ["CACHE_ENABLED"] = "false"
+    os.environ.pop("READ_REPLICA_URL", None)
+    
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event, func
+    from app.db.database import Base, engine, SessionLocal
+    from app.db.migrations import SchemaMigrator
+    from app.models import Company, Lead
+    from app.services.synthetic_data import SyntheticDataGenerator
+    from app.ml.budget_optimization import BudgetOptimizationService
+    from app.ml.deal_probability import DealProbabilityService
+    from app.ml.trainer import DealModelTrainer
+    from main import app
+    
+    SchemaMigrator.reset(engine)
+    db = SessionLocal()
+    SyntheticDataGenerator.generate(db, companies=3, campaigns_per_company=20, leads_per_company=2000, seed=7)
+    company_id = db.query(func.min(Company.id)).scalar()
+    lead_id = db.query(func.min(Lead.id)).filter(Lead.company_id == company_id).scalar()
+    DealProbabilityService.train_model(db)
+    DealModelTrainer._last_check = time.monotonic() + 10 ** 9
+    
+    client = TestClient(app)
+    analytics, attribution = "/api/analytics", "/api/attribution"
+    ranged = "start_date=2000-01-01&end_date=2100-01-01"
+    hot_paths = {
+        "analytics.overview": lambda: client.get(f"{analytics}/overview/{company_id}"),
+        "analytics.overview[range]": lambda: client.get(f"{analytics}/overview/{company_id}?{ranged}"),
+        "analytics.funnel": lambda: client.get(f"{analytics}/funnel/{company_id}"),
+        "analytics.revenue_by_channel": lambda: client.get(f"{analytics}/revenue-by-channel/{company_id}"),
+        "analytics.revenue_by_channel[range]": lambda: client.get(
+            f"{analytics}/revenue-by-channel/{company_id}?{ranged}"
+        ),
+        "analytics.top_campaigns": lambda: client.get(f"{analytics}/top-campaigns/{company_id}"),
+        "analytics.deal_probability": lambda: client.get(f"{analytics}/deal-probability/{company_id}"),
+        "analytics.budget_optimization": lambda: client.get(f"{analytics}/budget-optimization/{company_id}"),
+        "analytics.budget_allocation": lambda: client.post(
+            f"{analytics}/budget-allocation/{company_id}", json={"total_budget": 100000}
+        ),
+        "analytics.budget_simulation": lambda: client.post(
+            f"{analytics}/budget-simulation/{company_id}", json={"scenarios": 100}
+        ),
+        "analytics.budget_rules": lambda: client.get(f"{analytics}/budget-rules/{company_id}"),
+        "attribution.calculate": lambda: client.post(f"{attribution}/calculate/{lead_id}?model=time_decay"),
+        "attribution.revenue": lambda: client.get(f"{attribution}/revenue/{company_id}"),
+        "attribution.summary": lambda: client.get(f"{attribution}/summary/{company_id}"),
+        "budget_optimization.get_campaign_metrics": lambda: BudgetOptimizationService.get_campaign_metrics(
+            company_id, db
+        ),
+        "budget_optimization.get_optimization_recommendations": lambda: (
+            BudgetOptimizationService.get_optimization_recommendations(company_id, db)
+        ),
+    }
+    
+    captured = []
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(EXPLAINED):
+            captured.append((statement, parameters))
+    
+    tables = set(Base.metadata.tables)
+    explain = postgres_full_scans if engine.dialect.name == "postgresql" else sqlite_full_scans
+    regressions = []
+    checked = 0
+    for label, run in hot_paths.items():
+        captured.clear()
+        response = run()
+        if getattr(response, "status_code", 200) >= 400:
+            raise RuntimeError(f"{label} -> {response.status_code}: {response.text[:200]}")
+        # One plan per distinct statement; the first call's parameters stand in for the rest
+        statements = {}
+        for statement, parameters in captured:
+            statements.setdefault(statement, parameters)
+        
+        with engine.connect() as conn:
+            for statement, parameters in statements.items():
+                scans, plan = explain(conn, statement, parameters, tables)
+                checked += 1
+                if args.show:
+                    print(f"--- {label}\n{' '.join(statement.split())}\n{plan}\n")
+                if scans:
+                    regressions.append((label, scans, " ".join(statement.split())))
+            conn.rollback()
+    db.close()
+    
+    if regressions:
+        print("FULL TABLE SCANS:", file=sys.stderr)
+        for label, scans, statement in regressions:
+            print(f"  {label}: {', '.join(scans)}\n    {statement[:300]}", file=sys.stderr)
+        sys.exit(1)
+    print(f"{checked} statements across {len(hot_paths)} hot paths use indexes", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Generate a deterministic synthetic dataset for load and benchmark runs
+
+Usage (from backend/):
+    python generate_data.py --companies 10 --campaigns 50 --leads 100000 --seed 42
+    python generate_data.py --leads 1000000 --touchpoints 1:0.4,2:0.3,3:0.2,5:0.1 --stages MQL:0.5,Won:0.2,Lost:0.3
+"""
+import argparse
+import json
+from app.db.database import engine, SessionLocal
+from app.db.migrations import SchemaMigrator
+from app.services.synthetic_data import SyntheticDataGenerator
+
+def parse_weights(text: str, key_type=str):
+    """'a:1,b:2' -> {'a': 1.0, 'b': 2.0}"""
+    weights = {}
+    for item in text.split(","):
+        key, weight = item.split(":")
+        weights[key_type(key.strip())] = float(weight)
+    return weights
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--companies", type=int, default=1)
+    parser.add_argument("--campaigns", type=int, default=12, help="campaigns per company")
+    parser.add_argument("--leads", type=int, default=1000, help="leads per company")
+    parser.add_argument("--touchpoints", type=lambda text: parse_weights(text, int), default=None,
+                        help="touchpoint length weights, e.g. 1:0.25,2:0.25,3:0.25,4:0.25")
+    parser.add_argument("--stages", type=parse_weights, default=None,
+                        help="stage weights, e.g. MQL:0.1,SQL:0.2,Opportunity:0.3,Won:0.3,Lost:0.1")
+    parser.add_argument("--days", type=int, default=365, help="spread lead creation dates over this many days")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--no-derived", action="store_true", help="skip feature, score and attribution rows")
+    args = parser.parse_args()
+    
+    SchemaMigrator.migrate(engine)
+    db = SessionLocal()
+    try:
+        result = SyntheticDataGenerator.generate(
+            db,
+            companies=args.companies,
+            campaigns_per_company=args.campaigns,
+            leads_per_company=args.leads,
+            touchpoint_lengths=args.touchpoints,
+            stage_mix=args.stages,
+            days=args.days,
+            seed=args.seed,
+            derived=not args.no_derived,
+            batch_size=args.batch_size,
+        )
+    finally:
+        db.close()
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,12 @@
 """Initialize database and seed data"""
-from app.db.database import engine, SessionLocal, Base
-from app.models import Company, Campaign, Lead, User, AttributionResult
+from app.db.database import engine
+from app.db.migrations import SchemaMigrator
 from app.api.routes.seed import seed_database
 
 def init_db():
-    """Create all tables and seed data"""
-    # Create tables
-    Base.metadata.create_all(bind=engine)
-    print("✓ Database tables created")
+    """Migrate the schema and seed data"""
+    applied = SchemaMigrator.migrate(engine)
+    print(f"✓ Database schema up to date ({len(applied)} migrations applied)")
     
     # Seed data
     try:
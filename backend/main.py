@@ -1,19 +1,41 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.core.cache import ResponseCache
 from app.core.config import get_settings
-from app.db.database import engine, Base
-from app.models import Company, Campaign, Lead, User, AttributionResult
-from app.api.routes import auth, companies, campaigns, leads, attribution, analytics, seed
+from app.core.metrics import MetricsMiddleware, RequestMetrics
+from app.core.profiling import ProfilingMiddleware
+from app.core.warmup import StartupWarmup
+from app.db.database import engine, read_engine
+from app.db.migrations import SchemaMigrator
+from app.api.routes import auth, companies, campaigns, leads, attribution, analytics, seed, admin
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Per-request SQL statement counts and timings
+RequestMetrics.instrument(engine)
+if read_engine is not engine:
+    RequestMetrics.instrument(read_engine)
 
-# Initialize FastAPI app
 settings = get_settings()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Worker startup: the schema is migrated by `python migrate.py`, not here; warm-up runs in the background"""
+    if settings.MIGRATE_ON_STARTUP:
+        SchemaMigrator.migrate(engine)
+    StartupWarmup.check_schema()
+    # A misconfigured cache backend fails the worker here, not its first analytics request
+    ResponseCache.backend()
+    if settings.STARTUP_WARMUP:
+        StartupWarmup.start()
+    yield
+
+# Initialize FastAPI app
 app = FastAPI(
     title="PipelineIQ",
     description="AI-powered revenue attribution and GTM intelligence platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -24,6 +46,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
 
 # Include routers
 app.include_router(auth.router)
@@ -33,6 +57,7 @@ app.include_router(leads.router)
 app.include_router(attribution.router)
 app.include_router(analytics.router)
 app.include_router(seed.router)
+app.include_router(admin.router)
 
 @app.get("/")
 def read_root():
@@ -43,10 +68,22 @@ def read_root():
         "docs": "/docs"
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Per-route latency, SQL and cache metrics in Prometheus text format"""
+    return PlainTextResponse(RequestMetrics.render() + ResponseCache.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy"}
+    """Health check endpoint; 503 while schema migrations are pending"""
+    warmup = StartupWarmup.status()["status"]
+    pending = StartupWarmup.schema_pending()
+    if pending:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unhealthy", "pending_migrations": pending, "warmup": warmup}
+        )
+    return {"status": "healthy", "warmup": warmup}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,31 @@
+"""Bring the database schema up to date; run once per deploy, before starting the workers
+
+Usage (from backend/):
+    python migrate.py
+    python migrate.py --status
+    python migrate.py --target 4
+"""
+import argparse
+from app.db.database import engine
+from app.db.migrations import SchemaMigrator
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="list migrations and exit without applying any")
+    parser.add_argument("--target", type=int, default=None, help="stop after this version")
+    args = parser.parse_args()
+    
+    if args.status:
+        for migration in SchemaMigrator.status(engine):
+            applied_at = migration["applied_at"] or "pending"
+            print(f"{migration['version']:>4}  {migration['name']:<40} {applied_at}")
+        return
+    
+    applied = SchemaMigrator.migrate(engine, target=args.target)
+    if applied:
+        print(f"✓ Applied migrations {', '.join(str(version) for version in applied)}")
+    else:
+        print("✓ Database schema up to date")
+
+if __name__ == "__main__":
+    main()